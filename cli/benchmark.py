@@ -0,0 +1,661 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 19 14:02:38 2020
+
+@author: jdevreeze
+"""
+
+import os
+import math
+import random
+import sqlite3
+import argparse
+import tempfile
+import time
+import multiprocessing
+
+from contextlib import redirect_stdout, redirect_stderr
+
+import database
+import migrations
+import standin
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def synthetic_text(size, seed):
+    """
+    Create a random text which looks like a Wikipedia article.
+
+    Args:
+        size: The approximate number of characters.
+        seed: The seed of the random generator.
+
+    Returns:
+        A string with the text.
+    """
+
+    rng = random.Random(seed)
+    words = ['conflict', 'region', 'government', 'history', 'the', 'of', 'and', 'was', 'in', 'war', 'treaty', 'border']
+
+    paragraphs = []
+    length = 0
+
+    while length < size:
+        paragraph = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 80))) + '.'
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+
+    return '\n'.join(paragraphs)
+
+def create_database(path):
+    """
+    Create an empty extraction database.
+
+    Args:
+        path: The path of the sqlite database.
+    """
+
+    db = database.connect(path)
+    migrations.migrate(db, verbose=False)
+    db.close()
+
+def legacy_writes(path, articles, revisions, edits, text):
+    """
+    Write synthetic data with a lookup after each insert and a commit for each user.
+    """
+
+    db = sqlite3.connect(path)
+    cursor = db.cursor()
+
+    for a in range(articles):
+
+        cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(0, ?, 'en', '', 1)''', ('Article %d' % a,))
+        cursor.execute('''SELECT COUNT(*) FROM articles''')
+        parent = cursor.fetchone()[0]
+        cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(?, ?, 'de', '', 1)''', (parent, 'Artikel %d' % a,))
+        db.commit()
+
+        for r in range(revisions):
+
+            user = 'User %d' % (r % 10)
+
+            cursor.execute('''SELECT * FROM authors WHERE name=?''', (user,))
+            if cursor.fetchone() is None:
+                cursor.execute('''INSERT INTO authors(name, language, country) VALUES(?, ?, ?)''', (user, None, None))
+            cursor.execute('''SELECT id FROM authors WHERE name=?''', (user,))
+            author_id = cursor.fetchone()[0]
+
+            identifier = a * revisions + r
+
+            cursor.execute('''SELECT * FROM revisions WHERE revision_id=?''', (identifier,))
+            cursor.fetchone()
+            cursor.execute('''SELECT * FROM articles WHERE id = ? AND language = ?''', (parent, 'en',))
+            article_id = cursor.fetchone()[0]
+
+            cursor.execute('''
+                INSERT INTO revisions(article_id, author_id, revision_id, previous_id, timestamp, content, previous, paragraphs)
+                VALUES(?, ?, ?, ?, '', ?, ?, NULL)
+            ''', (article_id, author_id, identifier, identifier - 1, text, text,))
+            cursor.execute('''SELECT id FROM revisions WHERE revision_id=?''', (identifier,))
+            revision_id = cursor.fetchone()[0]
+
+            for e in range(edits):
+                cursor.execute('''INSERT INTO edits(revision_id, updated_text, previous_text, size) VALUES(?, ?, ?, ?)''', (revision_id, text[e * 50:e * 50 + 50], '', 50,))
+
+            if r % 10 == 9:
+                db.commit()
+
+    db.commit()
+    db.close()
+
+def bulk_writes(path, articles, revisions, edits, text):
+    """
+    Write synthetic data with the bulk-write layer and a single transaction per article.
+    """
+
+    db = database.connect(path)
+    writer = database.Writer(db)
+
+    for a in range(articles):
+
+        with writer.transaction():
+
+            parent = writer.article({'parent_id' : 0, 'title' : 'Article %d' % a, 'language' : 'en', 'timestamp' : '', 'flag' : 1})
+            writer.article({'parent_id' : parent, 'title' : 'Artikel %d' % a, 'language' : 'de', 'timestamp' : '', 'flag' : 1})
+
+            for r in range(revisions):
+
+                author_id = writer.author('User %d' % (r % 10))
+                identifier = a * revisions + r
+
+                revision_id = writer.revision({
+                    'article_id' : parent,
+                    'author_id' : author_id,
+                    'revision_id' : identifier,
+                    'previous_id' : identifier - 1,
+                    'timestamp' : '',
+                    'content' : text,
+                    'previous' : text,
+                    'paragraphs' : None
+                })
+
+                differences = [text[e * 50:e * 50 + 50] for e in range(edits)]
+                writer.edits(revision_id, differences, [''] * edits)
+
+    db.close()
+
+def benchmark_writes(args):
+
+    text = synthetic_text(args.size * 1024, 1)
+    rows = args.articles * (2 + args.revisions * (1 + args.edits))
+
+    print('Writing %d articles with %d revisions and %d edits each (%d rows, %d KB per text):' % (args.articles, args.revisions, args.edits, rows, args.size))
+
+    for name, method in [('legacy', legacy_writes), ('bulk', bulk_writes)]:
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            path = os.path.join(directory, 'benchmark.db')
+            create_database(path)
+
+            start = time.perf_counter()
+            method(path, args.articles, args.revisions, args.edits, text)
+            elapsed = time.perf_counter() - start
+
+        print('  %-8s %8.2f s %10.0f rows/s' % (name, elapsed, rows / elapsed))
+
+def extract_run(api, path, titles, languages, workers, concurrency, buffer, results):
+    """
+    Extract all generated articles in a separate process, so the peak memory usage of each
+    setting is measured independently.
+    """
+
+    import pandas as pd
+    import extract_edits
+
+    df = pd.DataFrame({
+        'title' : [title.replace(' ', '_') for title in titles],
+        'main' : languages[0],
+        'lang1' : languages[0],
+        'lang2' : languages[1]
+    })
+
+    args = argparse.Namespace(
+        usertype='registered', sleep=0, force='replace', resume=False, workers=workers, buffer=buffer,
+        rate=None, concurrency=concurrency, cache=None, cache_size=None, offline=False, api=api,
+        shards=1, index=None, metrics=None, prometheus=None, quiet=True
+    )
+
+    start = time.perf_counter()
+
+    with open(os.devnull, 'w') as null, redirect_stdout(null), redirect_stderr(null):
+        extract_edits.extract_articles(args, df, path)
+
+    elapsed = time.perf_counter() - start
+
+    db = sqlite3.connect(path)
+    revisions = db.execute('''SELECT COUNT(*) FROM revisions''').fetchone()[0]
+    db.close()
+
+    # The peak resident set size is reported in kilobytes on Linux and in bytes on macOS
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss = rss / 1024 ** 2 if os.uname().sysname == 'Darwin' else rss / 1024
+    else:
+        rss = None
+
+    results.put((elapsed, revisions, rss))
+
+def benchmark_extract(args):
+
+    wiki = standin.SyntheticWiki(args.articles, args.revisions, args.users, args.languages)
+    server = standin.StandIn(wiki, latency=args.latency).start()
+
+    titles = wiki.titles(args.languages[0])
+
+    print('Extracting %d articles with %d revisions in each language from %s (%.0f ms latency):' % (args.articles, args.revisions, server.api, args.latency * 1000))
+
+    # Each setting runs in a fresh process, which does not share any memory or cache with other settings
+    context = multiprocessing.get_context('spawn')
+
+    try:
+
+        for workers in args.workers:
+
+            concurrency = args.concurrency if args.concurrency is not None else max(workers, 1)
+
+            with tempfile.TemporaryDirectory() as directory:
+
+                results = context.Queue()
+                process = context.Process(target=extract_run, args=(
+                    server.api, os.path.join(directory, 'benchmark.db'), titles, args.languages, workers, concurrency, args.buffer, results))
+                process.start()
+                elapsed, revisions, rss = results.get()
+                process.join()
+
+            print('  workers=%-3d concurrency=%-3d %8.2f s %10.1f articles/min %10.1f revisions/s %10s' % (
+                workers, concurrency, elapsed, args.articles / elapsed * 60, revisions / elapsed,
+                '%.1f MB' % (rss) if rss is not None else 'n/a'))
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def synthetic_edits(text, count, seed):
+    """
+    Create edits of a text, of which half are part of the text and half are changed.
+
+    Args:
+        text: A string with the revision text.
+        count: The number of edits.
+        seed: The seed of the random generator.
+
+    Returns:
+        A list with tuples of the identifier and the text of each edit.
+    """
+
+    rng = random.Random(seed)
+    edits = []
+
+    for i in range(count):
+
+        start = rng.randrange(max(len(text) - 400, 1))
+        edit = text[start:start + rng.randint(40, 400)]
+
+        if i % 2 == 1:
+            position = rng.randrange(len(edit))
+            edit = edit[:position] + ' changed ' + edit[position:]
+
+        edits.append((i, edit))
+
+    return edits
+
+def benchmark_filter(args):
+
+    import data_cleaning
+    import matcher
+
+    revisions = [(synthetic_text(args.size * 1024, r), r) for r in range(args.revisions)]
+    revisions = [(text, synthetic_edits(text, args.edits, r)) for text, r in revisions]
+
+    methods = [
+        ('loop', lambda edits, text: [i for i, edit in edits if data_cleaning.is_valid(edit, text, args.samples)]),
+        ('python', lambda edits, text: data_cleaning.valid_edits(edits, text, args.samples, native=False))
+    ]
+
+    if matcher.ahocorasick is not None:
+        methods.append(('native', lambda edits, text: data_cleaning.valid_edits(edits, text, args.samples, native=True)))
+    else:
+        print('The pyahocorasick package is not installed, so the native automaton is skipped.')
+
+    print('Filtering %d revisions with %d edits each (%d samples, %d KB per text):' % (args.revisions, args.edits, args.samples, args.size))
+
+    expected = None
+
+    for name, method in methods:
+
+        start = time.perf_counter()
+        flags = [method(edits, text) for text, edits in revisions]
+        elapsed = time.perf_counter() - start
+
+        if expected is None:
+            expected = flags
+        elif flags != expected:
+            raise ValueError('The %s filter does not flag the same edits as the loop.' % (name))
+
+        print('  %-8s %8.2f s %10.0f edits/s' % (name, elapsed, args.revisions * args.edits / elapsed))
+
+def benchmark_dataset(args):
+
+    import json
+    import sys
+    import create_dataset
+
+    print('Exporting %d articles with %d revisions of %d edits each in both languages (%d KB per text):' % (args.articles, args.revisions, args.edits, args.size))
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        path = os.path.join(directory, 'benchmark.db')
+        dataset_database(path, args.articles, args.revisions, args.edits, args.authors, args.size * 1024)
+
+        report = os.path.join(directory, 'metrics.json')
+        argv = sys.argv
+
+        try:
+            sys.argv = ['create_dataset.py', '--input', path, '--output', os.path.join(directory, 'dataset.csv'), '--metrics', report, '--quiet'] + args.options
+            with open(os.devnull, 'w') as null, redirect_stdout(null):
+                create_dataset.main()
+        finally:
+            sys.argv = argv
+
+        with open(report) as file:
+            metrics = json.load(file)
+
+    for name, stage in metrics['stages'].items():
+        print('  %-10s %8.2f s %10d rows' % (name, stage['seconds'], stage['rows']))
+
+    print('  %-10s %8.2f s' % ('total', metrics['elapsed']))
+
+def shards_database(path, revisions, edits, size):
+    """
+    Create an extraction database with revisions of which half of the edits are valid.
+    """
+
+    create_database(path)
+
+    db = database.connect(path)
+    writer = database.Writer(db)
+
+    with writer.transaction():
+
+        parent = writer.article({'parent_id' : 0, 'title' : 'Article', 'language' : 'en', 'timestamp' : '', 'flag' : 1})
+
+        for r in range(revisions):
+
+            text = synthetic_text(size, r)
+
+            revision_id = writer.revision({
+                'article_id' : parent,
+                'author_id' : writer.author('User %d' % (r % 10)),
+                'revision_id' : r,
+                'previous_id' : r - 1,
+                'timestamp' : '',
+                'content' : text,
+                'previous' : text,
+                'paragraphs' : None
+            })
+
+            differences = [edit for _, edit in synthetic_edits(text, edits, r)]
+            writer.edits(revision_id, differences, [''] * edits)
+
+    db.close()
+
+def benchmark_shards(args):
+
+    import data_cleaning
+
+    print('Filtering %d revisions with %d edits each (%d samples, %d KB per text, %d revisions per shard):' % (args.revisions, args.edits, args.samples, args.size, args.batch))
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        path = os.path.join(directory, 'benchmark.db')
+        shards_database(path, args.revisions, args.edits, args.size * 1024)
+
+        expected = None
+        baseline = None
+
+        for workers in args.workers:
+
+            db = database.connect(path)
+
+            start = time.perf_counter()
+            data_cleaning.filter_edits(db, args.samples, args.batch, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            flags = db.execute('''SELECT id, flag FROM edits ORDER BY id''').fetchall()
+            db.rollback()
+            db.close()
+
+            if expected is None:
+                expected = flags
+                baseline = elapsed
+            elif flags != expected:
+                raise ValueError('The filter with %d processes does not flag the same edits as the filter with %d processes.' % (workers, args.workers[0]))
+
+            print('  %2d workers %8.2f s %10.0f edits/s %6.2fx' % (workers, elapsed, args.revisions * args.edits / elapsed, baseline / elapsed))
+
+def dataset_database(path, articles, revisions, edits, authors, size, seed=1):
+    """
+    Create a cleaned extraction database with articles in two languages, of which the edits
+    are added, changed, deleted, or only partly part of the revision text.
+    """
+
+    import data_cleaning
+
+    create_database(path)
+
+    rng = random.Random(seed)
+
+    db = database.connect(path)
+    writer = database.Writer(db)
+
+    tongues = ['en', 'de', 'fr', None]
+    countries = [None, None, 'DE', 'GB', 'US', 'AT', 'CH', 'FR']
+
+    with writer.transaction():
+
+        users = [writer.author('User %d' % (u)) for u in range(authors)]
+
+        db.executemany('''UPDATE authors SET language = ?, iso = ?, usertype = 'registered', flag = 1 WHERE id = ?''', [
+            (rng.choice(tongues), rng.choice(countries), user) for user in users])
+
+        identifier = 0
+
+        for a in range(articles):
+
+            parent = writer.article({'parent_id' : 0, 'title' : 'Article %d' % a, 'language' : 'en', 'timestamp' : '', 'flag' : 1})
+            child = writer.article({'parent_id' : parent, 'title' : 'Artikel %d' % a, 'language' : 'de', 'timestamp' : '', 'flag' : 1 if a % 10 else 0})
+
+            # The edits of each article are made by a few users
+            contributors = rng.sample(users, min(len(users), 5))
+
+            for article_id in [parent, child]:
+
+                previous = synthetic_text(size, rng.random())
+
+                for r in range(revisions):
+
+                    content = synthetic_text(size, rng.random())
+                    identifier += 1
+
+                    revision_id = writer.revision({
+                        'article_id' : article_id,
+                        'author_id' : rng.choice(contributors),
+                        'revision_id' : identifier,
+                        'previous_id' : identifier - 1,
+                        'timestamp' : '2019-%02d-%02dT10:00:00Z' % (rng.randint(1, 12), rng.randint(1, 28)),
+                        'content' : content,
+                        'previous' : previous,
+                        'paragraphs' : None
+                    })
+
+                    paragraphs = content.split('\n')
+                    originals = previous.split('\n')
+
+                    differences, original = [], []
+
+                    for e in range(edits):
+
+                        kind = rng.randrange(6)
+                        updated, changed = rng.choice(paragraphs), rng.choice(originals)
+
+                        if kind == 0:
+                            differences.append(updated); original.append('')
+                        elif kind == 1:
+                            differences.append(updated); original.append(changed)
+                        elif kind == 2:
+                            differences.append(''); original.append(changed)
+                        elif kind == 3:
+                            differences.append(updated[:len(updated) // 2] + ' changed ' + updated[len(updated) // 2:]); original.append('')
+                        elif kind == 4:
+                            differences.append(updated[:2]); original.append('')
+                        else:
+                            differences.append(updated); original.append(updated)
+
+                    writer.edits(revision_id, differences, original)
+
+                    previous = content
+
+        db.execute('''UPDATE edits SET flag = CASE WHEN id % 7 = 0 THEN 0 ELSE 1 END''')
+
+    data_cleaning.assign_series(db.cursor())
+    db.commit()
+    db.close()
+
+def cleaning_database(path, articles, translations, authors):
+    """
+    Create an extraction database with articles, their translations, and authors.
+    """
+
+    create_database(path)
+
+    db = sqlite3.connect(path)
+
+    rows = []
+
+    for a in range(articles):
+
+        parent = len(rows) + 1
+        rows.append((0, 'Article %d' % a, 'en'))
+        rows.extend((parent, 'Article %d (%d)' % (a, t), 'de') for t in range(translations))
+
+    db.executemany('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(?, ?, ?, '', 1)''', rows)
+    db.executemany('''INSERT INTO authors(name, language, country) VALUES(?, NULL, NULL)''', [('User %d' % u,) for u in range(authors)])
+    db.commit()
+    db.close()
+
+def legacy_series(cursor):
+    """
+    Assign the series of each article with an update for each parent article.
+    """
+
+    parents = cursor.execute('''SELECT id FROM articles WHERE parent_id = 0''').fetchall()
+
+    for i, (parent,) in enumerate(parents, 1):
+
+        identifier = [parent] + [child[0] for child in cursor.execute('''SELECT id FROM articles WHERE parent_id = ?''', (parent,)).fetchall()]
+        cursor.execute('''UPDATE articles SET series = ? WHERE (id BETWEEN ? AND ?)''', (i, identifier[0], identifier[-1],))
+
+def legacy_users(cursor, df):
+    """
+    Store the user data with an update for each row of the user dataset.
+    """
+
+    for index, row in df.iterrows():
+        cursor.execute('''
+        UPDATE authors 
+        SET language = ?, country = ?, usertype = 'registered', flag = ? 
+        WHERE name = ?
+        ''', (row['First Language'], row['Country'], math.floor(row['Certain']), row['Author'],))
+
+def benchmark_cleaning(args):
+
+    import pandas as pd
+    import data_cleaning
+
+    rng = random.Random(1)
+
+    # Some users occur more than once, in which case the last row is used
+    users = [rng.randrange(args.authors) for _ in range(args.users)]
+    df = pd.DataFrame({
+        'Author' : ['User %d' % u for u in users],
+        'First Language' : [rng.choice(['en', 'de', 'nl', 'fr']) for _ in users],
+        'Country' : [rng.choice(['UK', 'DE', 'NL', 'FR']) for _ in users],
+        'Certain' : [rng.choice([0.5, 1.0]) for _ in users]
+    })
+
+    methods = [
+        ('legacy', legacy_series, legacy_users),
+        ('set', data_cleaning.assign_series, data_cleaning.update_users)
+    ]
+
+    print('Cleaning %d articles with %d translations each, %d authors, and %d rows of user data:' % (args.articles, args.translations, args.authors, args.users))
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        expected = None
+
+        for name, series, update in methods:
+
+            path = os.path.join(directory, '%s.db' % (name))
+            cleaning_database(path, args.articles, args.translations, args.authors)
+
+            db = sqlite3.connect(path)
+            cursor = db.cursor()
+
+            start = time.perf_counter()
+            series(cursor)
+            middle = time.perf_counter()
+            update(cursor, df)
+            db.commit()
+            end = time.perf_counter()
+
+            result = (
+                cursor.execute('''SELECT id, series FROM articles ORDER BY id''').fetchall(),
+                cursor.execute('''SELECT id, name, language, country, usertype, flag FROM authors ORDER BY id''').fetchall()
+            )
+
+            db.close()
+
+            if expected is None:
+                expected = result
+            elif result != expected:
+                raise ValueError('The %s cleaning does not give the same series and authors as the legacy cleaning.' % (name))
+
+            print('  %-8s series %8.2f s   users %8.2f s' % (name, middle - start, end - middle))
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark the extraction and cleaning of Wikipedia edits.')
+
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    writes = subparsers.add_parser('writes', help='Measure the write throughput of the extraction database.')
+    writes.add_argument('--articles', metavar='articles', type=int, default=20, help='The number of articles (default: 20).')
+    writes.add_argument('--revisions', metavar='revisions', type=int, default=200, help='The number of revisions for each article (default: 200).')
+    writes.add_argument('--edits', metavar='edits', type=int, default=10, help='The number of edits for each revision (default: 10).')
+    writes.add_argument('--size', metavar='size', type=int, default=50, help='The size of each revision text in kilobytes (default: 50).')
+    writes.set_defaults(run=benchmark_writes)
+
+    extract = subparsers.add_parser('extract', help='Measure the end-to-end throughput of the extraction against a local stand-in of the MediaWiki API.')
+    extract.add_argument('--articles', metavar='articles', type=int, default=10, help='The number of generated articles (default: 10).')
+    extract.add_argument('--revisions', metavar='revisions', type=int, default=60, help='The number of revisions of each language version (default: 60).')
+    extract.add_argument('--users', metavar='users', type=int, default=8, help='The number of users who edit the articles (default: 8).')
+    extract.add_argument('--languages', metavar='languages', nargs=2, type=str, default=['en', 'de'], help='The two languages of each article (default: en de).')
+    extract.add_argument('--latency', metavar='latency', type=float, default=0.02, help='The delay of each response of the stand-in server in seconds (default: 0.02).')
+    extract.add_argument('--workers', metavar='workers', nargs='+', type=int, default=[0, 2, 4, 8], help='The numbers of threads that are compared (default: 0 2 4 8).')
+    extract.add_argument('--concurrency', metavar='concurrency', type=int, default=None, help='The maximum number of simultaneous requests for each language. When not specified, it equals the number of threads (default: None).')
+    extract.add_argument('--buffer', metavar='buffer', type=int, default=16, help='The maximum number of revisions waiting between two stages of the extraction process (default: 16).')
+    extract.set_defaults(run=benchmark_extract)
+
+    filtering = subparsers.add_parser('filter', help='Compare the validity check of data_cleaning.py for each sample with the check of all samples at once.')
+    filtering.add_argument('--revisions', metavar='revisions', type=int, default=20, help='The number of revisions (default: 20).')
+    filtering.add_argument('--edits', metavar='edits', type=int, default=200, help='The number of edits of each revision (default: 200).')
+    filtering.add_argument('--samples', metavar='samples', choices=range(1, 6), type=int, default=5, help='The number of samples of each edit (default: 5).')
+    filtering.add_argument('--size', metavar='size', type=int, default=200, help='The size of each revision text in kilobytes (default: 200).')
+    filtering.set_defaults(run=benchmark_filter)
+
+    dataset = subparsers.add_parser('dataset', help='Measure the time spent in each stage of create_dataset.py on a synthetic database.')
+    dataset.add_argument('--articles', metavar='articles', type=int, default=100, help='The number of articles, which each have two language versions (default: 100).')
+    dataset.add_argument('--revisions', metavar='revisions', type=int, default=20, help='The number of revisions of each language version (default: 20).')
+    dataset.add_argument('--edits', metavar='edits', type=int, default=10, help='The number of edits of each revision (default: 10).')
+    dataset.add_argument('--authors', metavar='authors', type=int, default=200, help='The number of authors (default: 200).')
+    dataset.add_argument('--size', metavar='size', type=int, default=5, help='The size of each revision text in kilobytes (default: 5).')
+    dataset.add_argument('--options', metavar='options', nargs=argparse.REMAINDER, default=[], help='Further arguments of create_dataset.py.')
+    dataset.set_defaults(run=benchmark_dataset)
+
+    shards = subparsers.add_parser('shards', help='Measure the throughput of the edit filter of data_cleaning.py with several processes.')
+    shards.add_argument('--revisions', metavar='revisions', type=int, default=400, help='The number of revisions (default: 400).')
+    shards.add_argument('--edits', metavar='edits', type=int, default=200, help='The number of edits of each revision (default: 200).')
+    shards.add_argument('--samples', metavar='samples', choices=range(1, 6), type=int, default=1, help='The number of samples of each edit (default: 1).')
+    shards.add_argument('--size', metavar='size', type=int, default=50, help='The size of each revision text in kilobytes (default: 50).')
+    shards.add_argument('--batch', metavar='batch', type=int, default=20, help='The number of revisions in each shard (default: 20).')
+    shards.add_argument('--workers', metavar='workers', nargs='+', type=int, default=[1, 2, 4, 8], help='The numbers of processes that are compared (default: 1 2 4 8).')
+    shards.set_defaults(run=benchmark_shards)
+
+    cleaning = subparsers.add_parser('cleaning', help='Compare the series and user data updates of data_cleaning.py for each row with the set-based updates.')
+    cleaning.add_argument('--articles', metavar='articles', type=int, default=20000, help='The number of parent articles (default: 20000).')
+    cleaning.add_argument('--translations', metavar='translations', type=int, default=2, help='The number of translations of each article (default: 2).')
+    cleaning.add_argument('--authors', metavar='authors', type=int, default=100000, help='The number of authors (default: 100000).')
+    cleaning.add_argument('--users', metavar='users', type=int, default=100000, help='The number of rows of the user dataset (default: 100000).')
+    cleaning.set_defaults(run=benchmark_cleaning)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 17 14:38:09 2020
+
+@author: jdevreeze
+"""
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+class RevisionCache:
+    """
+    Persistent cache for data extracted from the MediaWiki API.
+
+    Revisions are stored by language and revision identifier, whereas page metadata (e.g.,
+    language links, contributors, or the revisions of a user) is stored by language and
+    request parameters. All payloads are pickled, compressed, and addressed by their
+    SHA-1 digest, so identical payloads are only stored once. The least recently used
+    payloads are removed when the cache exceeds its maximum size.
+
+    The access times of cached payloads are kept in memory and written together with the
+    next payload, so a lookup does not write to the cache. The total size of all payloads
+    is kept in the cache itself, because several processes can share the same cache.
+    """
+
+    _size = None
+    _offline = False
+    _pending = 1000
+
+    def __init__(self, path, size=None, offline=False):
+        """
+        Initialize the cache.
+
+        Args:
+            path: The path of the sqlite database in which the cache is stored.
+            size: The maximum size of all compressed payloads in megabytes (default None).
+                When None, the cache is not bounded.
+            offline: Serve all requests from the cache without connecting to the MediaWiki
+                API (default False).
+        """
+
+        if size is not None:
+            self._size = int(size * 1024 * 1024)
+
+        self._offline = offline
+        self._lock = threading.Lock()
+        self._accessed = {}
+
+        # The cache can be shared by several processes, which wait for each other's writes
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._db.execute('''PRAGMA journal_mode = WAL''')
+        self._db.execute('''PRAGMA synchronous = NORMAL''')
+
+        cursor = self._db.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS blobs(
+                digest TEXT PRIMARY KEY,
+                data BLOB,
+                size INTEGER,
+                accessed REAL)
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entries(
+                kind TEXT,
+                language TEXT,
+                key TEXT,
+                digest TEXT,
+                PRIMARY KEY (kind, language, key))
+        ''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs(accessed)''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries(digest)''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage(
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                size INTEGER)
+        ''')
+        cursor.execute('''INSERT OR IGNORE INTO usage(id, size) SELECT 0, COALESCE(SUM(size), 0) FROM blobs''')
+
+        self._db.commit()
+
+    @property
+    def offline(self):
+        return self._offline
+
+    def get(self, kind, lang, key):
+        """
+        Retrieve a payload from the cache.
+
+        Args:
+            kind: The type of payload (e.g., 'revision' or 'request').
+            lang: The article language.
+            key: The key of the payload (e.g., a revision identifier).
+
+        Returns:
+            The payload or None if it is not cached.
+        """
+
+        with self._lock:
+
+            cursor = self._db.cursor()
+            cursor.execute('''
+                SELECT blobs.digest, blobs.data FROM entries
+                INNER JOIN blobs ON blobs.digest = entries.digest
+                WHERE entries.kind = ? AND entries.language = ? AND entries.key = ?
+            ''', (kind, lang, str(key),))
+
+            result = cursor.fetchone()
+
+            if result is None:
+                return None
+
+            self._accessed[result[0]] = time.time()
+
+            if len(self._accessed) >= self._pending:
+                self.__flush(cursor)
+                self._db.commit()
+
+        return pickle.loads(zlib.decompress(result[1]))
+
+    def contains(self, kind, lang, key):
+        """
+        Check whether a payload is cached without retrieving it.
+
+        Args:
+            kind: The type of payload (e.g., 'revision' or 'request').
+            lang: The article language.
+            key: The key of the payload (e.g., a revision identifier).
+
+        Returns:
+            True if the payload is cached, otherwise False.
+        """
+
+        with self._lock:
+            result = self._db.execute('''SELECT 1 FROM entries WHERE kind = ? AND language = ? AND key = ?''', (kind, lang, str(key),)).fetchone()
+
+        return result is not None
+
+    def put(self, kind, lang, key, payload):
+        """
+        Store a payload in the cache.
+
+        Args:
+            kind: The type of payload (e.g., 'revision' or 'request').
+            lang: The article language.
+            key: The key of the payload (e.g., a revision identifier).
+            payload: Any object that can be pickled.
+        """
+
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha1(data).hexdigest()
+
+        with self._lock:
+
+            cursor = self._db.cursor()
+
+            # Other processes can not change the size of the cache until this write is committed
+            cursor.execute('''BEGIN IMMEDIATE''')
+
+            try:
+
+                self.__flush(cursor)
+
+                cursor.execute('''SELECT 1 FROM blobs WHERE digest = ?''', (digest,))
+
+                if cursor.fetchone() is None:
+                    data = zlib.compress(data)
+                    cursor.execute('''INSERT INTO blobs(digest, data, size, accessed) VALUES(?, ?, ?, ?)''', (digest, data, len(data), time.time(),))
+                    cursor.execute('''UPDATE usage SET size = size + ?''', (len(data),))
+
+                cursor.execute('''INSERT OR REPLACE INTO entries(kind, language, key, digest) VALUES(?, ?, ?, ?)''', (kind, lang, str(key), digest,))
+
+                if self._size is not None and self.__total(cursor) > self._size:
+                    self.__evict(cursor)
+
+                self._db.commit()
+
+            except:
+                self._db.rollback()
+                raise
+
+    def close(self):
+
+        with self._lock:
+            self.__flush(self._db.cursor())
+            self._db.commit()
+
+        self._db.close()
+
+    def __total(self, cursor):
+        return cursor.execute('''SELECT size FROM usage''').fetchone()[0]
+
+    def __flush(self, cursor):
+        """
+        Internal method which writes the access times of the payloads that were retrieved
+        since the last write.
+
+        Args:
+            cursor: A cursor of the cache database.
+        """
+
+        if self._accessed:
+            cursor.executemany('''UPDATE blobs SET accessed = MAX(accessed, ?) WHERE digest = ?''', [(accessed, digest) for digest, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def __evict(self, cursor):
+        """
+        Internal method which removes the least recently used payloads until the cache
+        is smaller than 90 percent of its maximum size.
+
+        Args:
+            cursor: A cursor of the cache database.
+        """
+
+        # The total size is counted again, so it can not drift from the stored payloads
+        cursor.execute('''UPDATE usage SET size = (SELECT COALESCE(SUM(size), 0) FROM blobs)''')
+
+        total = self.__total(cursor)
+
+        while total > self._size * 0.9:
+
+            blobs = cursor.execute('''SELECT digest, size FROM blobs ORDER BY accessed LIMIT 100''').fetchall()
+
+            if not blobs:
+                break
+
+            for digest, size in blobs:
+
+                if total <= self._size * 0.9:
+                    break
+
+                cursor.execute('''DELETE FROM entries WHERE digest = ?''', (digest,))
+                cursor.execute('''DELETE FROM blobs WHERE digest = ?''', (digest,))
+                total -= size
+
+        cursor.execute('''UPDATE usage SET size = ?''', (total,))
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Mar 29 11:02:45 2020
+
+@author: jdevreeze
+"""
+
+import re
+import sqlite3
+import argparse
+import threading
+
+import pandas as pd
+
+from datetime import datetime
+from tqdm import tqdm
+
+import mediawiki
+
+class ContributorIndex:
+    """
+    Persistent inverted index of the users who contributed to Wikipedia articles.
+
+    The contributors of each language version of an article are crawled once and stored
+    by language, title, and user, together with the newest revision that was indexed. The
+    index can be updated incrementally by only crawling newer revisions. Lookups of the
+    contributors of an article, of the users shared by two language versions, and of the
+    articles edited by a user do not require any request to the MediaWiki API.
+    """
+
+    def __init__(self, path):
+        """
+        Open or create the index.
+
+        Args:
+            path: The path of the sqlite database in which the index is stored.
+        """
+
+        self._lock = threading.Lock()
+
+        # The index can be shared by several processes, which wait for each other's writes
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+
+        cursor = self._db.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS titles(
+                title TEXT,
+                main TEXT,
+                language TEXT,
+                page TEXT,
+                PRIMARY KEY (title, main, language))
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pages(
+                language TEXT,
+                page TEXT,
+                revision_id INTEGER,
+                indexed TEXT,
+                PRIMARY KEY (language, page))
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS contributors(
+                language TEXT,
+                page TEXT,
+                user TEXT,
+                anonymous INTEGER,
+                revisions INTEGER,
+                PRIMARY KEY (language, page, user)) WITHOUT ROWID
+        ''')
+
+        # Inverted index of the pages edited by each user
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_contributors_user ON contributors(language, user, page)''')
+
+        self._db.commit()
+
+    def title(self, title, main, lang):
+        """
+        Get the title of an article in another language.
+
+        Args:
+            title: The title of the article in the main language.
+            main: The main language of the article.
+            lang: The requested language.
+
+        Returns:
+            The title in the requested language or None if it is not indexed.
+        """
+
+        with self._lock:
+            result = self._db.execute('''SELECT page FROM titles WHERE title = ? AND main = ? AND language = ?''', (title, main, lang,)).fetchone()
+
+        return result[0] if result is not None else None
+
+    def add_titles(self, wiki, title, main, languages):
+        """
+        Store the titles of an article in several languages.
+
+        Args:
+            wiki: A mediawiki.Parse instance of the article.
+            title: The title of the article in the main language.
+            main: The main language of the article.
+            languages: A list with the language codes.
+        """
+
+        rows = [(title, main, lang, wiki.get_title(lang)) for lang in languages if wiki.get_title(lang) is not False]
+
+        with self._lock:
+            self._db.executemany('''INSERT OR REPLACE INTO titles(title, main, language, page) VALUES(?, ?, ?, ?)''', rows)
+            self._db.commit()
+
+    def is_indexed(self, lang, page):
+        """
+        Check whether the contributors of a page are indexed.
+
+        Args:
+            lang: The article language.
+            page: The title of the page in this language.
+
+        Returns:
+            True if the page is indexed, otherwise False.
+        """
+
+        return self.__newest(lang, page) is not None
+
+    def update(self, wiki, lang, refresh=False):
+        """
+        Crawl the contributors of a page and add them to the index.
+
+        Args:
+            wiki: A mediawiki.Parse instance of the article.
+            lang: The article language.
+            refresh: Crawl the revisions made since the page was indexed, otherwise an
+                indexed page is not crawled again (default False).
+
+        Returns:
+            True if the page was crawled, otherwise False.
+        """
+
+        page = wiki.get_title(lang)
+        since = self.__newest(lang, page)
+
+        if since is not None and refresh is False:
+            return False
+
+        users, newest = wiki.get_contributors(lang, since)
+
+        rows = [(lang, page, user, 1 if whom == 'anonymous' else 0, revisions) for whom in users for user, revisions in users[whom].items()]
+
+        with self._lock:
+
+            self._db.executemany('''
+                INSERT INTO contributors(language, page, user, anonymous, revisions) VALUES(?, ?, ?, ?, ?)
+                ON CONFLICT(language, page, user) DO UPDATE SET revisions = revisions + excluded.revisions
+            ''', rows)
+            self._db.execute('''INSERT OR REPLACE INTO pages(language, page, revision_id, indexed) VALUES(?, ?, ?, ?)''', (
+                lang, page, newest if newest is not None else 0, datetime.strftime(datetime.now(), '%Y-%m-%dT%H:%M:%S'),))
+            self._db.commit()
+
+        return True
+
+    def contributors(self, lang, page, whom='all'):
+        """
+        Get the users who contributed to a page.
+
+        Args:
+            lang: The article language.
+            page: The title of the page in this language.
+            whom: Retrieve 'registered', 'anonymous', or 'all' users (default 'all').
+
+        Returns:
+            A dict with the usernames and the number of revisions.
+        """
+
+        with self._lock:
+            rows = self._db.execute('''SELECT user, revisions FROM contributors WHERE language = ? AND page = ? %s''' % (self.__whom(whom)), (lang, page,)).fetchall()
+
+        return dict(rows)
+
+    def shared(self, lang1, page1, lang2, page2, whom='all'):
+        """
+        Get the users who contributed to two pages.
+
+        Args:
+            lang1: The language of the first page.
+            page1: The title of the first page.
+            lang2: The language of the second page.
+            page2: The title of the second page.
+            whom: Retrieve 'registered', 'anonymous', or 'all' users (default 'all').
+
+        Returns:
+            A sorted list with the usernames.
+        """
+
+        with self._lock:
+            rows = self._db.execute('''
+                SELECT contributors.user FROM contributors
+                INNER JOIN contributors AS other ON other.language = ? AND other.page = ? AND other.user = contributors.user
+                WHERE contributors.language = ? AND contributors.page = ? %s
+                ORDER BY contributors.user
+            ''' % (self.__whom(whom, 'contributors')), (lang2, page2, lang1, page1,)).fetchall()
+
+        return [row[0] for row in rows]
+
+    def pages(self, lang, user):
+        """
+        Get the pages to which a user contributed.
+
+        Args:
+            lang: The article language.
+            user: The name of the user.
+
+        Returns:
+            A dict with the titles of the pages and the number of revisions.
+        """
+
+        with self._lock:
+            rows = self._db.execute('''SELECT page, revisions FROM contributors WHERE language = ? AND user = ?''', (lang, user,)).fetchall()
+
+        return dict(rows)
+
+    def close(self):
+        self._db.close()
+
+    def __newest(self, lang, page):
+        """
+        Internal method which gets the newest indexed revision of a page or None if the page is not indexed.
+        """
+
+        with self._lock:
+            result = self._db.execute('''SELECT revision_id FROM pages WHERE language = ? AND page = ?''', (lang, page,)).fetchone()
+
+        return result[0] if result is not None else None
+
+    def __whom(self, whom, table='contributors'):
+        """
+        Internal method which gets the SQL condition of a type of users.
+        """
+
+        if whom == 'registered':
+            return 'AND %s.anonymous = 0' % (table)
+        if whom == 'anonymous':
+            return 'AND %s.anonymous = 1' % (table)
+        if whom == 'all':
+            return ''
+
+        raise ValueError('The type of users specified is not valid.')
+
+def index_articles(index, df, whom='registered', refresh=False, position=0):
+    """
+    Add the contributors of all articles in the input data to the index and count the
+    users shared by both language versions of each article.
+
+    Only articles of which a title or a page is not indexed yet are requested from the
+    MediaWiki API, unless the index is refreshed.
+
+    Args:
+        index: A ContributorIndex instance.
+        df: A dataframe with the articles (see extract_edits.py).
+        whom: Count 'registered', 'anonymous', or 'all' users (default 'registered').
+        refresh: Crawl the revisions made since each page was indexed (default False).
+        position: The position of the progress bar (default 0).
+
+    Returns:
+        A copy of the dataframe with the titles in both languages and the number of shared
+        users, sorted from the largest to the smallest overlap.
+    """
+
+    titles1, titles2, shared = [], [], []
+
+    for _, row in tqdm(df.iterrows(), total=df.shape[0], position=position):
+
+        title = row.title.replace('_', ' ')
+        pages = [index.title(title, row.main, lang) for lang in [row.lang1, row.lang2]]
+
+        if refresh is True or None in pages or not all(index.is_indexed(lang, page) for lang, page in zip([row.lang1, row.lang2], pages)):
+
+            wiki = mediawiki.Parse(row.title, lang=row.main)
+            wiki._print_errors = False
+
+            if wiki.get_title(row.lang1) is False or wiki.get_title(row.lang2) is False:
+                titles1.append(None)
+                titles2.append(None)
+                shared.append(0)
+                continue
+
+            index.add_titles(wiki, title, row.main, [row.lang1, row.lang2])
+
+            for lang in [row.lang1, row.lang2]:
+                index.update(wiki, lang, refresh)
+
+            pages = [wiki.get_title(row.lang1), wiki.get_title(row.lang2)]
+
+        titles1.append(pages[0])
+        titles2.append(pages[1])
+        users = index.shared(row.lang1, pages[0], row.lang2, pages[1], whom)
+
+        # Bots are not extracted, so they are not counted either
+        if whom != 'anonymous':
+            users = [user for user in users if not re.search('bot', user, re.IGNORECASE) and not re.search('CommonsDelinker', user, re.IGNORECASE)]
+
+        shared.append(len(users))
+
+    df = df.copy()
+    df['title1'] = titles1
+    df['title2'] = titles2
+    df['shared'] = shared
+
+    return df.sort_values('shared', ascending=False, kind='mergesort')
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Index the users who contributed to Wikipedia articles and rank the articles by the number of users shared by both language versions.')
+
+    parser.add_argument('--input', metavar='input', type=str, required=True, help='Opens a csv file with articles from the specified path (see extract_edits.py).')
+    parser.add_argument('--index', metavar='index', type=str, required=True, help='Stores the contributor index to a sqlite database in the specified path.')
+    parser.add_argument('--output', metavar='output', type=str, default=None, help='Stores the ranked articles to a csv file in the specified path, which can be used as input of extract_edits.py (default: None).')
+    parser.add_argument('--usertype', choices=['registered', 'anonymous', 'all'], default='registered', help='Type of users that are counted (default: registered).')
+    parser.add_argument('--minimum', metavar='minimum', type=int, default=1, help='Only store articles with at least the specified number of shared users (default: 1).')
+    parser.add_argument('--refresh', action='store_true', help='Crawl the revisions made since each article was indexed.')
+    parser.add_argument('--api', metavar='api', type=str, default=None, help='Override the MediaWiki API with an URL template containing a {lang} placeholder (e.g., "http://localhost:8080/{lang}/w/api.php").')
+
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, sep=',', encoding='utf-8')
+    df.drop_duplicates(subset="title", keep='first', inplace=True)
+
+    mediawiki.Parse.configure(api=args.api)
+
+    index = ContributorIndex(args.index)
+    ranking = index_articles(index, df, args.usertype, args.refresh)
+    index.close()
+
+    print(ranking[['title', 'title1', 'title2', 'shared']].to_string(index=False))
+
+    if args.output is not None:
+        ranking[ranking.shared >= args.minimum].drop(columns=['title1', 'title2']).to_csv(args.output, sep=',', encoding='utf-8', index=False)
+
+if __name__ == "__main__":
+   main()
@@ -1,279 +1,683 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Tue Jan 21 10:14:14 2020
-
-@author: jdevreeze
-"""
-
-import sqlite3
-import argparse
-import pandas as pd
-
-from datetime import datetime, timedelta
-from dateutil.parser import parse
-from babel import languages
-
-def getJaccardSimilarity(str1, str2): 
-    a = set(str1.split()) 
-    b = set(str2.split())
-    c = a.intersection(b)
-    return float(len(c)) / (len(a) + len(b) - len(c))
-
-def create_context(edit, text, length = 500, seperator = ['<b>', '</b>'], overlap = 90):
-    """
-    Wrap context around an edit made by a user. 
-    
-    Use this method to extract the preceding and following defined number of characters from the main 
-    text. This method uses utf8 encoding, because otherwise Arabic, Hebrew, or Chinese texts won't be 
-    handled properly.
-
-    Args:
-        edit: The actual edit made by the user
-        text: The entire Wikipedia text in which the edit was made
-        length: The number of characters that is required to create context (default: 500)
-        seperator: A character to mark the beginning and end of the edit (default: ['<b>', '</b>'])
-        overlap: The level of text overlap required in case a 100% match is not found (default: 90)
-        
-    Returns:
-        A string with the context or None if there is no match.
-
-    """
-    split = text.rpartition(edit)
-        
-    # If there is no exact match between the edit and the text, try to find a closest match as possible
-    if not split[1]:
-        
-        prefix = suffix = ''        
-        edit_length = len(edit)
-
-        for i in range(100, (100 - overlap), -1):            
-            charlen = round(edit_length * ((i - 1) / 100))
-            index = text.find(edit[:charlen])
-            
-            if charlen is 0:
-                break
-
-            # We have a match
-            if index is not -1:
-                split = text.rpartition(edit[:charlen])             
-                prefix = split[0][-length:]
-                break
-        
-        for i in range(0, overlap, 1):            
-            charlen = round(edit_length * ((i + 1) / 100))
-            index = text.find(edit[charlen:])
-            
-            if charlen is 0:
-                break
-            
-            # We have a match
-            if index is not -1:
-                split = text.rpartition(edit[charlen:])                
-                suffix = split[2][:length]
-                break       
-
-        if len(prefix) is 0 and len(suffix) is 0:
-            return ''
-    
-    # We have a 100% match
-    else:
-        prefix = split[0][-length:]
-        suffix = split[2][:length]
-    
-    # Remove the first and last word from the predefined character length of context
-    prefix = ' '.join(prefix.split(' ')[1:])
-    suffix = ' '.join(suffix.split(' ')[:-1]) 
-    
-    # Add an ellipsis before and after the context if there is any context available
-    if len(prefix) is not 0:
-        prefix = ''.join(['...', prefix])
-    if len(suffix) is not 0:
-        suffix = ''.join([suffix, '...'])       
-    
-    context = ''.join([prefix, ''.join([seperator[0], edit, seperator[1]]), suffix])
-
-    return context
-
-def main():
-    
-    parser = argparse.ArgumentParser(description='Create a dataset with all valid and pre-processed edits.') 
-    
-    parser.add_argument('--input', metavar='input', type=str, required=True, help='Opens a csv file from the specified path.')
-    parser.add_argument('--output', metavar='output', type=str, required=True, help='Stores the extracted data to the specified path.')
-    parser.add_argument('--google', action='store_true', help='Specify if a cell with Google translate should be created.')
-    parser.add_argument('--date', metavar='date', type=str, default=None, help='The last date to include in the dataset (default None). The specified date should be in the "Y-m-d" format.')
-
-    args = parser.parse_args()
-       
-    # Open the sqlite database
-    db = sqlite3.connect(args.input)    
-    cursor = db.cursor()
-
-    date = datetime.now() if args.date is None else parse(args.date) + timedelta(hours=23, minutes=59, seconds=59) 
-    
-    # Validate the database
-    for table in ['articles', 'revisions', 'edits', 'authors']:
-        cursor.execute('''SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?''', (table,))
-        if cursor.fetchone()[0] != 1:
-        	raise ValueError('The specified database is not valid (i.e., not all required tables exist).')
-    
-    cursor.execute('''
-        SELECT DISTINCT
-            authors.name AS author,
-            authors.language AS tongue,
-            authors.country AS country,
-            authors.iso AS iso,
-            articles.parent_id AS parent,
-            articles.series AS series,
-            articles.title AS title,
-            articles.language AS language,
-            revisions.id AS identifier,
-            revisions.revision_id AS revision_id,
-            revisions.timestamp AS timestamp,
-            edits.id AS edit,
-            edits.updated_text AS updated,
-            edits.previous_text AS previous,
-            edits.size AS size
-        FROM
-            articles
-        INNER JOIN revisions ON revisions.article_id = articles.id
-        INNER JOIN authors ON authors.id = revisions.author_id
-        INNER JOIN edits ON edits.revision_id = revisions.id
-        WHERE articles.flag = 1
-            AND edits.flag = 1
-            AND revisions.timestamp <= ?
-        ORDER BY author
-    ''', (date,))
-    
-    df = pd.DataFrame(cursor.fetchall())
-    
-    df.columns = [
-        'Author', 
-        'Tongue', 
-        'Nationality', 
-        'ISO', 
-        'ParentID', 
-        'Series', 
-        'Title', 
-        'Language', 
-        'Identifier',
-        'RevisionId',
-        'Timestamp',
-        'EditId', 
-        'UpdatedText', 
-        'PreviousText', 
-        'Size'
-    ]
-    
-    # Add two new columns to the dataframe for the edits
-    df['ParentTitle'] = df['Type'] = df['CurrentEdit'] = df['PreviousEdit'] = df['Similarity'] = None
-    
-    # Iterate through all edits
-    for index, row in df.iterrows():
-
-        # Get the English title of the parent article
-        if row['ParentID'] is not 0:
-            parent_title = cursor.execute('''SELECT title FROM articles WHERE id = ?''', (row['ParentID'],)).fetchone()[0]
-        else:
-            parent_title = row['Title']
-        
-        df.at[index, 'ParentTitle'] = parent_title
-
-        language = pd.DataFrame(
-            cursor.execute('''SELECT language FROM articles WHERE series = ? AND flag = 1''', (row['Series'],)).fetchall()
-        )
-        
-        if row['ISO'] is not None:
-            tongue = languages.get_official_languages(row['ISO'], regional=False, de_facto=True)
-        else:
-            tongue = (row['Tongue'],)
-        
-        if len(language[language.iloc[:,0] == tongue[0]]) is not 0:            
-            
-            if len(row['UpdatedText']) is 0 and len(row['PreviousText']) is 0:
-                edit_type = 0             
-            if len(row['UpdatedText']) is not 0 and len(row['PreviousText']) is 0:
-                edit_type = 1         
-            if len(row['UpdatedText']) is not 0 and len(row['PreviousText']) is not 0:
-                edit_type = 2         
-            if len(row['UpdatedText']) is 0 and len(row['PreviousText']) is not 0:
-                edit_type = 3    
-
-            # Content is added (Create)
-            if edit_type is 1:            
-                revision = cursor.execute('''SELECT content FROM revisions WHERE id = ?''', (row['Identifier'],)).fetchone()[0]
-                df.at[index, 'CurrentEdit'] = create_context(row['UpdatedText'], revision)
-                df.at[index, 'Similarity'] = 0
-
-            # Content is revised (Update)    
-            if edit_type is 2:            
-                revision = cursor.execute('''SELECT content, previous FROM revisions WHERE id = ?''', (row['Identifier'],)).fetchone()
-                current_edit = create_context(row['UpdatedText'], revision[0])
-                previous_edit = create_context(row['PreviousText'], revision[1])
-                if len(current_edit) == 0 or len(previous_edit) == 0:
-                    continue
-                else:
-                    df.at[index, 'CurrentEdit'] = current_edit
-                    df.at[index, 'PreviousEdit'] = previous_edit
-                    df.at[index, 'Similarity'] = getJaccardSimilarity(df.at[index, 'CurrentEdit'], df.at[index, 'PreviousEdit'])
-
-            # Content is removed (Delete)  
-            if edit_type is 3:
-                revision = cursor.execute('''SELECT previous FROM revisions WHERE id = ?''', (row['Identifier'],)).fetchone()[0]
-                df.at[index, 'PreviousEdit'] = create_context(row['PreviousText'], revision) 
-                df.at[index, 'Similarity'] = 0
-            
-            df.at[index, 'Type'] = edit_type  
-
-    df = df.drop('Identifier', 1)
-
-    # Select only meaningfull edits
-    selection = df[(df.CurrentEdit.notnull()) | (df.PreviousEdit.notnull())]
-    selection = selection[(selection.Size > 2) & (selection.Similarity < 1)]
-
-    # Select only edits that are made on both language versions
-    exclude = []
-
-    # Iterate through all conflicts
-    for i in selection.Series.unique():
-        conflict = selection[(selection.Series == i)]
-
-        # Iterate through all authors within the current conflict
-        for j in conflict.Author.unique():
-            author = conflict[(conflict.Author == j)]
-
-            # Select only the authors within this conflict that edited two language versions
-            if len(author.Language.unique()) is not 2:
-                for k in author.EditId:
-                    exclude.append(k)
-                
-    # List of all edits in two languages made by one author
-    excluded = selection.loc[~selection['EditId'].isin(exclude)]
-    excluded = excluded[excluded.CurrentEdit.notna()]
-
-    # Add a Google translate column
-    if args.google is True:
-        i = 2    
-        for index, row in excluded.iterrows():
-            if row['Language'] not in ['en', 'sco']:
-                if row['CurrentEdit'] is not None:
-                    excluded.at[index, 'Translate 1'] = '=GOOGLETRANSLATE(Q{}, "{}", "en")'.format(i, row['Language'])
-                if row['PreviousEdit'] is not None:
-                    excluded.at[index, 'Translate 2'] = '=GOOGLETRANSLATE(R{}, "{}", "en")'.format(i, row['Language'])
-            i += 1
-    
-    if args.output.split('.')[-1] == 'xlsx':
-        try:
-            writer = pd.ExcelWriter(args.output)
-            excluded.to_excel(writer,'Sheet1', index=False)
-            writer.save()
-        except:
-            raise ValueError('Unable to save the data as an Excel format.')
-    else:
-        try:
-            df.to_csv(args.output, sep=';', encoding='utf-8', index=False)
-        except:
-            raise ValueError('Unable to save the data as an CSV format.')
-    
-if __name__ == "__main__": 
-   main() 
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Jan 21 10:14:14 2020
+
+@author: jdevreeze
+"""
+
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+import database
+import instrument
+import locator
+import migrations
+
+from collections import deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import takewhile
+from dateutil.parser import parse
+from babel import languages
+
+def getJaccardSimilarity(str1, str2): 
+    a = set(str1.split()) 
+    b = set(str2.split())
+    c = a.intersection(b)
+    return float(len(c)) / (len(a) + len(b) - len(c))
+
+def create_context(edit, text, length = 500, seperator = ['<b>', '</b>'], overlap = 90, finder = None):
+    """
+    Wrap context around an edit made by a user. 
+    
+    Use this method to extract the preceding and following defined number of characters from the main 
+    text. This method uses utf8 encoding, because otherwise Arabic, Hebrew, or Chinese texts won't be 
+    handled properly.
+
+    Args:
+        edit: The actual edit made by the user
+        text: The entire Wikipedia text in which the edit was made
+        length: The number of characters that is required to create context (default: 500)
+        seperator: A character to mark the beginning and end of the edit (default: ['<b>', '</b>'])
+        overlap: The level of text overlap required in case a 100% match is not found (default: 90)
+        finder: A locator.Locator of the text, which is shared by all edits of a revision (default: None)
+        
+    Returns:
+        A string with the context or None if there is no match.
+
+    """
+    split = text.rpartition(edit)
+        
+    # If there is no exact match between the edit and the text, try to find a closest match as possible
+    if not split[1]:
+        
+        prefix = suffix = ''        
+        edit_length = len(edit)
+        
+        finder = finder if finder is not None else locator.Locator(text)
+        
+        # The longest prefix of at most 99% and at least 10% of the edit, and the longest 
+        # suffix of at most 99% and at least 10% of the edit, but only if it is not empty
+        lengths = list(takewhile(lambda charlen: charlen != 0, (round(edit_length * ((i - 1) / 100)) for i in range(100, (100 - overlap), -1))))
+        starts = list(takewhile(lambda charlen: charlen != 0, (round(edit_length * ((i + 1) / 100)) for i in range(0, overlap, 1))))
+        
+        # We have a match
+        match = finder.prefix(edit, lengths)
+        if match is not None:
+            prefix = finder.before(match, length)
+            
+        match = finder.suffix(edit, starts)
+        if match is not None:
+            suffix = finder.after(match, length)
+
+        if len(prefix) == 0 and len(suffix) == 0:
+            return ''
+    
+    # We have a 100% match
+    else:
+        prefix = split[0][-length:]
+        suffix = split[2][:length]
+    
+    # Remove the first and last word from the predefined character length of context
+    prefix = ' '.join(prefix.split(' ')[1:])
+    suffix = ' '.join(suffix.split(' ')[:-1]) 
+    
+    # Add an ellipsis before and after the context if there is any context available
+    if len(prefix) is not 0:
+        prefix = ''.join(['...', prefix])
+    if len(suffix) is not 0:
+        suffix = ''.join([suffix, '...'])       
+    
+    context = ''.join([prefix, ''.join([seperator[0], edit, seperator[1]]), suffix])
+
+    return context
+
+def article_titles(cursor):
+    """
+    Get the title of each article.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        
+    Returns:
+        A dict with the title of each article identifier.
+    """
+    
+    return dict(cursor.execute('''SELECT id, title FROM articles''').fetchall())
+
+def series_languages(cursor):
+    """
+    Get the languages of the flagged articles of each series.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        
+    Returns:
+        A pandas MultiIndex with the distinct pairs of series and language.
+    """
+    
+    rows = cursor.execute('''SELECT DISTINCT series, language FROM articles WHERE series IS NOT NULL AND language IS NOT NULL AND flag = 1''').fetchall()
+    
+    return pd.MultiIndex.from_arrays([[serie for serie, _ in rows], [language for _, language in rows]])
+
+@lru_cache(maxsize=None)
+def official_languages(iso):
+    """
+    Get the official languages of a country, which are looked up once for each country.
+    
+    Args:
+        iso: The ISO code of the country.
+        
+    Returns:
+        A tuple with the language codes.
+    """
+    
+    return languages.get_official_languages(iso, regional=False, de_facto=True)
+
+def edit_types(updated, previous):
+    """
+    Get the type of each edit.
+    
+    Args:
+        updated: A pandas Series with the updated texts of the edits.
+        previous: A pandas Series with the previous texts of the edits.
+        
+    Returns:
+        A numpy array with 0 if both texts are empty, 1 if content is added, 2 if content 
+        is revised, or 3 if content is removed.
+    """
+    
+    added = updated.str.len().to_numpy() != 0
+    removed = previous.str.len().to_numpy() != 0
+    
+    return np.where(added, np.where(removed, 2, 1), np.where(removed, 3, 0))
+
+def first_languages(df):
+    """
+    Get the first language of the author of each edit, which is the first official 
+    language of the country of an anonymous author.
+    
+    Args:
+        df: A dataframe with the ISO and Tongue columns.
+        
+    Returns:
+        A numpy array with the language codes.
+    """
+    
+    countries = {iso : official_languages(iso)[0] for iso in df['ISO'].dropna().unique()}
+    
+    return np.where(df['ISO'].notna().to_numpy(), df['ISO'].map(countries).to_numpy(), df['Tongue'].to_numpy())
+
+def selected_edits(selection):
+    """
+    Get the edits of authors who edited both language versions of a series.
+    
+    Args:
+        selection: A dataframe with the Series, Author, Language, and EditId columns.
+        
+    Returns:
+        A boolean pandas Series which is True for each selected edit.
+    """
+    
+    # The number of languages of each author in each series, which is missing if either is missing
+    counts = selection.groupby(['Series', 'Author'], sort=False)['Language'].transform('nunique', dropna=False)
+    
+    exclude = selection['EditId'][counts.notna() & (counts != 2)]
+    
+    return ~selection['EditId'].isin(exclude)
+
+def revision_texts(cursor, identifiers, batch=500):
+    """
+    Get the texts of several revisions, which are queried in batches.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        identifiers: A list with the identifiers of the revisions.
+        batch: The number of revisions in each query (default 500).
+        
+    Yields:
+        A tuple with the identifier, the text, and the previous text of each revision.
+    """
+    
+    for start in range(0, len(identifiers), batch):
+        
+        ids = identifiers[start:start + batch]
+        
+        yield from cursor.execute('''SELECT id, content, previous FROM revision_texts WHERE id IN (%s)''' % (', '.join('?' * len(ids))), ids).fetchall()
+
+# The columns of the exported edits, which are read from the database
+COLUMNS = [
+    'Author', 
+    'Tongue', 
+    'Nationality', 
+    'ISO', 
+    'ParentID', 
+    'Series', 
+    'Title', 
+    'Language', 
+    'Identifier',
+    'RevisionId',
+    'Timestamp',
+    'EditId', 
+    'UpdatedText', 
+    'PreviousText', 
+    'Size'
+]
+
+def query_edits(cursor, date, score=None):
+    """
+    Query all valid edits of the flagged articles, ordered by series.
+    
+    The articles are read in the order of their series, and the revisions of each article
+    are read with a range scan of their timestamps, so the edits of each series can be
+    read before the edits of the next series are sorted.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        date: A datetime with the last date to include.
+        score: The minimum quality score of the edits, or None to include all edits 
+            (default None).
+            
+    Returns:
+        The cursor, from which the rows with the columns in COLUMNS can be fetched.
+    """
+    
+    return cursor.execute('''
+        SELECT
+            authors.name AS author,
+            authors.language AS tongue,
+            authors.country AS country,
+            authors.iso AS iso,
+            articles.parent_id AS parent,
+            articles.series AS series,
+            articles.title AS title,
+            articles.language AS language,
+            revisions.id AS identifier,
+            revisions.revision_id AS revision_id,
+            revisions.timestamp AS timestamp,
+            edits.id AS edit,
+            edits.updated_text AS updated,
+            edits.previous_text AS previous,
+            edits.size AS size
+        FROM
+            articles
+        CROSS JOIN revisions ON revisions.article_id = articles.id
+        CROSS JOIN edits ON edits.revision_id = revisions.id
+        CROSS JOIN authors ON authors.id = revisions.author_id
+        WHERE articles.flag = 1
+            AND edits.flag = 1
+            AND revisions.timestamp <= ? %s
+        ORDER BY series, author, edit
+    ''' % ('''''' if score is None else '''AND edits.score >= ?'''), (date.isoformat(' '),) + (() if score is None else (score,)))
+
+def series_chunks(cursor, size=50000):
+    """
+    Fetch the queried edits in chunks which each contain all edits of one or more series.
+    
+    Args:
+        cursor: A sqlite3 cursor with the query of the edits (see query_edits).
+        size: The number of edits which are fetched at once. A chunk is larger if a single
+            series has more edits (default 50000).
+            
+    Yields:
+        A list with the rows of the edits.
+    """
+    
+    position = COLUMNS.index('Series')
+    rows = []
+    
+    while True:
+        
+        batch = cursor.fetchmany(size)
+        
+        if not batch:
+            if rows:
+                yield rows
+            return
+        
+        rows.extend(batch)
+        
+        # The edits of the last series may continue in the next batch
+        split = len(rows)
+        
+        while split > 0 and rows[split - 1][position] == rows[-1][position]:
+            split -= 1
+            
+        if split > 0:
+            yield rows[:split]
+            rows = rows[split:]
+
+def add_context(df, cursor, titles, series):
+    """
+    Add the type, the context, and the similarity of each edit.
+    
+    Args:
+        df: A dataframe with the edits, with the columns in COLUMNS.
+        cursor: A sqlite3 cursor of the extraction database.
+        titles: A dict with the title of each article (see article_titles).
+        series: The pairs of series and language (see series_languages).
+        
+    Returns:
+        The dataframe with the ParentTitle, Type, CurrentEdit, PreviousEdit, and Similarity
+        columns, and without the Identifier column.
+    """
+    
+    current = [None] * len(df)
+    previous = [None] * len(df)
+    similarity = [None] * len(df)
+    
+    # Get the English title of the parent article
+    parents = [title if parent == 0 else titles.get(parent) for parent, title in zip(df['ParentID'], df['Title'])]
+    
+    # Only edits in the first language of the author are used
+    eligible = pd.MultiIndex.from_arrays([pd.Index(df['Series'], dtype=object), first_languages(df)]).isin(series)
+    kinds = edit_types(df['UpdatedText'], df['PreviousText'])
+    
+    types = pd.Series(kinds, dtype=object).where(eligible, None).tolist()
+    
+    # The edits that require the revision texts, grouped by revision
+    positions = np.nonzero(eligible & (kinds != 0))[0]
+    revisions = pd.Series(positions).groupby(df['Identifier'].to_numpy()[positions]).apply(list).to_dict() if len(positions) else {}
+    
+    # Each revision text is loaded once for all its edits
+    for identifier, content, text in revision_texts(cursor, sorted(revisions)):
+        
+        current_text, previous_text = locator.Locator(content), locator.Locator(text)
+        
+        for i in revisions[identifier]:
+            
+            # Content is added (Create)
+            if types[i] == 1:
+                current[i] = create_context(df['UpdatedText'].iat[i], content, finder=current_text)
+                similarity[i] = 0
+                
+            # Content is revised (Update)
+            if types[i] == 2:
+                current_edit = create_context(df['UpdatedText'].iat[i], content, finder=current_text)
+                previous_edit = create_context(df['PreviousText'].iat[i], text, finder=previous_text)
+                if len(current_edit) == 0 or len(previous_edit) == 0:
+                    types[i] = None
+                else:
+                    current[i] = current_edit
+                    previous[i] = previous_edit
+                    similarity[i] = getJaccardSimilarity(current_edit, previous_edit)
+                    
+            # Content is removed (Delete)
+            if types[i] == 3:
+                previous[i] = create_context(df['PreviousText'].iat[i], text, finder=previous_text)
+                similarity[i] = 0
+                
+    df['ParentTitle'] = pd.Series(parents, index=df.index, dtype=object)
+    df['Type'] = pd.Series(types, index=df.index, dtype=object)
+    df['CurrentEdit'] = pd.Series(current, index=df.index, dtype=object)
+    df['PreviousEdit'] = pd.Series(previous, index=df.index, dtype=object)
+    df['Similarity'] = pd.Series(similarity, index=df.index, dtype=object)
+    
+    return df.drop(columns='Identifier')
+
+def select_edits(df):
+    """
+    Select the meaningful edits of authors who edited both language versions of a series.
+    
+    Args:
+        df: A dataframe with the edits (see add_context).
+        
+    Returns:
+        A dataframe with the selected edits.
+    """
+    
+    # Select only meaningfull edits
+    selection = df[(df.CurrentEdit.notnull()) | (df.PreviousEdit.notnull())]
+    selection = selection[(selection.Size > 2) & (selection.Similarity < 1)]
+    
+    # List of all edits in two languages made by one author
+    excluded = selection.loc[selected_edits(selection)]
+    
+    return excluded[excluded.CurrentEdit.notna()]
+
+# The read-only connection and the lookups of each process that adds the context of edits
+reader = None
+lookups = None
+
+def open_reader(path):
+    """
+    Open the read-only connection of a process that adds the context of edits, and load
+    the titles and the languages of the series once for all chunks of the process.
+    
+    Args:
+        path: The path of the sqlite database.
+    """
+    
+    global reader, lookups
+    
+    reader = database.connect(path, readonly=True)
+    lookups = (article_titles(reader.cursor()), series_languages(reader.cursor()))
+    
+def process_edits(rows, cursor=None, titles=None, series=None, metrics=None):
+    """
+    Add the context of a chunk of edits and select the meaningful edits.
+    
+    Args:
+        rows: A list with the rows of the edits (see series_chunks).
+        cursor: A sqlite3 cursor of the extraction database, or None to use the connection
+            of the process (see open_reader) (default None).
+        titles: A dict with the title of each article, or None to use the lookups of the 
+            process (default None).
+        series: The pairs of series and language, or None to use the lookups of the 
+            process (default None).
+        metrics: A Metrics instance (default None).
+        
+    Returns:
+        A tuple with a dataframe with all edits and a dataframe with the selected edits.
+    """
+    
+    metrics = metrics if metrics is not None else instrument.Metrics('create_dataset')
+    
+    if cursor is None:
+        cursor = reader.cursor()
+        titles, series = lookups
+        
+    df = pd.DataFrame(rows, columns=COLUMNS, dtype=object)
+    
+    with metrics.stage('context', rows=len(df)):
+        df = add_context(df, cursor, titles, series)
+        
+    with metrics.stage('selection'):
+        excluded = select_edits(df)
+        
+    return df, excluded
+
+def process_chunks(chunks, cursor, titles, series, metrics, pool=None, pending=2):
+    """
+    Add the context of each chunk of edits and select the meaningful edits, either in this
+    process or by a pool of processes (see open_reader).
+    
+    With a pool, the chunks are read by this process and several chunks are processed at
+    once, but the results are yielded in the order of the chunks. The dataset is therefore
+    the same as the dataset which is created by a single process.
+    
+    Args:
+        chunks: An iterator with the chunks of edits (see series_chunks).
+        cursor: A sqlite3 cursor of the extraction database.
+        titles: A dict with the title of each article (see article_titles).
+        series: The pairs of series and language (see series_languages).
+        metrics: A Metrics instance.
+        pool: A multiprocessing pool, or None to process the chunks in this process 
+            (default None).
+        pending: The maximum number of chunks which are processed by the pool at once 
+            (default 2).
+            
+    Yields:
+        A tuple with a dataframe with all edits and a dataframe with the selected edits.
+    """
+    
+    results = deque()
+    
+    while True:
+        
+        with metrics.stage('query') as stage:
+            rows = next(chunks, None)
+            stage.count('query', rows=len(rows) if rows is not None else 0)
+            
+        if rows is not None and pool is None:
+            yield process_edits(rows, cursor, titles, series, metrics)
+            continue
+            
+        if rows is not None:
+            results.append(pool.apply_async(process_edits, (rows,)))
+            
+        # Wait for the first chunk once the pool is busy, or when all chunks are read
+        while results and (rows is None or len(results) >= pending):
+            
+            with metrics.stage('context') as stage:
+                df, excluded = results.popleft().get()
+                stage.count('context', rows=len(df))
+                
+            yield df, excluded
+            
+        if rows is None:
+            return
+            
+def add_translations(excluded, start=2):
+    """
+    Add the Google translate cells of the edits which are not in English.
+    
+    Args:
+        excluded: A dataframe with the selected edits.
+        start: The row of the first edit in the spreadsheet (default 2).
+        
+    Returns:
+        The dataframe with the Translate 1 and Translate 2 columns.
+    """
+    
+    excluded = excluded.copy()
+    
+    rows = range(start, start + len(excluded))
+    foreign = ~excluded['Language'].isin(['en', 'sco']).to_numpy()
+    
+    excluded['Translate 1'] = [
+        '=GOOGLETRANSLATE(Q{}, "{}", "en")'.format(i, language) if translate and edit is not None else None 
+        for i, language, edit, translate in zip(rows, excluded['Language'], excluded['CurrentEdit'], foreign)
+    ]
+    excluded['Translate 2'] = [
+        '=GOOGLETRANSLATE(R{}, "{}", "en")'.format(i, language) if translate and edit is not None else None 
+        for i, language, edit, translate in zip(rows, excluded['Language'], excluded['PreviousEdit'], foreign)
+    ]
+    
+    return excluded
+
+class Output:
+    """
+    Dataset which is saved as an Excel or CSV file in parts.
+    
+    The Excel file contains the selected edits, whereas the CSV file contains all edits.
+    Each part is appended to the file, so only a single part is kept in memory (except 
+    the Excel workbook, which is kept in memory until it is closed).
+    """
+    
+    def __init__(self, output):
+        """
+        Create the dataset.
+        
+        Args:
+            output: The path of the dataset. The format depends on the file extension.
+            
+        Raises:
+            ValueError: If the file can not be created.
+        """
+        
+        self._output = output
+        self._excel = output.split('.')[-1] == 'xlsx'
+        self._writer = None
+        self._rows = 0
+        self._selected = 0
+        
+        if self._excel is True:
+            try:
+                self._writer = pd.ExcelWriter(output)
+            except:
+                raise ValueError('Unable to save the data as an Excel format.')
+                
+    @property
+    def rows(self):
+        return self._rows
+    
+    @property
+    def selected(self):
+        return self._selected
+    
+    def write(self, df, excluded):
+        """
+        Append edits to the dataset.
+        
+        Args:
+            df: A dataframe with all edits.
+            excluded: A dataframe with the selected edits.
+            
+        Raises:
+            ValueError: If the edits can not be saved.
+        """
+        
+        if self._excel is True:
+            try:
+                excluded.to_excel(self._writer, sheet_name='Sheet1', index=False, header=self._selected == 0, startrow=self._selected + 1 if self._selected else 0)
+            except:
+                raise ValueError('Unable to save the data as an Excel format.')
+        else:
+            try:
+                df.to_csv(self._output, sep=';', encoding='utf-8', index=False, header=self._rows == 0, mode='w' if self._rows == 0 else 'a')
+            except:
+                raise ValueError('Unable to save the data as an CSV format.')
+                
+        self._rows += len(df)
+        self._selected += len(excluded)
+        
+    def close(self):
+        
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except:
+                raise ValueError('Unable to save the data as an Excel format.')
+
+def main():
+    
+    parser = argparse.ArgumentParser(description='Create a dataset with all valid and pre-processed edits.') 
+    
+    parser.add_argument('--input', metavar='input', type=str, required=True, help='Opens a csv file from the specified path.')
+    parser.add_argument('--output', metavar='output', type=str, required=True, help='Stores the extracted data to the specified path.')
+    parser.add_argument('--google', action='store_true', help='Specify if a cell with Google translate should be created.')
+    parser.add_argument('--date', metavar='date', type=str, default=None, help='The last date to include in the dataset (default None). The specified date should be in the "Y-m-d" format.')
+    parser.add_argument('--score', metavar='score', type=float, default=None, help='Only include edits with at least the specified quality score (see data_cleaning.py --score). Unless the model is trained on coded edits (see quality.py --labels), the score only reflects the filter of data_cleaning.py (default: None).')
+    parser.add_argument('--workers', metavar='workers', type=int, default=1, help='The number of processes which add the context of the edits. Each process reads the revision texts of a chunk of series at once (default: 1).')
+    parser.add_argument('--chunk', metavar='chunk', type=int, default=50000, help='The number of edits which are processed at once. All edits of a series are processed together, so a chunk can be larger (default: 50000).')
+
+    instrument.add_arguments(parser)
+
+    args = parser.parse_args()
+    
+    metrics = instrument.Metrics.from_arguments('create_dataset', args)
+       
+    # Open the sqlite database
+    db = database.connect(args.input)    
+    cursor = db.cursor()
+
+    date = datetime.now() if args.date is None else parse(args.date) + timedelta(hours=23, minutes=59, seconds=59) 
+    
+    # Validate the database
+    for table in ['articles', 'revisions', 'edits', 'authors']:
+        cursor.execute('''SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?''', (table,))
+        if cursor.fetchone()[0] != 1:
+        	raise ValueError('The specified database is not valid (i.e., not all required tables exist).')
+    
+    # Upgrade the database to the latest schema version
+    migrations.migrate(db)
+    
+    with metrics.stage('lookup'):
+        titles = article_titles(cursor)
+        series = series_languages(cursor)
+        
+    # The edits are read, processed, and saved for a few series at a time
+    chunks = series_chunks(query_edits(db.cursor(), date, args.score), args.chunk)
+    output = Output(args.output)
+    
+    # Each process reads the revision texts with its own read-only connection
+    pool = multiprocessing.Pool(args.workers, initializer=open_reader, initargs=(args.input,)) if args.workers > 1 else None
+    
+    try:
+        
+        for df, excluded in process_chunks(chunks, cursor, titles, series, metrics, pool, args.workers * 2):
+            
+            metrics.count('selection', rows=len(excluded))
+            
+            # Add a Google translate column
+            if args.google is True:
+                excluded = add_translations(excluded, output.selected + 2)
+                
+            with metrics.stage('export', rows=len(excluded)):
+                output.write(df, excluded)
+                
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            
+    # A dataset without edits is still saved with all its columns
+    if output.rows == 0:
+        
+        df, excluded = process_edits([], cursor, titles, series, metrics)
+        
+        if args.google is True:
+            excluded = add_translations(excluded)
+            
+        output.write(df, excluded)
+        
+    output.close()
+    db.close()
+    
+    metrics.save()
+    
+if __name__ == "__main__": 
+   main() 
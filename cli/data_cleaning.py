@@ -1,161 +1,415 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Wed Jan 15 15:16:06 2020
-
-@author: jdevreeze
-@todo: Implement a pre-trained anomaly model for the extraction of meaningful edits
-"""
-
-import pandas as pd
-import geoip2.database
-import sqlite3
-import argparse
-import textwrap
-import math
-
-def main():
-    
-    parser = argparse.ArgumentParser(description='Clean all extracted Wikipedia data in the sqlite database.') 
-    
-    parser.add_argument('--sqlite', metavar='output', type=str, required=True, help='Open the sqlite database from the specified path.')
-    parser.add_argument('--users', metavar='users', type=str, default=False, help='Specify a dataset with nationality and native language for each user (default: False).')
-    parser.add_argument('--filter', metavar='filter', choices=range(1, 6), type=int, default=1, help='Apply a filter to extract meaningful edits. Specify the number of samples that should be used (default: 1)')
-
-    args = parser.parse_args()
-
-    # Open the sqlite database
-    db = sqlite3.connect(args.sqlite)    
-    cursor = db.cursor()
-    
-    # Validate the database
-    for table in ['articles', 'revisions', 'edits', 'authors']:
-        cursor.execute('''SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?''', (table,))
-        if cursor.fetchone()[0] != 1:
-        	raise ValueError('The specified database is not valid (i.e., not all required tables exist).')
-    
-    
-    if args.users is False:
-        skip = True
-    if args.users == 'anonymous':
-        try:            
-            df = geoip2.database.Reader('../models/GeoLite2-Country.mmdb')
-            skip = False 
-        except:
-            raise ValueError('Can not open a valid GeoLite2 Country model. Make sure you have specified the correct filename.')
-    else:
-        try:         
-            df = pd.read_csv(args.users, sep=';', encoding='utf-8')
-            skip = False
-            # Validate the dataframe
-            if False in [True if c in df.columns else False for c in ['Author', 'First Language', 'Country', 'Certain']]:
-                raise ValueError('The specified dataframe is not valid (i.e., not all required columns exist).')
-        except:
-            raise ValueError('Can not open the specified user dataset. Make sure you have specified the correct filename.')
-
-    # Set to which series each article belongs
-    try:
-        cursor.execute('''ALTER TABLE articles ADD COLUMN series INTEGER''')
-    except:
-        pass
-    
-    parents = cursor.execute('''SELECT id, title FROM articles WHERE parent_id = 0''').fetchall()
-    
-    for i, parent in enumerate(parents, 1):
-        
-        identifier = []
-        identifier.append(parent[0])
-        
-        children = cursor.execute('''SELECT id FROM articles WHERE parent_id = ?''', (parent[0],)).fetchall()
-
-        for child in children:        
-            identifier.append(child[0])
-        
-        cursor.execute('''UPDATE articles SET series = ? WHERE (id BETWEEN ? AND ?)''', ((i), identifier[0], identifier[-1],))
-        
-    # Add nationality from the user dataset to the authors table
-    try:
-        cursor.execute('''ALTER TABLE authors ADD COLUMN usertype STRING''')
-    except:
-        pass
-    
-    try:
-        cursor.execute('''ALTER TABLE authors ADD COLUMN flag BOOLEAN''')
-    except:
-        pass
-    
-    try:
-        cursor.execute('''ALTER TABLE authors ADD COLUMN iso STRING''')
-    except:
-        pass
-    
-    if skip is True:
-        print('Skipping user data because no user type is specified.')
-    else:
-        if isinstance(df, pd.DataFrame):      
-            for index, row in df.iterrows():
-                cursor.execute('''
-                UPDATE authors 
-                SET language = ?, country = ?, usertype = 'registered', flag = ? 
-                WHERE name = ?
-                ''', (row['First Language'], row['Country'], math.floor(row['Certain']), row['Author'], ))
-            
-            print('Updated %d registered users' % (len(df)))
-        
-        else:        
-            users = cursor.execute('''SELECT name FROM authors''').fetchall()        
-            for user in users:
-                cursor.execute('''
-                UPDATE authors 
-                SET country = ?, usertype = 'anonymous', flag = 1, iso = ? 
-                WHERE name = ?
-                ''', (df.country(user[0]).country.name , df.country(user[0]).country.iso_code, user[0],))
-            
-            print('Updated %d anonymous users' % (len(users)))
-    
-    # Filter all edits which are not in the revision (i.e., metadata)
-    try:
-        cursor.execute('''ALTER TABLE edits ADD COLUMN flag BOOLEAN''')
-    except:
-        pass
-    
-    cursor.execute('''UPDATE edits SET flag = 0''')    
-    cursor.execute('''SELECT DISTINCT edits.id, edits.updated_text, revisions.content FROM edits INNER JOIN revisions ON revisions.id = edits.revision_id''')
-    
-    rows = cursor.fetchall()
-
-    for row in rows:
-        
-        valid = False
-        
-        # No filter
-        if args.filter is 1:
-        
-            if row[1] in row[2]:
-                if row[1].isspace() is not True and len(row[1]) > 1:    
-                    valid = True
-        
-        else: 
-            samples = textwrap.wrap(row[1], math.ceil(len(row[1])/args.filter))
-            minimum = 0
-            
-            # Check of each sample is in the revision text
-            for sample in samples:
-                if sample in row[2]:
-                    minimum += 1
-                    
-            # If more than half of the samples are in the revisions it is valid
-            if minimum >= (args.filter/2):
-                if row[1].isspace() is not True and len(row[1]) > 1:    
-                    valid = True
-                
-        if valid is True:        
-            cursor.execute('''UPDATE edits SET flag = 1 WHERE id = ?''', (row[0],))
-            
-            
-    cursor.execute('''SELECT COUNT(*) FROM edits WHERE flag = 1''')
-    print('Updated %d valid edits' % (len(rows)))
-    db.commit()
-    db.close()    
-    
-if __name__ == "__main__": 
-   main() 
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Jan 15 15:16:06 2020
+
+@author: jdevreeze
+"""
+
+import pandas as pd
+import argparse
+import hashlib
+import textwrap
+import math
+import multiprocessing
+
+import database
+import geoip
+import instrument
+import matcher
+import migrations
+import quality
+
+from functools import partial
+from itertools import groupby
+
+def is_valid(text, content, samples=1):
+    """
+    Check whether an edit is part of the revision text, so it is not metadata.
+    
+    Args:
+        text: A string with the updated text of the edit.
+        content: A string with the revision text.
+        samples: The number of samples of the edit that are compared with the revision text.
+            When larger than 1, the edit is valid if at least half of the samples are in the
+            revision text (default 1).
+            
+    Returns:
+        True if the edit is valid, otherwise False.
+    """
+    
+    if text.isspace() is True or len(text) <= 1:
+        return False
+    
+    # No filter
+    if samples == 1:
+        return text in content
+    
+    minimum = 0
+    
+    # Check of each sample is in the revision text
+    for sample in textwrap.wrap(text, math.ceil(len(text) / samples)):
+        if sample in content:
+            minimum += 1
+            
+    # If more than half of the samples are in the revisions it is valid
+    return minimum >= (samples / 2)
+
+def valid_edits(edits, content, samples=1, native=True):
+    """
+    Get the valid edits of a revision (see is_valid).
+    
+    The samples of all edits are located in the revision text at once with a single
+    Aho-Corasick automaton, instead of searching the text for each sample separately.
+    
+    Args:
+        edits: A list with tuples of the identifier and the updated text of each edit.
+        content: A string with the revision text.
+        samples: The number of samples of each edit (default 1).
+        native: Use the pyahocorasick package if it is installed (default True).
+        
+    Returns:
+        A list with the identifiers of the valid edits.
+    """
+    
+    candidates = []
+    
+    for identifier, text in edits:
+        
+        if text.isspace() is True or len(text) <= 1:
+            continue
+        
+        candidates.append((identifier, [text] if samples == 1 else textwrap.wrap(text, math.ceil(len(text) / samples))))
+        
+    found = matcher.Automaton((pattern for _, patterns in candidates for pattern in patterns), native).find(content)
+    
+    if samples == 1:
+        return [identifier for identifier, patterns in candidates if patterns[0] in found]
+    
+    return [identifier for identifier, patterns in candidates if sum(1 for pattern in patterns if pattern in found) >= (samples / 2)]
+
+# The read-only connection of each process that filters edits
+reader = None
+
+# The maximum number of parameters of a query, which is 999 in SQLite before 3.32
+MAX_VARIABLES = 999
+
+def open_reader(path):
+    """
+    Open the read-only connection of a process that filters edits.
+    
+    Args:
+        path: The path of the sqlite database.
+    """
+    
+    global reader
+    reader = database.connect(path, readonly=True)
+
+def flag_revisions(identifiers, samples=1, db=None):
+    """
+    Get the valid edits of a shard of revisions.
+    
+    Each revision text is loaded once and compared with all its edits. A shard with more
+    revisions than the maximum number of query parameters is loaded in several parts.
+    
+    Args:
+        identifiers: A list with the identifiers of the revisions.
+        samples: The number of samples of each edit (see is_valid) (default 1).
+        db: A sqlite3 connection with the extraction database, or None to use the 
+            read-only connection of the process (default None).
+            
+    Returns:
+        A tuple with the number of checked edits and a list with the identifiers of the 
+        valid edits.
+    """
+    
+    db = db if db is not None else reader
+    
+    texts = {}
+    edits = []
+    
+    for start in range(0, len(identifiers), MAX_VARIABLES):
+        
+        ids = list(identifiers[start:start + MAX_VARIABLES])
+        
+        texts.update(db.execute('''SELECT id, content FROM revision_texts WHERE id IN (%s)''' % (', '.join('?' * len(ids))), ids).fetchall())
+        edits.extend(db.execute('''SELECT id, revision_id, updated_text FROM edits WHERE revision_id IN (%s) ORDER BY revision_id, id''' % (', '.join('?' * len(ids))), ids).fetchall())
+    
+    # All edits of a revision are located in its text in a single pass, unless only the 
+    # automaton in Python is available, which is slower than separate searches
+    if matcher.ahocorasick is not None:
+        
+        flags = []
+        
+        for revision_id, group in groupby(edits, key=lambda edit: edit[1]):
+            flags.extend(valid_edits([(edit[0], edit[2]) for edit in group], texts[revision_id] or '', samples))
+            
+    else:
+        flags = [identifier for identifier, revision_id, text in edits if is_valid(text, texts[revision_id] or '', samples)]
+        
+    return len(edits), flags
+
+def filter_edits(db, samples=1, batch=100, metrics=None, rebuild=True, workers=1):
+    """
+    Flag all edits which are part of their revision text.
+    
+    The revisions are split in shards of consecutive revisions, so only the texts and edits 
+    of a single shard are kept in memory. The shards are either filtered by this connection, 
+    or by a pool of processes which each read the database through a read-only connection. 
+    All flags are written by this connection in a single transaction, which is committed by
+    the caller.
+    
+    Each edit records the number of samples with which it was cleaned, so an incremental 
+    run only checks the revisions of edits that are new or were cleaned with a different 
+    number of samples.
+    
+    Args:
+        db: A sqlite3 connection with the extraction database.
+        samples: The number of samples of each edit (see is_valid) (default 1).
+        batch: The number of revisions in each shard (default 100).
+        metrics: A Metrics instance (default None).
+        rebuild: Check all edits, otherwise only the edits which are not cleaned with the
+            same number of samples yet (default True).
+        workers: The number of processes which filter the edits (default 1).
+        
+    Returns:
+        A tuple with the number of checked edits and the number of valid edits.
+    
+    Raises:
+        ValueError: If several processes are used for a database which is not stored in a file.
+    """
+    
+    metrics = metrics if metrics is not None else instrument.Metrics('data_cleaning')
+    
+    pending = '''''' if rebuild is True else '''WHERE cleaned IS NULL OR cleaned != %d''' % (samples)
+    
+    cursor = db.cursor()
+    
+    with metrics.stage('query'):
+        identifiers = [row[0] for row in cursor.execute('''SELECT DISTINCT revision_id FROM edits %s ORDER BY revision_id''' % (pending)).fetchall()]
+        
+    cursor.execute('''UPDATE edits SET flag = 0, cleaned = ? %s''' % (pending), (samples,))
+    
+    shards = [identifiers[start:start + batch] for start in range(0, len(identifiers), batch)]
+    
+    if workers > 1:
+        
+        path = cursor.execute('''PRAGMA database_list''').fetchone()[2]
+        
+        if not path:
+            raise ValueError('Edits can only be filtered by several processes in a database which is stored in a file.')
+        
+        # The workers only see committed data, which does not include the flags reset above
+        pool = multiprocessing.Pool(workers, initializer=open_reader, initargs=(path,))
+        results = pool.imap(partial(flag_revisions, samples=samples), shards)
+        
+    else:
+        pool = None
+        results = (flag_revisions(shard, samples, db) for shard in shards)
+    
+    checked = 0
+    valid = 0
+    
+    try:
+        
+        while True:
+            
+            with metrics.stage('filter') as stage:
+                
+                result = next(results, None)
+                
+                if result is None:
+                    break
+                
+                stage.count('filter', rows=result[0])
+                
+            with metrics.stage('update', rows=len(result[1])):
+                cursor.executemany('''UPDATE edits SET flag = 1 WHERE id = ?''', [(identifier,) for identifier in result[1]])
+                
+            checked += result[0]
+            valid += len(result[1])
+            
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            
+    return checked, valid
+
+def assign_series(cursor, rebuild=True):
+    """
+    Set to which series each article belongs. The series of a parent article and its 
+    translations is the position of the parent article.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        rebuild: Assign all series, otherwise only the series of articles without a series
+            (default True).
+            
+    Returns:
+        The number of articles of which the series is assigned.
+    """
+    
+    cursor.execute('''DROP TABLE IF EXISTS temp.series''')
+    cursor.execute('''CREATE TEMP TABLE series(id INTEGER PRIMARY KEY, series INTEGER)''')
+    cursor.execute('''INSERT INTO temp.series(id, series) SELECT id, ROW_NUMBER() OVER (ORDER BY id) FROM articles WHERE parent_id = 0''')
+    
+    cursor.execute('''
+        UPDATE articles SET series = (
+            SELECT temp.series.series FROM temp.series 
+            WHERE temp.series.id = CASE WHEN articles.parent_id = 0 THEN articles.id ELSE articles.parent_id END
+        ) %s
+    ''' % ('''''' if rebuild is True else '''WHERE series IS NULL'''))
+    
+    assigned = cursor.rowcount
+    
+    cursor.execute('''DROP TABLE IF EXISTS temp.series''')
+    
+    return assigned
+
+def update_users(cursor, df, signature=None):
+    """
+    Store the first language, the country, and the certainty of registered users.
+    
+    The user dataset is loaded in a temporary table first, after which all authors are 
+    updated in a single statement. When a user occurs more than once, the last row is used.
+    
+    Args:
+        cursor: A sqlite3 cursor of the extraction database.
+        df: A dataframe with the Author, First Language, Country, and Certain columns.
+        signature: Only update authors which are not cleaned with this signature, or all
+            authors if None (default None).
+            
+    Returns:
+        The number of updated authors.
+    """
+    
+    users = zip(df['Author'].tolist(), df['First Language'].tolist(), df['Country'].tolist(), [math.floor(certain) for certain in df['Certain'].tolist()])
+    
+    cursor.execute('''DROP TABLE IF EXISTS temp.users''')
+    cursor.execute('''CREATE TEMP TABLE users(name TEXT PRIMARY KEY, language TEXT, country TEXT, flag INTEGER)''')
+    cursor.executemany('''INSERT OR REPLACE INTO temp.users(name, language, country, flag) VALUES(?, ?, ?, ?)''', users)
+    
+    cursor.execute('''
+        UPDATE authors SET
+            language = (SELECT language FROM temp.users WHERE temp.users.name = authors.name),
+            country = (SELECT country FROM temp.users WHERE temp.users.name = authors.name),
+            usertype = 'registered',
+            flag = (SELECT flag FROM temp.users WHERE temp.users.name = authors.name)
+        WHERE name IN (SELECT name FROM temp.users) %s
+    ''' % ('''''' if signature is None else '''AND (cleaned IS NULL OR cleaned != ?)'''), () if signature is None else (signature,))
+    
+    updated = cursor.rowcount
+    
+    cursor.execute('''DROP TABLE IF EXISTS temp.users''')
+    
+    return updated
+
+def main():
+    
+    parser = argparse.ArgumentParser(description='Clean all extracted Wikipedia data in the sqlite database.') 
+    
+    parser.add_argument('--sqlite', metavar='output', type=str, required=True, help='Open the sqlite database from the specified path.')
+    parser.add_argument('--users', metavar='users', type=str, default=False, help='Specify a dataset with nationality and native language for each user (default: False).')
+    parser.add_argument('--filter', metavar='filter', choices=range(1, 6), type=int, default=1, help='Apply a filter to extract meaningful edits. Specify the number of samples that should be used (default: 1)')
+    parser.add_argument('--batch', metavar='batch', type=int, default=100, help='The number of revisions of which the edits are filtered at once (default: 100).')
+    parser.add_argument('--workers', metavar='workers', type=int, default=1, help='The number of processes which filter the edits. Each process reads a shard of revisions at once (default: 1).')
+    parser.add_argument('--score', metavar='score', type=str, default=None, help='Score the quality of each edit with the model from the specified path (see quality.py). A model which is trained without coded edits (see quality.py --labels) only reproduces the filter of this script. Only edits without a score are scored, unless --rebuild is specified (default: None).')
+    parser.add_argument('--rebuild', action='store_true', help='Clean all articles, authors, and edits again. By default, only the rows which are added since the last run, or were cleaned with other parameters, are cleaned.')
+
+    instrument.add_arguments(parser)
+
+    args = parser.parse_args()
+    
+    metrics = instrument.Metrics.from_arguments('data_cleaning', args)
+
+    # Open the sqlite database
+    db = database.connect(args.sqlite)    
+    cursor = db.cursor()
+    
+    # Validate the database
+    for table in ['articles', 'revisions', 'edits', 'authors']:
+        cursor.execute('''SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?''', (table,))
+        if cursor.fetchone()[0] != 1:
+        	raise ValueError('The specified database is not valid (i.e., not all required tables exist).')
+    
+    # Upgrade the database to the latest schema version
+    migrations.migrate(db)
+    
+    if args.users is False:
+        skip = True
+    elif args.users == 'anonymous':
+        df = geoip.GeoIP()
+        signature = 'anonymous'
+        skip = False 
+    else:
+        try:         
+            df = pd.read_csv(args.users, sep=';', encoding='utf-8')
+            skip = False
+            # Authors are cleaned again when the content of the user dataset changes
+            with open(args.users, 'rb') as file:
+                signature = 'registered:%s' % (hashlib.sha1(file.read()).hexdigest())
+            # Validate the dataframe
+            if False in [True if c in df.columns else False for c in ['Author', 'First Language', 'Country', 'Certain']]:
+                raise ValueError('The specified dataframe is not valid (i.e., not all required columns exist).')
+        except:
+            raise ValueError('Can not open the specified user dataset. Make sure you have specified the correct filename.')
+
+    model = quality.Model.load(args.score) if args.score is not None else None
+    
+    rebuild = args.rebuild is True
+    
+    # Set to which series each article belongs
+    with metrics.stage('series') as stage:
+        series = assign_series(cursor, rebuild)
+        stage.count('series', rows=series)
+        
+    # Add nationality from the user dataset to the authors table
+    if skip is True:
+        print('Skipping user data because no user type is specified.')
+    else:
+        # Only authors which are not cleaned with the same user data yet are updated
+        if isinstance(df, pd.DataFrame):      
+            names = df['Author'].tolist()
+            
+            with metrics.stage('users', rows=len(df)):
+                users = update_users(cursor, df, None if rebuild is True else signature)
+            
+            print('Updated %d registered users' % (users))
+        
+        else:        
+            names = None if rebuild is True else [row[0] for row in cursor.execute('''SELECT name FROM authors WHERE cleaned IS NULL OR cleaned != ?''', (signature,))]
+            
+            # Resolve all distinct addresses at once and update the authors in bulk
+            with metrics.stage('geoip') as stage:
+                users = df.update_authors(cursor, names)
+                stage.count('geoip', rows=users)
+            
+            df.close()
+            
+            print('Updated %d anonymous users' % (users))
+            
+        # Only the authors in the user dataset, or the authors looked up with GeoIP, are recorded as cleaned
+        if names is None:
+            cursor.execute('''UPDATE authors SET cleaned = ?''', (signature,))
+        else:
+            cursor.executemany('''UPDATE authors SET cleaned = ? WHERE name = ?''', [(signature, name) for name in dict.fromkeys(names)])
+    
+    # Filter all edits which are not in the revision (i.e., metadata)
+    checked, valid = filter_edits(db, args.filter, args.batch, metrics, rebuild, args.workers)
+    
+    print('Updated %d valid edits of %d edits' % (valid, checked))
+    
+    # Score the quality of each edit
+    if args.score is not None:
+        scored = quality.score_edits(db, model, metrics=metrics, rebuild=rebuild)
+        print('Scored %d edits' % (scored))
+    
+    with metrics.stage('commit'):
+        db.commit()
+        
+    db.close()    
+    
+    metrics.save()
+    
+if __name__ == "__main__": 
+   main() 
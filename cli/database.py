@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 19 09:47:15 2020
+
+@author: jdevreeze
+"""
+
+import os
+import sqlite3
+
+import textstore
+
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+# Pragmas for large databases that are written by a single process
+PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456'
+]
+
+# Pragmas which do not write to the database, for connections that only read
+READONLY_PRAGMAS = [
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456'
+]
+
+def connect(path, pragmas=True, readonly=False):
+    """
+    Open a sqlite database and register the functions to read the stored texts.
+
+    Args:
+        path: The path of the sqlite database.
+        pragmas: Use write-ahead logging and a larger page cache (default True).
+        readonly: Open the database without write access, so it can be read by several
+            processes while another process writes to it (default False).
+
+    Returns:
+        A sqlite3 connection.
+    """
+
+    if readonly is True:
+        db = sqlite3.connect('file:%s?mode=ro' % (pathname2url(os.path.abspath(path))), uri=True)
+    else:
+        db = sqlite3.connect(path)
+
+    textstore.register(db)
+
+    if pragmas is True:
+        for pragma in PRAGMAS if readonly is False else READONLY_PRAGMAS:
+            db.execute(pragma)
+
+    return db
+
+class Writer:
+    """
+    Bulk-write layer for the extraction database.
+
+    Identifiers of inserted rows are taken from the cursor instead of being selected after
+    each insert, authors are kept in memory, and edits are inserted in a single statement.
+    Revision texts are written to the text store. Nothing is committed until the current
+    transaction ends.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the writer.
+
+        Args:
+            db: A sqlite3 connection.
+        """
+
+        self._db = db
+        self._cursor = db.cursor()
+        self._authors = {}
+        self._texts = textstore.TextStore(self._cursor)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager which commits all writes at once, or rolls them back on an error.
+        """
+
+        try:
+            yield self
+        except:
+            self._db.rollback()
+            self._authors.clear()
+            self._texts.clear()
+            raise
+        else:
+            self._db.commit()
+
+    def commit(self):
+        """
+        Commit the writes of the current transaction so far, so they are kept when the rest
+        of the transaction is rolled back.
+        """
+
+        self._db.commit()
+
+    def author(self, name):
+        """
+        Get the identifier of an author and insert the author if it does not exist.
+
+        Args:
+            name: The name of the author.
+
+        Returns:
+            The identifier of the author.
+        """
+
+        if name not in self._authors:
+
+            result = self._cursor.execute('''SELECT id FROM authors WHERE name = ?''', (name,)).fetchone()
+
+            if result is None:
+                self._cursor.execute('''INSERT INTO authors(name, language, country) VALUES(?, ?, ?)''', (name, None, None))
+                self._authors[name] = self._cursor.lastrowid
+            else:
+                self._authors[name] = result[0]
+
+        return self._authors[name]
+
+    def article(self, article):
+        """
+        Insert an article.
+
+        Args:
+            article: A dict with the parent_id, title, language, timestamp, and flag.
+
+        Returns:
+            The identifier of the article.
+        """
+
+        self._cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(:parent_id, :title, :language, :timestamp, :flag)''', article)
+
+        return self._cursor.lastrowid
+
+    def revision(self, revision):
+        """
+        Insert a revision.
+
+        Args:
+            revision: A dict with the article_id, author_id, revision_id, previous_id,
+                timestamp, content, previous, and paragraphs.
+
+        Returns:
+            The identifier of the revision.
+        """
+
+        revision = dict(revision, content_hash=self._texts.put(revision['content']), previous_hash=self._texts.put(revision['previous']))
+
+        self._cursor.execute('''
+            INSERT INTO revisions(article_id, author_id, revision_id, previous_id, timestamp, content_hash, previous_hash, paragraphs)
+            VALUES(:article_id, :author_id, :revision_id, :previous_id, :timestamp, :content_hash, :previous_hash, :paragraphs)
+        ''', revision)
+
+        return self._cursor.lastrowid
+
+    def remove_texts(self, keys):
+        """
+        Delete the texts of replaced revisions that are not referenced by any revision.
+
+        Args:
+            keys: A list with the keys of the texts.
+
+        Returns:
+            The number of deleted texts.
+        """
+
+        return self._texts.remove(keys)
+
+    def edits(self, revision_id, differences, original):
+        """
+        Insert all edits of a revision.
+
+        Args:
+            revision_id: The identifier of the revision.
+            differences: A list with the updated texts.
+            original: A list with the previous texts.
+
+        Returns:
+            The number of inserted edits.
+        """
+
+        edits = [(revision_id, d, o, len(d.encode('utf-8'))) for (d, o) in zip(differences, original)]
+
+        self._cursor.executemany('''INSERT INTO edits(revision_id, updated_text, previous_text, size) VALUES(?, ?, ?, ?)''', edits)
+
+        return len(edits)
+
+    def error(self, article_id, author_id, revision_id, language, current):
+        """
+        Insert a revision without content.
+
+        Args:
+            article_id: The identifier of the article.
+            author_id: The identifier of the author.
+            revision_id: The identifier of the revision.
+            language: The article language.
+            current: Whether the revision itself or its previous revision has no content.
+        """
+
+        self._cursor.execute('''INSERT INTO errors(article_id, author_id, revision_id, language, current) VALUES(?,?,?,?,?)''', (article_id, author_id, revision_id, language, current))
+
+    def progress(self, article_id, language, user, revision_id):
+        """
+        Record a completed unit of the extraction process in the progress journal.
+
+        Args:
+            article_id: The identifier of the parent article.
+            language: The article language, or an empty string when the article is completed.
+            user: The name of the user, or an empty string when the article is completed.
+            revision_id: The identifier of the revision, or 0 when all revisions of the
+                user (or the article) are completed.
+        """
+
+        self._cursor.execute('''INSERT OR IGNORE INTO progress(article_id, language, user, revision_id) VALUES(?, ?, ?, ?)''', (article_id, language, user, revision_id))
@@ -1,503 +1,938 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Wed Jan  8 15:25:00 2020
-
-@author: jdevreeze
-"""
-
-import pandas as pd
-
-import geoip2.database
-
-import re
-import sqlite3
-import argparse
-import inspect
-import time
-
-from tqdm import tqdm
-from datetime import datetime
-from parsewiki import page
-
-class Extract:
-    
-    _ignore = True
-    _print_errors = True
-    _force = False
-    
-    _db = None
-    _wiki = None
-    _geolocation = None    
-    _item = None
-    _parent = None
-    
-    _sleep = 0
-    _log = []
-    
-    _usertype = 'registered'
-    
-    def __init__(self, output=None, usertype=None, sleep=False, force=False, ignore=True):
-        
-        if usertype is not None:
-            self._usertype = 'anonymous'
-            self._geolocation = usertype
-            
-        if ignore is False:
-            self._ignore = False
-            
-        if sleep is not False:
-            self._sleep = sleep
-            
-        if force is not False:
-            self._force = force
-        
-        try:
-            
-            # Create or open the sqlite database
-            self._db = sqlite3.connect(output)    
-            cursor = self._db.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS authors(
-                    id INTEGER PRIMARY KEY, 
-                    name TEXT,
-                    language TEXT,
-                    country TEXT)
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS articles(
-                    id INTEGER PRIMARY KEY, 
-                    parent_id INTEGER,
-                    title TEXT, 
-                    language TEXT,
-                    timestamp DATETIME,
-                    flag BOOLEAN)
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS revisions(
-                    id INTEGER PRIMARY KEY, 
-                    article_id INTEGER, 
-                    author_id INTEGER, 
-                    revision_id INTEGER,
-                    previous_id INTEGER,
-                    timestamp DATETIME,
-                    content TEXT,
-                    previous TEXT,
-                    paragraphs INTEGER)
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS edits(
-                    id INTEGER PRIMARY KEY,
-                    revision_id INTEGER,
-                    updated_text TEXT,
-                    previous_text TEXT,
-                    size INTEGER)
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS errors(
-                    id INTEGER PRIMARY KEY, 
-                    article_id INTEGER, 
-                    author_id INTEGER, 
-                    revision_id INTEGER,
-                    language TEXT,
-                    current BOOLEAN)
-            ''')
-                
-            self._db.commit()
-
-        except:                   
-            self.__error(self.__line_no(), 'The database cannot be created.', None)
-            pass
-
-    
-    def close_sqlite(self):
-        self._db.close()
-        
-    def extract_wiki(self, item=None):
-        
-        if item is not None:
-            
-            wiki = page.Parse(item.title, lang=item.main)
-            wiki._print_errors = False
-            wiki.extract()
-            
-            if item.main is not item.lang1:
-                wiki.extract(lang=item.lang1)
-            if item.main is not item.lang2:
-                wiki.extract(lang=item.lang2)
-             
-            self._item = item
-            self._wiki = wiki
-        
-        else:
-            self.__error(self.__line_no(), 'A valid Wikipedia record must be provided.', None)
-    
-    def extract_users(self):
-    
-        wiki = self._wiki
-        item = self._item
-        
-        users = []
-        
-        if wiki.get_page(lang=item.lang1) is not False and wiki.get_page(lang=item.lang2) is not False:
-            
-            # Extract all users that contributed to both language versions            
-            wiki.extract_users(lang=item.lang1)
-            wiki.extract_users(lang=item.lang2)
-
-            users_first = wiki.get_users(lang=item.lang1, whom=self._usertype)
-            users_second = wiki.get_users(lang=item.lang2, whom=self._usertype)
-            
-            users_first = set(users_first)
-            users_second = set(users_second)
-            
-            if self._geolocation is not None:
-                
-                for name in users_first.intersection(users_second):            
-                    
-                    nation1 = item.country1.split('|')
-                    nation2 = item.country2.split('|')                
-                    geo = self._geolocation.country(name).country.name                
-                    
-                    if geo in nation1 or geo in nation2:
-                        users.append(name)
-            else:
-                
-                for name in users_first.intersection(users_second):
-                    if not re.search('bot', name, re.IGNORECASE) and not re.search('CommonsDelinker', name, re.IGNORECASE):
-                        users.append(name)
-                        
-        return users
-    
-    def extract_page(self):
-
-        wiki = self._wiki
-        item = self._item
-        
-        cursor = self._db.cursor()
-        
-        # Check whether the requested tile has already been saved in the DB
-        cursor.execute('''SELECT * FROM articles WHERE title=?''', (item.title.replace('_', ' '),))        
-        
-        result = cursor.fetchone()      
-        
-        if result is not None:
-            
-            parent = result[0]
-            
-            if self._force is False:
-                replace = self.query_yes_no('The current page already exists in the database. Do you want to replace it?')
-            else:
-                replace = True if self._force is 'replace' else False                
-
-            if replace:
-
-                cursor.execute('''UPDATE articles SET timestamp = ? WHERE id = ?''', (wiki.get_date(lang=item.main), parent,))
-                    
-                if item.main not in item.lang1:                
-                    cursor.execute('''UPDATE articles SET timestamp = ? WHERE parent_id = ?''', (wiki.get_date(lang=item.lang1), parent,))
-                    
-                if item.main not in item.lang2:    
-                    cursor.execute('''UPDATE articles SET timestamp = ? WHERE parent_id = ?''', (wiki.get_date(lang=item.lang2), parent,))
-
-        else:
-            
-            if item.main not in [item.lang1, item.lang2]:
-                first = 0
-            else:
-                first = 1
-                
-            article = {
-                'parent_id' : 0,
-                'title' : wiki.get_title(lang=item.main),
-                'language' : item.main,
-                'timestamp' : wiki.get_date(lang=item.main),
-                'flag' : first
-            }
-            
-            cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(:parent_id, :title, :language, :timestamp, :flag)''', article)        
-            cursor.execute('''SELECT COUNT(*) FROM articles''')
-            
-            result = cursor.fetchone()
-            parent = result[0]        
-        
-            if item.main not in item.lang1:
-                
-                article = {
-                    'parent_id' : parent,
-                    'title' : wiki.get_title(lang=item.lang1),
-                    'language' : item.lang1,
-                    'timestamp' : wiki.get_date(lang=item.lang1),
-                    'flag' : 1
-                }
-                
-                cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(:parent_id, :title, :language, :timestamp, :flag)''', article)
-                
-            if item.main not in item.lang2:
-    
-                article = {
-                    'parent_id' : parent,
-                    'title' : wiki.get_title(lang=item.lang2),
-                    'language' : item.lang2,
-                    'timestamp' : wiki.get_date(lang=item.lang2),
-                    'flag' : 1
-                }
-                
-                cursor.execute('''INSERT INTO articles(parent_id, title, language, timestamp, flag) VALUES(:parent_id, :title, :language, :timestamp, :flag)''', article)
-        
-        self._parent = parent
-        self._db.commit()
-        
-    def extract_edits(self, user, lang, indent=0):
-
-        wiki = self._wiki
-        item = self._item
-        
-        cursor = self._db.cursor()
-
-        # Check whether the user has already been saved in the DB
-        cursor.execute('''SELECT * FROM authors WHERE name=?''', (user,))
-
-        if cursor.fetchone() is None:                    
-            cursor.execute('''INSERT INTO authors(name, language, country) VALUES(?, ?, ?)''', (user, None, None))
-            
-        cursor.execute('''SELECT id FROM authors WHERE name=?''', (user,))                
-        author_id = cursor.fetchone()[0]
-        
-        # Delay the data extraction so the MediaWiki server doesn't get overloaded
-        time.sleep(self._sleep)
-        
-        # Extract revisions for the first language 
-        wiki.extract_revisions_by_user(lang=lang, username=user)            
-        identifiers = wiki.get_pageid(lang=lang, user=user)
-        
-        # Output the total amount of edits for this language version
-        print('%sExtracted %d revisions(s) for language code \'%s\':' % (' ' * indent, len(identifiers), lang))
-        
-        for i, identifier in enumerate(identifiers, 1):
-            
-            # Output the revision
-            print('%sRevision %d of %d: %s' % (' ' * (indent + 2), i, len(identifiers), identifier))
-            
-            # Check whether the revision has already been saved in the DB
-            cursor.execute('''SELECT * FROM revisions WHERE revision_id=?''', (identifier,))
-            
-            result = cursor.fetchone()
-            
-            if result is not None:
-                
-                if self._force is False:
-                    replace = self.query_yes_no('The current revision is already saved in the database. Do you want to replace it?')
-                else:
-                    replace = True if self._force is 'replace' else False 
-
-                if replace:                
-                    revids = cursor.execute('''SELECT id FROM revisions WHERE revision_id=?''', (identifier,)).fetchall()                    
-                    for revid in revids:                        
-                        cursor.execute('''DELETE FROM edits WHERE revision_id = ? ''', (revid[0],))                    
-                    cursor.execute('''DELETE FROM revisions WHERE revision_id = ? ''', (identifier,))                  
-                
-            if result is None or replace is True:
-            
-                # Extract metadata
-                timestamp = wiki.get_date(lang=lang, revid=identifier)
-                previous_id = wiki.get_previous(lang=lang, revid=identifier)  
-                
-                if previous_id is 0:                        
-                    previous = ''                   
-                else:
-                    wiki.extract_revision(lang=lang, revid=previous_id)
-                    
-                    if wiki.has_content(lang=lang, revid=previous_id) is True:                                
-                        previous = wiki.get_text(lang=lang, revid=previous_id, references=False, headers=True)
-                    else:
-                        previous = ''
-                        cursor.execute('''INSERT INTO errors(article_id, author_id, revision_id, language, current) VALUES(?,?,?,?,?)''', (self._parent, author_id, previous_id, lang, False))
-                        
-                if wiki.has_content(lang=lang, revid=identifier) is True:                                
-                    content = wiki.get_text(lang=lang, revid=identifier, references=False, headers=True)
-                else:
-                    content = ''
-                    cursor.execute('''INSERT INTO errors(article_id, author_id, revision_id, language, current) VALUES(?,?,?,?,?)''', (self._parent, author_id, identifier, lang, True))
-                
-                if item.main not in lang:
-                    cursor.execute('''SELECT * FROM articles WHERE parent_id = ? AND language = ?''', (self._parent, lang,))
-                else:
-                    cursor.execute('''SELECT * FROM articles WHERE id = ? AND language = ?''', (self._parent, lang,))
-                    
-                parent_id = cursor.fetchone()[0]
-
-                revision = {
-                    'article_id' : parent_id, 
-                    'author_id' : author_id, 
-                    'revision_id' : identifier, 
-                    'previous_id' : previous_id, 
-                    'timestamp' : timestamp, 
-                    'content' : content, 
-                    'previous' : previous, 
-                    'paragraphs' : None                        
-                }
-                
-                cursor.execute('''INSERT INTO revisions(article_id, author_id, revision_id, previous_id, timestamp, content, previous, paragraphs) 
-                                  VALUES(:article_id, :author_id, :revision_id, :previous_id, :timestamp, :content, :previous, :paragraphs)''', revision)                        
-                
-                cursor.execute('''SELECT id FROM revisions WHERE revision_id=?''', (identifier,))
-            
-                revision_id = cursor.fetchone()[0]
-                
-                # Extract all the edits done by the user on this revision
-                differences, original = wiki.get_differences(lang=lang, revid=identifier, compare=True)
-                
-                if not differences:
-                    pass
-                    
-                for (d,o) in zip(differences, original):                    
-                    edit = {
-                       'revision_id' : revision_id, 
-                       'updated_text' : d, 
-                       'previous_text' : o, 
-                       'size' : len(d.encode('utf-8'))
-                    }
-                    cursor.execute('''INSERT INTO edits(revision_id, updated_text, previous_text, size) VALUES(:revision_id, :updated_text, :previous_text, :size)''', edit)                        
-                
-        self._db.commit()
-    
-    def query_yes_no(self, question, default=True):
-        """
-        Ask a yes/no question via standard input and return the answer.
-
-        If invalid input is given, the user will be asked until
-        they acutally give valid input.
-    
-        Args:
-            question(str):
-                A question that is presented to the user.
-            default(bool|None):
-                The default value when enter is pressed with no value.
-                When None, there is no default value and the query
-                will loop.
-        Returns:
-            A bool indicating whether user has entered yes or no.
-        """
-        
-        default_dict = {
-            None:  '[y/n]',
-            True:  '[Y/n]',
-            False: '[y/N]',
-        }
-    
-        default_str = default_dict[default]
-        prompt_str = '%s %s ' % (question, default_str)
-    
-        while True:
-            
-            print(prompt_str)
-            choice = input().lower()
-            
-            if not choice and default is not None:
-                return default
-            if choice in ['yes', 'y']:
-                return True
-            if choice in ['no', 'n']:
-                return False
-    
-            notification_str = 'Please respond with \'y\' or \'n\''
-            print(notification_str)
-                        
-    def __line_no(self):
-        """
-        Internal method to get the current line number.
-        
-        Returns:
-            An integer with the current line number.
-        """
-        
-        return inspect.currentframe().f_back.f_lineno
-        
-    def __error(self, line, error, etype):
-        """
-        Internal method to handle errors.    
-        
-        Args:
-            line: An integer with the current line number
-            error: A string with the error message.
-            etype: A string with the error type
-        """
-
-        if self._print_errors is True:
-            print('Line: %s - %s' % (line, error))
-            
-        self._log.append((datetime.strftime(datetime.now(), '%Y-%m-%dT%H:%M:%S%Z'), line, error, etype))
-        
-        if self._ignore is False:
-            raise ValueError(error)
-  
-def main():
-    
-    parser = argparse.ArgumentParser(description='Extract Wikipedia edits made by all users on two language versions of an article.') 
-    
-    parser.add_argument('--input', metavar='input', type=str, required=True, help='Opens a csv file from the specified path.')
-    parser.add_argument('--output', metavar='output', type=str, required=True, help='Stores the extracted data to a sqlite database in the specified path.')
-    parser.add_argument('--usertype', choices=['registered', 'anonymous'], default='registered', help='Type of user to extract edits from (default: registered).')
-    parser.add_argument('--blacklist', metavar='blacklist', nargs='*', type=str, default=False, help='A list with titles to exclude from the input data.')
-    parser.add_argument('--whitelist', metavar='whitelist', nargs='*', type=str, default=False, help='A list with titles to include from the input data. Note that this overrides a blacklist.')
-    parser.add_argument('--sleep', metavar='sleep', type=int, default=0, help='Set a delay for the extraction process so the MediaWiki API does not get overloaded.')
-    parser.add_argument('--force', metavar='force', choices=['replace', 'keep'], default=False, help='Automatically replace or keep saved items.')
-    parser.add_argument('--resume', metavar='resume', type=str, default=False, help='Continue the extraction process from the specified article name.')
-
-    args = parser.parse_args()
-    
-    # Open the dataset
-    data = pd.read_csv(args.input, sep=',', encoding='utf-8')
-    
-    df = data
-
-    if args.blacklist is not False: 
-        df = data[~data.title.isin(args.blacklist)]
-    
-    if args.whitelist is not False: 
-        df = data[data.title.isin(args.whitelist)]
-    
-    data.drop_duplicates(subset="title", keep='first', inplace=True) 
-    
-    try:            
-        usertype = None if args.usertype == 'registered' else geoip2.database.Reader('../models/GeoLite2-Country.mmdb') 
-    except:
-        raise ValueError('Can not open a valid GeoLite2 Country model. Make sure you have specified the correct filename.')
-    
-    if args.resume is not False:
-        index = df[df.title == args.resume].index.tolist()
-        if index:
-            df = df[df.index >= index[0]]
-    
-    # Start the extraction process
-    extract = Extract(args.output, usertype, args.sleep, args.force)
-    
-    for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-    
-        # Output the current title which is being processed
-        print('\n%s: %s' % (datetime.strftime(datetime.now(), '%Y-%m-%d | %H:%M:%S'), row.title.replace('_', ' ')))
-        
-        extract.extract_wiki(row)
-        users = extract.extract_users()
-
-        if users:
-
-            extract.extract_page()            
-            
-            # Output the total amount of users
-            print('  Extracted %d %s user(s):' % (len(users), args.usertype))
-            
-            for i, user in enumerate(users, 1):
-                
-                # Output the current user which is being processed
-                print('    User %d of %d: %s' % (i, len(users), user))
-                
-                extract.extract_edits(user, row.lang1, 6)
-                extract.extract_edits(user, row.lang2, 6)  
-                
-    # Close the sqlite database
-    extract.close_sqlite()
-
-if __name__ == "__main__": 
-   main() 
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Jan  8 15:25:00 2020
+
+@author: jdevreeze
+"""
+
+import pandas as pd
+
+import re
+import argparse
+import inspect
+import multiprocessing
+import os
+import time
+
+import cache
+import contributors
+import database
+import geoip
+import instrument
+import mediawiki
+import merge_db
+import migrations
+import pipeline
+import ratelimit
+import rediff
+
+from tqdm import tqdm
+from contextlib import redirect_stdout
+from datetime import datetime
+from itertools import groupby
+
+class Extract:
+    
+    _ignore = True
+    _print_errors = True
+    _force = False
+    _resume = False
+    
+    _db = None
+    _metrics = None
+    _wiki = None
+    _geolocation = None    
+    _index = None
+    _refresh = False
+    _writer = None
+    _output = None
+    _item = None
+    _parent = None
+    
+    _sleep = 0
+    _workers = 0
+    _buffer = 16
+    _checkpoint = 100
+    _log = []
+    
+    _usertype = 'registered'
+    
+    def __init__(self, output=None, usertype=None, sleep=False, force=False, ignore=True, workers=0, resume=False, buffer=None, metrics=None, index=None, journal=None, checkpoint=None, refresh=False):
+        
+        if usertype is not None:
+            self._usertype = 'anonymous'
+            self._geolocation = usertype
+            
+        if ignore is False:
+            self._ignore = False
+            
+        if sleep is not False:
+            self._sleep = sleep
+            
+        if force is not False:
+            self._force = force
+            
+        if workers > 0:
+            self._workers = workers
+            
+        if resume is not False:
+            self._resume = True
+            
+        if buffer is not None:
+            self._buffer = buffer
+            
+        if checkpoint is not None:
+            self._checkpoint = checkpoint
+            
+        if index is not None:
+            self._index = index
+            
+        if refresh is not False:
+            self._refresh = True
+            
+        self._metrics = metrics if metrics is not None else instrument.Metrics('extract_edits')
+        
+        # The language versions and the progress journal of the current article (see extract_page)
+        self._articles = {}
+        self._completed = set()
+        self._journal = set()
+        
+        try:
+            
+            # Create or open the sqlite database
+            self._db = database.connect(output)    
+            
+            # Create or upgrade all tables and indexes
+            migrations.migrate(self._db)
+            
+            self._writer = database.Writer(self._db)
+            
+            # The progress journal of the database into which this shard is merged
+            self._output = database.connect(journal, readonly=True) if journal is not None else None
+
+        except:                   
+            self.__error(self.__line_no(), 'The database cannot be created.', None)
+            pass
+
+    
+    def close_sqlite(self):
+        self._db.close()
+        
+        if self._output is not None:
+            self._output.close()
+        
+    def transaction(self):
+        """
+        Context manager which writes all changes of the current article in a single transaction.
+        """
+        
+        return self._writer.transaction()
+    
+    def completed_articles(self):
+        """
+        Get the titles of all articles of which the extraction has been completed.
+        
+        Returns:
+            A set with the titles of the articles.
+        """
+        
+        completed = set()
+        
+        for db in [self._db, self._output]:
+            
+            if db is None:
+                continue
+            
+            cursor = db.cursor()
+            cursor.execute('''
+                SELECT articles.title FROM progress 
+                INNER JOIN articles ON articles.id = progress.article_id 
+                WHERE progress.language = '' AND progress.user = ''
+            ''')
+            
+            completed.update(row[0] for row in cursor.fetchall())
+        
+        return completed
+    
+    def complete_page(self):
+        """
+        Record in the progress journal that all users of the current article are extracted.
+        """
+        
+        with self._writer.transaction():
+            self._writer.progress(self._parent, '', '', 0)
+        
+    def extract_wiki(self, item=None):
+        
+        if item is not None:
+            
+            wiki = mediawiki.Parse(item.title, lang=item.main)
+            wiki._print_errors = False
+            wiki.extract()
+            
+            if item.main is not item.lang1:
+                wiki.extract(lang=item.lang1)
+            if item.main is not item.lang2:
+                wiki.extract(lang=item.lang2)
+             
+            self._item = item
+            self._wiki = wiki
+        
+        else:
+            self.__error(self.__line_no(), 'A valid Wikipedia record must be provided.', None)
+    
+    def extract_users(self):
+    
+        wiki = self._wiki
+        item = self._item
+        
+        users = []
+        
+        if wiki.get_page(lang=item.lang1) is not False and wiki.get_page(lang=item.lang2) is not False:
+            
+            if self._index is not None:
+                
+                # Only pages which are not in the contributor index yet are crawled, unless the
+                # index is refreshed
+                self._index.add_titles(wiki, item.title.replace('_', ' '), item.main, [item.lang1, item.lang2])
+                self._index.update(wiki, item.lang1, self._refresh)
+                self._index.update(wiki, item.lang2, self._refresh)
+                
+                users_first = self._index.contributors(item.lang1, wiki.get_title(item.lang1), self._usertype)
+                users_second = self._index.contributors(item.lang2, wiki.get_title(item.lang2), self._usertype)
+                
+            else:
+                
+                # Extract all users that contributed to both language versions            
+                wiki.extract_users(lang=item.lang1)
+                wiki.extract_users(lang=item.lang2)
+    
+                users_first = wiki.get_users(lang=item.lang1, whom=self._usertype)
+                users_second = wiki.get_users(lang=item.lang2, whom=self._usertype)
+            
+            users_first = set(users_first)
+            users_second = set(users_second)
+            
+            if self._geolocation is not None:
+                
+                nation1 = item.country1.split('|')
+                nation2 = item.country2.split('|')
+                
+                # Each distinct address is only looked up once during the extraction
+                intersection = users_first.intersection(users_second)
+                
+                with self._metrics.stage('geoip', rows=len(intersection)):
+                    countries = self._geolocation.resolve(intersection)
+                
+                for name in intersection:
+                    
+                    geo = countries[name][0]
+                    
+                    if geo in nation1 or geo in nation2:
+                        users.append(name)
+            else:
+                
+                for name in users_first.intersection(users_second):
+                    if not re.search('bot', name, re.IGNORECASE) and not re.search('CommonsDelinker', name, re.IGNORECASE):
+                        users.append(name)
+                        
+        return users
+    
+    def extract_page(self):
+
+        wiki = self._wiki
+        item = self._item
+        
+        cursor = self._db.cursor()
+        
+        # Check whether the requested tile has already been saved in the DB
+        cursor.execute('''SELECT * FROM articles WHERE title=?''', (item.title.replace('_', ' '),))        
+        
+        result = cursor.fetchone()      
+        
+        if result is not None:
+            
+            parent = result[0]
+            
+            if self._resume is True:
+                # Continue with the saved article and the users that are not completed yet
+                replace = False
+            elif self._force is False:
+                replace = self.query_yes_no('The current page already exists in the database. Do you want to replace it?')
+            else:
+                replace = True if self._force is 'replace' else False                
+
+            if replace:
+                
+                # The replaced article is extracted again from the start
+                cursor.execute('''DELETE FROM progress WHERE article_id = ?''', (parent,))
+
+                cursor.execute('''UPDATE articles SET timestamp = ? WHERE id = ?''', (wiki.get_date(lang=item.main), parent,))
+                    
+                if item.main not in item.lang1:                
+                    cursor.execute('''UPDATE articles SET timestamp = ? WHERE parent_id = ?''', (wiki.get_date(lang=item.lang1), parent,))
+                    
+                if item.main not in item.lang2:    
+                    cursor.execute('''UPDATE articles SET timestamp = ? WHERE parent_id = ?''', (wiki.get_date(lang=item.lang2), parent,))
+
+        else:
+            
+            if item.main not in [item.lang1, item.lang2]:
+                first = 0
+            else:
+                first = 1
+                
+            article = {
+                'parent_id' : 0,
+                'title' : wiki.get_title(lang=item.main),
+                'language' : item.main,
+                'timestamp' : wiki.get_date(lang=item.main),
+                'flag' : first
+            }
+            
+            parent = self._writer.article(article)
+        
+            if item.main not in item.lang1:
+                
+                article = {
+                    'parent_id' : parent,
+                    'title' : wiki.get_title(lang=item.lang1),
+                    'language' : item.lang1,
+                    'timestamp' : wiki.get_date(lang=item.lang1),
+                    'flag' : 1
+                }
+                
+                self._writer.article(article)
+                
+            if item.main not in item.lang2:
+    
+                article = {
+                    'parent_id' : parent,
+                    'title' : wiki.get_title(lang=item.lang2),
+                    'language' : item.lang2,
+                    'timestamp' : wiki.get_date(lang=item.lang2),
+                    'flag' : 1
+                }
+                
+                self._writer.article(article)
+        
+        self._parent = parent
+        
+        # Keep the identifier of each language version of the article
+        cursor.execute('''SELECT language, id FROM articles WHERE id = ? OR parent_id = ?''', (parent, parent,))
+        self._articles = dict(cursor.fetchall())
+        
+        # Load the progress journal of the article at once
+        cursor.execute('''SELECT language, user, revision_id FROM progress WHERE article_id = ?''', (parent,))
+        journal = cursor.fetchall()
+        
+        # A resumed shard also skips the progress that is already merged into the output
+        if self._output is not None:
+            journal += self._output.execute('''
+                SELECT language, user, revision_id FROM progress 
+                WHERE article_id IN (SELECT id FROM articles WHERE title = ?)
+            ''', (item.title.replace('_', ' '),)).fetchall()
+        
+        self._completed = {(language, user) for (language, user, revision_id) in journal if revision_id == 0}
+        self._journal = {str(revision_id) for (language, user, revision_id) in journal if revision_id != 0}
+    
+    def is_completed(self, user, lang):
+        """
+        Check whether all revisions of a user are extracted according to the progress journal.
+        
+        Args:
+            user: The name of the user.
+            lang: The article language.
+            
+        Returns:
+            A boolean which is True when the user is completed.
+        """
+        
+        return (lang, user) in self._completed
+        
+    def extract_revisions(self, users, languages, indent=0):
+        """
+        Extract the edits made by all users on the current article.
+        
+        The extraction runs as a pipeline of stages which are connected by bounded buffers,
+        so requests to the MediaWiki API, parsing, and writing to the database overlap. The 
+        revisions are fetched by a pool of threads, their texts and differences are extracted 
+        in separate threads, and the results are written to the database by the current 
+        thread in the same order in which the revisions are listed. Each revision is fetched 
+        into a separate copy of the page, which is released once it has been written.
+        
+        Args:
+            users: A list with the names of all users.
+            languages: A list with the language codes.
+            indent: The indentation of the printed output (default 0).
+        """
+        
+        saved = self.__saved_revisions()
+        
+        records = self.__list_revisions(users, languages, saved)
+        records = pipeline.parallel(self.__fetch_revision, records, self._workers, self._buffer)
+        records = pipeline.stage(self.__parse_revision, records, self._buffer)
+        records = pipeline.stage(self.__diff_revision, records, self._buffer)
+        
+        self.__write_revisions(records, indent)
+    
+    def extract_edits(self, user, lang, indent=0):
+        """
+        Extract the edits made by a single user on a language version of the current article.
+        
+        Args:
+            user: The name of the user.
+            lang: The article language.
+            indent: The indentation of the printed output (default 0).
+        """
+        
+        self.extract_revisions([user], [lang], indent)
+    
+    def __list_revisions(self, users, languages, saved):
+        """
+        Internal method which lists the revisions of all users (the first stage).
+        
+        Args:
+            users: A list with the names of all users.
+            languages: A list with the language codes.
+            saved: Revision identifiers that are kept in the database.
+            
+        Returns:
+            A generator with a header for each user and language version, followed by a 
+            record for each revision of that user.
+        """
+        
+        for i, user in enumerate(users, 1):
+            for j, lang in enumerate(languages):
+                
+                header = {'unit' : (i, j), 'user' : user, 'lang' : lang, 'number' : i, 'total' : len(users), 'first' : j == 0}
+                
+                if self.is_completed(user, lang):
+                    yield dict(header, completed=True)
+                    continue
+                
+                # Delay the data extraction so the MediaWiki server doesn't get overloaded
+                time.sleep(self._sleep)
+                
+                wiki = self._wiki.fork(lang)
+                revisions = wiki.get_revisions_by_user(lang, user)
+                
+                # Revisions in the database or the progress journal are not fetched again
+                skip = {identifier for (identifier, previous_id) in revisions if identifier in saved or identifier in self._journal}
+                
+                # The properties of the previous revisions are requested in batches
+                wiki.prefetch_properties(lang, [previous_id for (identifier, previous_id) in revisions if previous_id and identifier not in skip])
+                
+                yield dict(header, identifiers=[identifier for (identifier, previous_id) in revisions])
+                
+                for identifier, previous_id in revisions:
+                    yield dict(header, revid=identifier, saved=identifier in skip)
+    
+    def __fetch_revision(self, record):
+        """
+        Internal method which requests a revision and its previous revision (the second stage).
+        
+        Args:
+            record: A dict with the revision which is fetched.
+            
+        Returns:
+            A dict with the revision and a copy of the page with the fetched revisions.
+        """
+        
+        if 'revid' not in record or record['saved'] is True:
+            return record
+        
+        lang = record['lang']
+        
+        with self._metrics.stage('fetch', rows=1):
+            
+            wiki = self._wiki.fork(lang)
+            wiki.extract_revision(lang=lang, revid=record['revid'])
+            
+            previous_id = wiki.get_previous(lang=lang, revid=record['revid'])
+            
+            if previous_id:
+                wiki.extract_revision(lang=lang, revid=previous_id)
+        
+        return dict(record, wiki=wiki)
+    
+    def __parse_revision(self, record):
+        """
+        Internal method which extracts the metadata and texts of a revision (the third stage).
+        
+        Args:
+            record: A dict with the revision and a copy of the page with the fetched revisions.
+            
+        Returns:
+            A dict with the revision, its metadata, and its texts.
+        """
+        
+        if 'wiki' not in record:
+            return record
+        
+        wiki = record['wiki']
+        lang = record['lang']
+        identifier = record['revid']
+        
+        errors = []
+        
+        with self._metrics.stage('get_text', rows=1):
+            
+            # Extract metadata
+            timestamp = wiki.get_date(lang=lang, revid=identifier)
+            previous_id = wiki.get_previous(lang=lang, revid=identifier)  
+            
+            if not previous_id:                        
+                previous = ''                   
+            elif wiki.has_content(lang=lang, revid=previous_id) is True:                                
+                previous = wiki.get_text(lang=lang, revid=previous_id, references=False, headers=True)
+            else:
+                previous = ''
+                errors.append((previous_id, False))
+                    
+            if wiki.has_content(lang=lang, revid=identifier) is True:                                
+                content = wiki.get_text(lang=lang, revid=identifier, references=False, headers=True)
+            else:
+                content = ''
+                errors.append((identifier, True))
+        
+        self._metrics.count('get_text', size=len(content.encode('utf-8')) + len(previous.encode('utf-8')))
+            
+        return dict(record, timestamp=timestamp, previous_id=previous_id, content=content, previous=previous, errors=errors)
+    
+    def __diff_revision(self, record):
+        """
+        Internal method which extracts the edits of a revision and releases the copy of 
+        the page (the fourth stage).
+        
+        Args:
+            record: A dict with the revision and a copy of the page with the fetched revisions.
+            
+        Returns:
+            A dict with the revision, its metadata, its texts, and its edits.
+        """
+        
+        record = dict(record)
+        wiki = record.pop('wiki', None)
+        
+        if wiki is None:
+            return record
+        
+        # Extract all the edits done by the user on this revision
+        with self._metrics.stage('get_differences', rows=1):
+            differences, original = wiki.get_differences(lang=record['lang'], revid=record['revid'], compare=True)
+            
+        # Count the paragraphs which are added or changed in the revision text
+        with self._metrics.stage('paragraphs', rows=1):
+            paragraphs = len(rediff.paragraph_changes(record['content'], record['previous']))
+        
+        return dict(record, differences=differences, original=original, paragraphs=paragraphs)
+    
+    def __write_revisions(self, records, indent):
+        """
+        Internal method which saves all revisions (the last stage). The revisions of a user 
+        are saved together with their progress in a single transaction, which is committed 
+        after every checkpoint, so an interrupted extraction continues from the last 
+        committed revision.
+        
+        Args:
+            records: An iterable with the headers and revisions of all users.
+            indent: The indentation of the printed output.
+        """
+        
+        for unit, records in groupby(records, key=lambda record: record['unit']):
+            
+            header = next(records)
+            user = header['user']
+            lang = header['lang']
+            
+            if header['first'] is True:
+                
+                # Output the current user which is being processed
+                print('%sUser %d of %d: %s' % (' ' * indent, header['number'], header['total'], user))
+            
+            if header.get('completed') is True:
+                print('%sSkipped the completed revisions for language code \'%s\'' % (' ' * (indent + 2), lang))
+                continue
+            
+            # Output the total amount of edits for this language version
+            print('%sExtracted %d revisions(s) for language code \'%s\':' % (' ' * (indent + 2), len(header['identifiers']), lang))
+            
+            with self._writer.transaction():
+                
+                # Get the user from the DB or save the user if it doesn't exist
+                author_id = self._writer.author(user)
+                
+                for i, record in enumerate(records, 1):
+                    
+                    # Output the revision
+                    self._metrics.log('%sRevision %d of %d: %s' % (' ' * (indent + 4), i, len(header['identifiers']), record['revid']))
+                    
+                    with self._metrics.stage('sqlite', rows=1 + len(record.get('differences', []))):
+                        self.__write_revision(record, author_id)
+                        
+                    if i % self._checkpoint == 0:
+                        self._writer.commit()
+                    
+                self._writer.progress(self._parent, lang, user, 0)
+                
+            self._completed.add((lang, user))
+    
+    def __write_revision(self, record, author_id):
+        """
+        Internal method to save a revision and its edits.
+        
+        Args:
+            record: A dict with the revision, its metadata, its texts, and its edits.
+            author_id: The identifier of the author.
+        """
+        
+        cursor = self._db.cursor()
+        
+        identifier = record['revid']
+        lang = record['lang']
+        
+        # Skip revisions recorded in the progress journal without querying the DB
+        if identifier in self._journal:
+            return
+        
+        # Check whether the revision has already been saved in the DB
+        revids = cursor.execute('''SELECT id FROM revisions WHERE revision_id=?''', (identifier,)).fetchall()
+        
+        result = revids[0] if revids else None
+        
+        if result is not None:
+            
+            if self._force is False:
+                replace = self.query_yes_no('The current revision is already saved in the database. Do you want to replace it?')
+            else:
+                replace = True if self._force == 'replace' else False 
+
+            if replace:                
+                # The texts of the replaced revisions are removed once the revision is saved again
+                keys = [key for row in cursor.execute('''SELECT content_hash, previous_hash FROM revisions WHERE revision_id = ?''', (identifier,)).fetchall() for key in row]
+                
+                cursor.executemany('''DELETE FROM edits WHERE revision_id = ? ''', revids)                    
+                cursor.execute('''DELETE FROM revisions WHERE revision_id = ? ''', (identifier,))                  
+            
+        if result is None or replace is True:
+            
+            if record['saved'] is True:
+                raise ValueError('The revision %s was not fetched, because it is kept in the database.' % (identifier))
+            
+            for revid, current in record['errors']:
+                self._writer.error(self._parent, author_id, revid, lang, current)
+            
+            revision = {
+                'article_id' : self._articles[lang], 
+                'author_id' : author_id, 
+                'revision_id' : identifier, 
+                'previous_id' : record['previous_id'], 
+                'timestamp' : record['timestamp'], 
+                'content' : record['content'], 
+                'previous' : record['previous'], 
+                'paragraphs' : record['paragraphs']
+            }
+            
+            revision_id = self._writer.revision(revision)
+            
+            self._writer.edits(revision_id, record['differences'], record['original'])
+            
+            if result is not None:
+                self._writer.remove_texts(keys)
+            
+        self._writer.progress(self._parent, lang, record['user'], identifier)
+        
+    def query_yes_no(self, question, default=True):
+        """
+        Ask a yes/no question via standard input and return the answer.
+
+        If invalid input is given, the user will be asked until
+        they acutally give valid input.
+    
+        Args:
+            question(str):
+                A question that is presented to the user.
+            default(bool|None):
+                The default value when enter is pressed with no value.
+                When None, there is no default value and the query
+                will loop.
+        Returns:
+            A bool indicating whether user has entered yes or no.
+        """
+        
+        default_dict = {
+            None:  '[y/n]',
+            True:  '[Y/n]',
+            False: '[y/N]',
+        }
+    
+        default_str = default_dict[default]
+        prompt_str = '%s %s ' % (question, default_str)
+    
+        while True:
+            
+            print(prompt_str)
+            choice = input().lower()
+            
+            if not choice and default is not None:
+                return default
+            if choice in ['yes', 'y']:
+                return True
+            if choice in ['no', 'n']:
+                return False
+    
+            notification_str = 'Please respond with \'y\' or \'n\''
+            print(notification_str)
+                        
+    def __saved_revisions(self):
+        """
+        Internal method to get the revisions of the current article that are kept in the database.
+        
+        Returns:
+            A set with revision identifiers, which is empty unless saved revisions are kept.
+        """
+        
+        if self._force != 'keep':
+            return set()
+        
+        cursor = self._db.cursor()
+        cursor.execute('''
+            SELECT revision_id FROM revisions 
+            WHERE article_id IN (SELECT id FROM articles WHERE id = ? OR parent_id = ?)
+        ''', (self._parent, self._parent,))
+        
+        return {str(row[0]) for row in cursor.fetchall()}
+                        
+    def __line_no(self):
+        """
+        Internal method to get the current line number.
+        
+        Returns:
+            An integer with the current line number.
+        """
+        
+        return inspect.currentframe().f_back.f_lineno
+        
+    def __error(self, line, error, etype):
+        """
+        Internal method to handle errors.    
+        
+        Args:
+            line: An integer with the current line number
+            error: A string with the error message.
+            etype: A string with the error type
+        """
+
+        if self._print_errors is True:
+            print('Line: %s - %s' % (line, error))
+            
+        self._log.append((datetime.strftime(datetime.now(), '%Y-%m-%dT%H:%M:%S%Z'), line, error, etype))
+        
+        if self._ignore is False:
+            raise ValueError(error)
+  
+def shard_path(path, shard):
+    """
+    Get the path of a file which belongs to a single shard.
+    
+    Args:
+        path: The path of the file of all shards together.
+        shard: The number of the shard.
+        
+    Returns:
+        A string with the path, or None if no path is specified.
+    """
+    
+    if path is None:
+        return None
+    
+    name, extension = os.path.splitext(path)
+    
+    return '%s-shard%d%s' % (name, shard, extension)
+
+def configure(args, shards=1, metrics=None):
+    """
+    Configure the cache and the rate limit of all requests to the MediaWiki API.
+    
+    Args:
+        args: The parsed command line arguments.
+        shards: The number of processes which share the rate limit (default 1).
+        metrics: A Metrics instance that records the time spent on requests (default None).
+        
+    Returns:
+        The revision cache or None if no cache is used.
+    """
+    
+    rate = args.rate / shards if args.rate is not None else None
+    
+    revisions = cache.RevisionCache(args.cache, args.cache_size, args.offline) if args.cache is not None else None
+    limiter = ratelimit.RateLimiter(rate, args.concurrency if args.workers > 0 else None)
+    mediawiki.Parse.configure(limiter=limiter, api=args.api, cache=revisions, metrics=metrics)
+    
+    return revisions
+
+def extract_articles(args, df, output, shards=1, position=0, journal=None):
+    """
+    Extract the edits of all articles in the input data.
+    
+    Args:
+        args: The parsed command line arguments.
+        df: A dataframe with the articles.
+        output: The path of the sqlite database.
+        shards: The number of processes that extract articles simultaneously (default 1).
+        position: The position of the progress bar of this process (default 0).
+        journal: The path of another sqlite database of which the progress journal is 
+            resumed as well, or None (default None).
+    """
+    
+    usertype = None if args.usertype == 'registered' else geoip.GeoIP()
+    
+    metrics = instrument.Metrics.from_arguments('extract_edits', args)
+    
+    # Cache and throttle all requests to the MediaWiki API
+    revisions = configure(args, shards, metrics)
+    
+    contributor_index = contributors.ContributorIndex(args.index) if args.index is not None else None
+    
+    # Start the extraction process
+    extract = Extract(output, usertype, args.sleep, args.force, workers=args.workers, resume=args.resume, buffer=args.buffer, metrics=metrics, index=contributor_index, journal=journal, checkpoint=args.checkpoint, refresh=args.refresh_index)
+    
+    # Articles that are completed according to the progress journal are skipped at once
+    completed = extract.completed_articles() if args.resume is True else set()
+    
+    for index, row in tqdm(df.iterrows(), total=df.shape[0], position=position):
+    
+        # Output the current title which is being processed
+        print('\n%s: %s' % (datetime.strftime(datetime.now(), '%Y-%m-%d | %H:%M:%S'), row.title.replace('_', ' ')))
+        
+        if row.title.replace('_', ' ') in completed:
+            print('  Skipped the completed article')
+            continue
+        
+        with metrics.stage('users', rows=1):
+            extract.extract_wiki(row)
+            users = extract.extract_users()
+
+        if not users:
+            continue
+        
+        # Save the article first, after which the revisions of each user are saved in a separate transaction
+        with extract.transaction():
+            extract.extract_page()            
+            
+        # Output the total amount of users
+        print('  Extracted %d %s user(s):' % (len(users), args.usertype))
+        
+        extract.extract_revisions(users, [row.lang1, row.lang2], 4)
+        extract.complete_page()
+        
+    # Close the sqlite database
+    extract.close_sqlite()
+    
+    if usertype is not None:
+        usertype.close()
+        
+    if contributor_index is not None:
+        contributor_index.close()
+    
+    if revisions is not None:
+        revisions.close()
+        
+    metrics.save()
+
+def extract_shard(args, df, output, position):
+    """
+    Extract the edits of a part of the input data in a separate process. The output of 
+    this process is written to a log file next to its database. A resumed shard skips 
+    the progress that is already merged into the output database.
+    
+    Args:
+        args: The parsed command line arguments.
+        df: A dataframe with the articles of this shard.
+        output: The path of the sqlite database of this shard.
+        position: The position of the progress bar of this process.
+    """
+    
+    # Each process stores its own metrics
+    args = argparse.Namespace(**dict(vars(args), metrics=shard_path(args.metrics, position), prometheus=shard_path(args.prometheus, position)))
+    
+    with open(output + '.log', 'w', encoding='utf-8') as log, redirect_stdout(log):
+        extract_articles(args, df, output, args.shards, position, args.output if args.resume is True else None)
+
+def main():
+    
+    parser = argparse.ArgumentParser(description='Extract Wikipedia edits made by all users on two language versions of an article.') 
+    
+    parser.add_argument('--input', metavar='input', type=str, required=True, help='Opens a csv file from the specified path.')
+    parser.add_argument('--output', metavar='output', type=str, required=True, help='Stores the extracted data to a sqlite database in the specified path.')
+    parser.add_argument('--usertype', choices=['registered', 'anonymous'], default='registered', help='Type of user to extract edits from (default: registered).')
+    parser.add_argument('--blacklist', metavar='blacklist', nargs='*', type=str, default=False, help='A list with titles to exclude from the input data.')
+    parser.add_argument('--whitelist', metavar='whitelist', nargs='*', type=str, default=False, help='A list with titles to include from the input data. Note that this overrides a blacklist.')
+    parser.add_argument('--sleep', metavar='sleep', type=int, default=0, help='Set a delay for the extraction process so the MediaWiki API does not get overloaded.')
+    parser.add_argument('--force', metavar='force', choices=['replace', 'keep'], default=False, help='Automatically replace or keep saved items.')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted extraction process. Articles and users that are completed according to the progress journal in the output database are skipped.')
+    parser.add_argument('--workers', metavar='workers', type=int, default=0, help='Fetch the revisions of an article with the specified number of threads. When 0, the revisions are fetched by a single thread (default: 0).')
+    parser.add_argument('--checkpoint', metavar='checkpoint', type=int, default=100, help='Commit the revisions of a user and their progress after the specified number of revisions, so a resumed extraction continues from there (default: 100).')
+    parser.add_argument('--buffer', metavar='buffer', type=int, default=16, help='The maximum number of revisions waiting between two stages of the extraction process (default: 16).')
+    parser.add_argument('--rate', metavar='rate', type=float, default=None, help='The maximum number of requests per second sent to the MediaWiki API (default: None).')
+    parser.add_argument('--concurrency', metavar='concurrency', type=int, default=2, help='The maximum number of simultaneous requests for each language version of Wikipedia (default: 2).')
+    parser.add_argument('--cache', metavar='cache', type=str, default=None, help='Store all extracted revisions and page metadata in a cache at the specified path (default: None).')
+    parser.add_argument('--cache_size', metavar='cache_size', type=float, default=None, help='The maximum size of the cache in megabytes. The least recently used items are removed first (default: None).')
+    parser.add_argument('--offline', action='store_true', help='Serve all requests from the cache without connecting to the MediaWiki API.')
+    parser.add_argument('--shards', metavar='shards', type=int, default=1, help='Divide the input data over the specified number of processes, which each write to a separate database that is merged into the output afterwards (default: 1).')
+    parser.add_argument('--api', metavar='api', type=str, default=None, help='Override the MediaWiki API with an URL template containing a {lang} placeholder (e.g., "http://localhost:8080/{lang}/w/api.php").')
+
+    parser.add_argument('--index', metavar='index', type=str, default=None, help='Look up the contributors of each article in the contributor index at the specified path, and only crawl articles which are not indexed yet (default: None).')
+    parser.add_argument('--refresh_index', action='store_true', help='Crawl the revisions made since each article was indexed, so the contributors in the index are up to date. By default, indexed articles are not crawled again.')
+
+    instrument.add_arguments(parser)
+
+    args = parser.parse_args()
+    
+    # Open the dataset
+    data = pd.read_csv(args.input, sep=',', encoding='utf-8')
+    
+    df = data
+
+    if args.blacklist is not False: 
+        df = data[~data.title.isin(args.blacklist)]
+    
+    if args.whitelist is not False: 
+        df = data[data.title.isin(args.whitelist)]
+    
+    data.drop_duplicates(subset="title", keep='first', inplace=True) 
+    
+    if args.offline is True and args.cache is None:
+        raise ValueError('The offline mode requires a cache. Make sure you have specified the path of the cache.')
+    
+    if args.shards > 1:
+        
+        if args.force is False:
+            raise ValueError('The sharded extraction can not ask for confirmation. Make sure you have specified --force.')
+        
+        # Each process extracts a contiguous part of the input data to its own database
+        shards = [shard_path(args.output, i) for i in range(args.shards)]
+        
+        if args.resume is True:
+            
+            # Make sure the progress journal of the output database can be read by the shards
+            db = database.connect(args.output)
+            migrations.migrate(db, verbose=False)
+            db.close()
+        
+        parts = [df.iloc[i * len(df) // args.shards:(i + 1) * len(df) // args.shards] for i in range(args.shards)]
+        
+        with multiprocessing.Pool(args.shards) as pool:
+            pool.starmap(extract_shard, [(args, part, shard, i) for i, (part, shard) in enumerate(zip(parts, shards))])
+        
+        # Combine the shards in the order of the input data. The articles in the output
+        # database are replaced, unless the extraction is resumed and the shards only
+        # hold the revisions that were not saved yet.
+        merge_db.merge(args.output, shards, remove=True, replace=args.force == 'replace' and args.resume is False)
+        
+    else:
+        extract_articles(args, df, args.output)
+
+if __name__ == "__main__": 
+   main() 
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Mar 28 10:21:07 2020
+
+@author: jdevreeze
+"""
+
+import geoip2.database
+import geoip2.errors
+
+# The default location of the GeoLite2 Country model
+MODEL = '../models/GeoLite2-Country.mmdb'
+
+class GeoIP:
+    """
+    Country lookups of IP addresses with the GeoLite2 Country model.
+
+    The model is opened once as a memory-mapped file, and each distinct address is only
+    looked up once. Addresses which are not in the model or are not valid IP addresses
+    have no country.
+    """
+
+    _reader = None
+
+    def __init__(self, path=MODEL, reader=None):
+        """
+        Open the GeoLite2 Country model.
+
+        Args:
+            path: The path of the model (default '../models/GeoLite2-Country.mmdb').
+            reader: An opened geoip2.database.Reader, in which case the path is ignored (default None).
+
+        Raises:
+            ValueError: If the model can not be opened.
+        """
+
+        if reader is not None:
+            self._reader = reader
+        else:
+            try:
+                self._reader = geoip2.database.Reader(path, mode=geoip2.database.MODE_MMAP)
+            except:
+                raise ValueError('Can not open a valid GeoLite2 Country model. Make sure you have specified the correct filename.')
+
+        self._cache = {}
+
+    def lookup(self, address):
+        """
+        Get the country of an IP address.
+
+        Args:
+            address: A string with the IP address.
+
+        Returns:
+            A tuple with the name and the ISO code of the country, which are None if the
+            country is unknown.
+        """
+
+        try:
+            return self._cache[address]
+        except KeyError:
+            pass
+
+        try:
+            country = self._reader.country(address).country
+            result = (country.name, country.iso_code)
+        except (geoip2.errors.AddressNotFoundError, ValueError):
+            result = (None, None)
+
+        self._cache[address] = result
+
+        return result
+
+    def country(self, address):
+        """
+        Get the name of the country of an IP address.
+
+        Args:
+            address: A string with the IP address.
+
+        Returns:
+            A string with the name of the country or None if it is unknown.
+        """
+
+        return self.lookup(address)[0]
+
+    def resolve(self, addresses):
+        """
+        Get the countries of several IP addresses.
+
+        Args:
+            addresses: An iterable with the IP addresses.
+
+        Returns:
+            A dict with the name and the ISO code of the country of each distinct address.
+        """
+
+        return {address : self.lookup(address) for address in set(addresses)}
+
+    def update_authors(self, cursor, names=None):
+        """
+        Store the country of the authors in the database as anonymous users.
+
+        Args:
+            cursor: A sqlite3 cursor of the extraction database.
+            names: A list with the names of the authors which are updated, or None to
+                update all authors (default None).
+
+        Returns:
+            The number of updated authors.
+        """
+
+        if names is None:
+            names = [row[0] for row in cursor.execute('''SELECT DISTINCT name FROM authors''').fetchall()]
+        countries = self.resolve(names)
+
+        cursor.executemany('''
+            UPDATE authors
+            SET country = ?, usertype = 'anonymous', flag = 1, iso = ?
+            WHERE name = ?
+        ''', [(name, iso, address) for address, (name, iso) in countries.items()])
+
+        return len(countries)
+
+    def close(self):
+        self._reader.close()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 26 10:47:52 2020
+
+@author: jdevreeze
+"""
+
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+
+def add_arguments(parser):
+    """
+    Add the command line arguments of the instrumentation to a parser.
+
+    Args:
+        parser: An argparse.ArgumentParser instance.
+    """
+
+    parser.add_argument('--metrics', metavar='metrics', type=str, default=None, help='Store the time spent in each stage and the number of processed rows as a json report in the specified path (default: None).')
+    parser.add_argument('--prometheus', metavar='prometheus', type=str, default=None, help='Store the same metrics as a Prometheus textfile in the specified path (default: None).')
+    parser.add_argument('--quiet', action='store_true', help='Do not output the progress of each processed item.')
+
+class Metrics:
+    """
+    Wall time and counters of each stage of a command line tool.
+
+    A stage records the number of calls, the time spent in these calls, and the number of
+    processed rows and bytes. Stages can be recorded by several threads at once, in which
+    case their time is the sum of the time spent by all threads.
+    """
+
+    _quiet = False
+    _report = None
+    _textfile = None
+
+    def __init__(self, tool, quiet=False, report=None, textfile=None):
+        """
+        Initialize the metrics.
+
+        Args:
+            tool: The name of the command line tool.
+            quiet: Do not output the progress of each processed item (default False).
+            report: The path of the json report (default None).
+            textfile: The path of the Prometheus textfile (default None).
+        """
+
+        self._tool = tool
+        self._quiet = quiet
+        self._report = report
+        self._textfile = textfile
+
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started = datetime.now()
+        self._start = time.perf_counter()
+
+    @classmethod
+    def from_arguments(cls, tool, args):
+        """
+        Create the metrics from parsed command line arguments (see add_arguments).
+
+        Args:
+            tool: The name of the command line tool.
+            args: The parsed command line arguments.
+
+        Returns:
+            A new instance of this class.
+        """
+
+        return cls(tool, quiet=args.quiet, report=args.metrics, textfile=args.prometheus)
+
+    @property
+    def quiet(self):
+        return self._quiet
+
+    def log(self, message):
+        """
+        Output the progress of a single item, unless the quiet mode is enabled.
+
+        Args:
+            message: A string with the message.
+        """
+
+        if self._quiet is False:
+            print(message)
+
+    @contextmanager
+    def stage(self, name, rows=0, size=0):
+        """
+        Context manager which records a single call of a stage.
+
+        Args:
+            name: The name of the stage.
+            rows: The number of processed rows (default 0).
+            size: The number of processed bytes (default 0).
+        """
+
+        start = time.perf_counter()
+
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start, 1, rows, size)
+
+    def count(self, name, rows=0, size=0):
+        """
+        Record processed rows or bytes of a stage without a call.
+
+        Args:
+            name: The name of the stage.
+            rows: The number of processed rows (default 0).
+            size: The number of processed bytes (default 0).
+        """
+
+        self.add(name, 0.0, 0, rows, size)
+
+    def add(self, name, seconds, calls, rows, size):
+        """
+        Add to the totals of a stage.
+
+        Args:
+            name: The name of the stage.
+            seconds: The time spent in the stage.
+            calls: The number of calls.
+            rows: The number of processed rows.
+            size: The number of processed bytes.
+        """
+
+        with self._lock:
+
+            if name not in self._stages:
+                self._stages[name] = {'seconds' : 0.0, 'calls' : 0, 'rows' : 0, 'bytes' : 0}
+
+            stage = self._stages[name]
+            stage['seconds'] += seconds
+            stage['calls'] += calls
+            stage['rows'] += rows
+            stage['bytes'] += size
+
+    def report(self):
+        """
+        Get all recorded metrics.
+
+        Returns:
+            A dict with the tool, the start time, the elapsed time, and the totals and
+            throughput of each stage.
+        """
+
+        with self._lock:
+            stages = {name : dict(stage) for name, stage in self._stages.items()}
+
+        for stage in stages.values():
+            stage['rows_per_second'] = stage['rows'] / stage['seconds'] if stage['seconds'] > 0 else None
+
+        return {
+            'tool' : self._tool,
+            'started' : self._started.isoformat(timespec='seconds'),
+            'elapsed' : time.perf_counter() - self._start,
+            'stages' : stages
+        }
+
+    def prometheus(self):
+        """
+        Format all recorded metrics in the Prometheus text exposition format.
+
+        Returns:
+            A string with the metrics.
+        """
+
+        report = self.report()
+
+        series = [
+            ('seconds', 'audience_tuning_stage_seconds_total', 'Wall time spent in each stage.'),
+            ('calls', 'audience_tuning_stage_calls_total', 'Number of calls of each stage.'),
+            ('rows', 'audience_tuning_stage_rows_total', 'Number of rows processed by each stage.'),
+            ('bytes', 'audience_tuning_stage_bytes_total', 'Number of bytes processed by each stage.')
+        ]
+
+        lines = []
+
+        for key, metric, description in series:
+
+            lines.append('# HELP %s %s' % (metric, description))
+            lines.append('# TYPE %s counter' % (metric))
+
+            for name, stage in sorted(report['stages'].items()):
+                lines.append('%s{tool="%s",stage="%s"} %s' % (metric, self._tool, name, repr(float(stage[key])) if key == 'seconds' else stage[key]))
+
+        lines.append('# HELP audience_tuning_elapsed_seconds Wall time of the last run.')
+        lines.append('# TYPE audience_tuning_elapsed_seconds gauge')
+        lines.append('audience_tuning_elapsed_seconds{tool="%s"} %r' % (self._tool, report['elapsed']))
+
+        return '\n'.join(lines) + '\n'
+
+    def save(self):
+        """
+        Store the json report and the Prometheus textfile, if their paths are specified.
+
+        The files are replaced at once, so a collector never reads an incomplete file.
+        """
+
+        if self._report is not None:
+            self.__write(self._report, json.dumps(self.report(), indent=2))
+
+        if self._textfile is not None:
+            self.__write(self._textfile, self.prometheus())
+
+    def __write(self, path, content):
+        """
+        Internal method which replaces a file.
+
+        Args:
+            path: The path of the file.
+            content: A string with the content.
+        """
+
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(content)
+
+        os.replace(temporary, path)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Apr  2 10:31:08 2020
+
+@author: jdevreeze
+"""
+
+class Locator:
+    """
+    Approximate locator of edits in a revision text.
+
+    An edit which is not part of the text is located by the longest of its prefixes and the
+    longest of its suffixes which occur in the text. If a prefix occurs, all shorter prefixes
+    occur as well (and likewise for suffixes), so the longest one is found with a binary
+    search over the candidate lengths. Each step is a single substring search, instead of
+    searching the text for each candidate length in turn.
+
+    A locator is created once for each revision text and used for all edits of the revision.
+    """
+
+    def __init__(self, text):
+        """
+        Create the locator of a text.
+
+        Args:
+            text: A string with the revision text.
+        """
+
+        self._text = text
+        self._found = {}
+
+    @property
+    def text(self):
+        return self._text
+
+    def occurs(self, pattern):
+        """
+        Check whether a pattern occurs in the text. The results are kept for all edits of
+        the revision.
+
+        Args:
+            pattern: A string with the pattern.
+
+        Returns:
+            True if the pattern occurs in the text, otherwise False.
+        """
+
+        try:
+            return self._found[pattern]
+        except KeyError:
+            found = self._found[pattern] = pattern in self._text
+            return found
+
+    def prefix(self, edit, lengths):
+        """
+        Get the longest prefix of an edit which occurs in the text.
+
+        Args:
+            edit: A string with the edit.
+            lengths: A list with the candidate lengths of the prefix, from long to short.
+
+        Returns:
+            The longest candidate prefix which occurs in the text, or None if none occurs.
+        """
+
+        return self.__first([edit[:length] for length in lengths])
+
+    def suffix(self, edit, starts):
+        """
+        Get the longest suffix of an edit which occurs in the text.
+
+        Args:
+            edit: A string with the edit.
+            starts: A list with the candidate start positions of the suffix, from first to
+                last.
+
+        Returns:
+            The longest candidate suffix which occurs in the text, or None if none occurs.
+        """
+
+        return self.__first([edit[start:] for start in starts])
+
+    def before(self, pattern, length):
+        """
+        Get the text before the last occurrence of a pattern.
+
+        Args:
+            pattern: A string which occurs in the text.
+            length: The maximum number of characters.
+
+        Returns:
+            A string with at most the specified number of characters.
+        """
+
+        return self._text[:self._text.rfind(pattern)][-length:]
+
+    def after(self, pattern, length):
+        """
+        Get the text after the last occurrence of a pattern.
+
+        Args:
+            pattern: A string which occurs in the text.
+            length: The maximum number of characters.
+
+        Returns:
+            A string with at most the specified number of characters.
+        """
+
+        return self._text[self._text.rfind(pattern) + len(pattern):][:length]
+
+    def __first(self, patterns):
+        """
+        Internal method which gets the first of a list of ever shorter patterns that occurs in the text.
+        """
+
+        low, high = 0, len(patterns)
+
+        while low < high:
+
+            middle = (low + high) // 2
+
+            if self.occurs(patterns[middle]):
+                high = middle
+            else:
+                low = middle + 1
+
+        return patterns[low] if low < len(patterns) else None
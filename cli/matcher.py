@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 31 10:05:52 2020
+
+@author: jdevreeze
+"""
+
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+class Automaton:
+    """
+    Aho-Corasick automaton which finds all patterns that occur in a text in a single pass.
+
+    The automaton of the pyahocorasick package is used if it is installed, otherwise an
+    implementation in Python is used, which gives the same results.
+    """
+
+    def __init__(self, patterns, native=True):
+        """
+        Build the automaton.
+
+        Args:
+            patterns: An iterable with the patterns. Empty patterns are ignored.
+            native: Use the pyahocorasick package if it is installed (default True).
+        """
+
+        self._patterns = [pattern for pattern in dict.fromkeys(patterns) if pattern]
+        self._native = native is True and ahocorasick is not None
+
+        if self._native is True:
+
+            self._automaton = ahocorasick.Automaton()
+
+            for i, pattern in enumerate(self._patterns):
+                self._automaton.add_word(pattern, i)
+
+            if self._patterns:
+                self._automaton.make_automaton()
+
+        else:
+            self.__build()
+
+    @property
+    def native(self):
+        return self._native
+
+    def find(self, text):
+        """
+        Find the patterns that occur in a text.
+
+        Args:
+            text: A string with the text.
+
+        Returns:
+            A set with the patterns that occur at least once.
+        """
+
+        if not self._patterns:
+            return set()
+
+        if self._native is True:
+            return {self._patterns[i] for _, i in self._automaton.iter(text)}
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        found = set()
+        remaining = len(self._patterns)
+        state = 0
+
+        for character in text:
+
+            while state and character not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(character, 0)
+
+            if output[state]:
+
+                found.update(output[state])
+
+                # Stop as soon as all patterns have been found
+                if len(found) == remaining:
+                    break
+
+        return {self._patterns[i] for i in found}
+
+    def __build(self):
+        """
+        Internal method which builds the trie of all patterns and its failure links.
+        """
+
+        self._goto = [{}]
+        self._output = [()]
+
+        for i, pattern in enumerate(self._patterns):
+
+            state = 0
+
+            for character in pattern:
+
+                if character not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append(())
+                    self._goto[state][character] = len(self._goto) - 1
+
+                state = self._goto[state][character]
+
+            self._output[state] = self._output[state] + (i,)
+
+        self._fail = [0] * len(self._goto)
+
+        # The failure link of a state points to the longest proper suffix which is also a prefix of a pattern
+        queue = deque(self._goto[0].values())
+
+        while queue:
+
+            state = queue.popleft()
+
+            for character, child in self._goto[state].items():
+
+                queue.append(child)
+
+                link = self._fail[state]
+
+                while link and character not in self._goto[link]:
+                    link = self._fail[link]
+
+                self._fail[child] = self._goto[link].get(character, 0) if self._goto[link].get(character, 0) != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
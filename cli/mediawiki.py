@@ -0,0 +1,636 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 16 11:04:52 2020
+
+@author: jdevreeze
+"""
+
+import json
+import threading
+
+from collections import OrderedDict
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+from parsewiki import page
+
+class Parse(page.Parse):
+    """
+    Extension of the ParseWiki class which is used by the extraction process.
+
+    All requests to the MediaWiki API go through a single internal method of the ParseWiki
+    class. This method is overridden to throttle the requests with a shared rate limiter, to
+    serve requests from a persistent cache, and to allow a different API endpoint (e.g., a
+    local stand-in MediaWiki server).
+
+    The properties of revisions (e.g., timestamp and user) are requested in batches and
+    kept in memory, as well as the parsed revisions, which are requested only once for the
+    text, references, and external links.
+    """
+
+    _limiter = None
+    _cache = None
+    _metrics = None
+    _shared = None
+
+    # The maximum number of revisions shared by all copies of a page
+    _shared_size = 256
+
+    # Request parameters which identify one or more revisions
+    _revision_params = ['oldid', 'fromrev', 'rvstartid', 'revids']
+
+    # The maximum number of revisions in a single request
+    _batch_size = 50
+
+    # In-process LRU caches that are shared by all threads
+    _properties = OrderedDict()
+    _properties_size = 10000
+    _responses = OrderedDict()
+    _responses_size = 32
+    _lru_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, limiter=None, api=None, cache=None, metrics=None):
+        """
+        Configure the requests for all instances of this class.
+
+        Args:
+            limiter: A RateLimiter instance that throttles all requests (default None).
+            api: An URL template of the MediaWiki API with a '{lang}' placeholder for the
+                language code (default None), e.g. 'http://localhost:8080/{lang}/w/api.php'.
+            cache: A RevisionCache instance to store revisions and page metadata (default None).
+            metrics: A Metrics instance that records the time spent on requests and the
+                cache (default None).
+
+        Raises:
+            ValueError: The API template must contain a '{lang}' placeholder.
+        """
+
+        cls._limiter = limiter
+        cls._cache = cache
+        cls._metrics = metrics
+
+        if api is not None:
+
+            if '{lang}' not in api:
+                raise ValueError('The API template must contain a \'{lang}\' placeholder.')
+
+            cls._prefix, cls._suffix = api.split('{lang}', 1)
+
+    def fork(self, lang):
+        """
+        Create a copy of this page for a single language version.
+
+        The copy shares the metadata of this page, but does not contain any revisions or
+        users. This allows each thread to extract revisions without changing the same
+        object. Revisions extracted by one copy are available to all other copies.
+
+        Args:
+            lang: The article language.
+
+        Returns:
+            A new instance of this class.
+        """
+
+        if self._shared is None:
+            self._shared = OrderedDict()
+
+        wiki = object.__new__(type(self))
+
+        wiki._ignore = self._ignore
+        wiki._print_errors = self._print_errors
+        wiki._pageid = self._pageid
+        wiki._languages = self._languages
+        wiki._shared = self._shared
+        wiki._content = {'id' : self._content['id'], 'language' : self._content['language'], 'pages' : {}}
+
+        for i in self._content['pages']:
+            if lang in self._content['pages'][i]['language']:
+                wiki._content['pages'][0] = {k : v for k, v in self._content['pages'][i].items() if k not in ['revisions', 'users']}
+                break
+
+        return wiki
+
+    def has_revision(self, lang, revid):
+        """
+        Check whether a revision has already been extracted.
+
+        Args:
+            lang: The article language.
+            revid: The revision identifier.
+
+        Returns:
+            True if the revision is available, otherwise False.
+        """
+
+        return self.__get_revision(lang, revid) is not None
+
+    def get_contributors(self, lang, since=None):
+        """
+        Get all users who contributed to this page without extracting the page.
+
+        Args:
+            lang: The article language.
+            since: Only include revisions made after the revision with this identifier (default None).
+
+        Returns:
+            A tuple with a dict of the number of revisions of each contributor, which is
+            divided in 'registered' and 'anonymous' users, and the identifier of the newest
+            revision (or since if there are no newer revisions).
+        """
+
+        params = {
+            'action' : 'query',
+            'prop' : 'revisions',
+            'titles' : self.get_title(lang).replace(' ', '_'),
+            'rvprop' : 'ids|user',
+            'format' : 'json',
+            'rvlimit' : '500'
+        }
+
+        if since is not None:
+            params['rvendid'] = str(since)
+
+        users = {
+            'anonymous' : {},
+            'registered' : {}
+        }
+
+        newest = since
+
+        while True:
+
+            data = self._Parse__extract(params, lang)
+
+            for pageid in data['query']['pages']:
+                for revision in data['query']['pages'][pageid].get('revisions', []):
+
+                    # The revisions are listed from the newest to the oldest, including the last revision
+                    if since is not None and revision['revid'] <= since:
+                        continue
+
+                    if newest is None or revision['revid'] > newest:
+                        newest = revision['revid']
+
+                    if 'user' in revision:
+                        whom = 'anonymous' if 'anon' in revision else 'registered'
+                        users[whom][revision['user']] = users[whom].get(revision['user'], 0) + 1
+
+            if 'continue' not in data:
+                break
+
+            params['rvcontinue'] = data['continue']['rvcontinue']
+
+        return users, newest
+
+    def get_revisions_by_user(self, lang, user):
+        """
+        Get all revisions made by a user without extracting them.
+
+        The properties of the revisions are kept in memory, so the revisions can be
+        extracted afterwards without requesting them again.
+
+        Args:
+            lang: The article language.
+            user: The name of the user.
+
+        Returns:
+            A list with tuples of the revision identifier and the identifier of the
+            previous revision, from the newest to the oldest revision.
+        """
+
+        params = {
+            'action' : 'query',
+            'prop' : 'revisions',
+            'titles' : self.get_title(lang).replace(' ', '_'),
+            'rvprop' : 'ids|flags|timestamp|user|comment|size',
+            'format' : 'json',
+            'rvlimit' : '500',
+            'rvuser' : user.replace(' ', '_')
+        }
+
+        revisions = []
+
+        while True:
+
+            data = self._Parse__extract(params, lang)
+
+            for pageid in data['query']['pages']:
+                for revision in data['query']['pages'][pageid].get('revisions', []):
+                    revisions.append((str(revision['revid']), revision.get('parentid', 0)))
+
+            if 'continue' not in data:
+                break
+
+            params['rvcontinue'] = data['continue']['rvcontinue']
+
+        return revisions
+
+    def prefetch_properties(self, lang, revids):
+        """
+        Request the properties of several revisions in batches.
+
+        Args:
+            lang: The article language.
+            revids: A list with revision identifiers.
+        """
+
+        with self._lru_lock:
+            missing = [r for r in dict.fromkeys(str(r) for r in revids) if (lang, r) not in self._properties and (lang, r) not in (self._shared or {})]
+
+        # Cached revisions are restored without their properties
+        if self._cache is not None:
+            missing = [r for r in missing if not self._cache.contains('revision', lang, r)]
+
+        for i in range(0, len(missing), self._batch_size):
+            self._Parse__extract({
+                'action' : 'query',
+                'prop' : 'revisions',
+                'revids' : '|'.join(missing[i:i + self._batch_size]),
+                'rvprop' : 'ids|flags|timestamp|user|comment|size',
+                'format' : 'json'
+            }, lang)
+
+    def prefetch_revisions(self, lang, revids):
+        """
+        Extract several revisions with as few requests as possible.
+
+        Revisions that are already extracted or cached are skipped. The properties of
+        all remaining revisions are requested in batches, after which each revision is
+        parsed.
+
+        Args:
+            lang: The article language.
+            revids: A list with revision identifiers.
+
+        Returns:
+            An instance of this class is returned.
+        """
+
+        pending = []
+
+        for revid in dict.fromkeys(str(r) for r in revids):
+
+            if self.has_revision(lang, revid) or self.__restore_revision(lang, revid):
+                continue
+
+            pending.append(revid)
+
+        self.prefetch_properties(lang, pending)
+
+        for revid in pending:
+            self.__extract_revision(lang, revid)
+
+        return self
+
+    def extract_revision(self, lang=None, revid=None, date=None, lists=True, newest=False, empty=False):
+        """
+        Extract content from a single wikipedia revision page.
+
+        Revisions which have already been extracted (also by a copy of this page) are not
+        requested again. When a cache is configured, revisions are served from and saved
+        to the cache.
+
+        Returns:
+            An instance of this class is returned.
+        """
+
+        if revid is None or lists is not True or empty is not False:
+            return super().extract_revision(lang=lang, revid=revid, date=date, lists=lists, newest=newest, empty=empty)
+
+        if lang is None:
+            lang = list(self._languages['default'].keys())[0]
+
+        if self.has_revision(lang, revid) or self.__restore_revision(lang, revid):
+            return self
+
+        return self.__extract_revision(lang, revid)
+
+    def get_differences(self, lang=None, revid=None, date=None, compare=False):
+        """
+        Extract all the differences from a saved wikipedia revision compared to its previous version.
+
+        Revisions are looked up by their exact identifier, whereas ParseWiki also matches
+        identifiers that contain the requested identifier.
+
+        Returns:
+            A list with all the differences, and optionally a list with the original texts.
+        """
+
+        if revid is None:
+            return super().get_differences(lang=lang, revid=revid, date=date, compare=compare)
+
+        if lang is None:
+            lang = list(self._languages['default'].keys())[0]
+
+        differences = list()
+        original = list()
+
+        revision = self.__get_revision(lang, revid)
+
+        if revision is not None and revision['empty'] is False:
+            differences = revision['differences']['difference']
+            original = revision['differences']['original']
+
+        if compare is True:
+            return differences, original
+
+        return differences
+
+    def __extract_revision(self, lang, revid):
+        """
+        Internal method which requests a revision and shares it with all copies of this page.
+
+        Args:
+            lang: The article language.
+            revid: The revision identifier.
+
+        Returns:
+            An instance of this class is returned.
+        """
+
+        result = super().extract_revision(lang=lang, revid=revid)
+
+        if result is not False:
+
+            revision = self.__get_revision(lang, revid)
+
+            if revision is not None:
+
+                if self._shared is not None:
+                    self.__share(lang, revid, revision)
+
+                if self._cache is not None:
+                    with self.__stage('cache'):
+                        self._cache.put('revision', lang, revid, revision)
+
+        return result
+
+    def __restore_revision(self, lang, revid):
+        """
+        Internal method which adds a revision extracted by a copy of this page or a cached
+        revision.
+
+        Args:
+            lang: The article language.
+            revid: The revision identifier.
+
+        Returns:
+            True if the revision is restored, otherwise False.
+        """
+
+        revision = None
+
+        if self._shared is not None:
+            with self._lru_lock:
+                revision = self._shared.get((lang, str(revid)))
+
+        if revision is None and self._cache is not None:
+            with self.__stage('cache'):
+                revision = self._cache.get('revision', lang, revid)
+
+        if revision is None:
+            return False
+
+        self.__add_revision(lang, revision)
+
+        return True
+
+    def __share(self, lang, revid, revision):
+        """
+        Internal method which shares a revision with all copies of this page. The least
+        recently shared revisions are removed, so the memory use does not grow with the
+        number of revisions of a page.
+
+        Args:
+            lang: The article language.
+            revid: The revision identifier.
+            revision: A dict with the revision data.
+        """
+
+        with self._lru_lock:
+
+            self._shared[(lang, str(revid))] = revision
+            self._shared.move_to_end((lang, str(revid)))
+
+            while len(self._shared) > self._shared_size:
+                self._shared.popitem(last=False)
+
+    def _Parse__extract(self, params, lang):
+        """
+        Internal method which extracts information from the MediaWiki API.
+
+        Requests for a single revision are cached by the revision itself. All other
+        requests (i.e., page metadata) are always requested again, unless the cache is
+        offline.
+
+        Args:
+            params: A dict with the WikiMedia API paramaters.
+            lang: The article language.
+
+        Returns:
+            A dict with the response of the MediaWiki API.
+
+        Raises:
+            ValueError: The request is not available in the offline cache.
+        """
+
+        if self._cache is None:
+            return self.__request(params, lang)
+
+        metadata = not any(k in params for k in self._revision_params)
+
+        if metadata:
+            key = json.dumps(params, sort_keys=True, default=str)
+
+        if self._cache.offline:
+
+            with self.__stage('cache'):
+                response = self._cache.get('request', lang, key) if metadata else None
+
+            if response is None:
+                raise ValueError('The request is not available in the offline cache: %s' % (json.dumps(params, default=str)))
+
+            if params.get('prop') == 'revisions':
+                self.__remember_properties(lang, response)
+
+            return response
+
+        response = self.__request(params, lang)
+
+        if metadata:
+            with self.__stage('cache'):
+                self._cache.put('request', lang, key, response)
+
+        return response
+
+    def _Parse__extract_property(self, params, lang):
+        """
+        Internal method which extracts the revision identifier and timestamp.
+
+        The properties are taken from memory if they were part of a previous response.
+
+        Args:
+            params: A dict with the WikiMedia API paramaters.
+            lang: The article language.
+
+        Returns:
+            The revision identifier, timestamp, user, user comment, and size.
+        """
+
+        if 'rvstartid' in params and params.get('rvendid') == params['rvstartid']:
+            with self._lru_lock:
+                properties = self._properties.get((lang, str(params['rvstartid'])))
+            if properties is not None:
+                return properties
+
+        return super()._Parse__extract_property(params, lang)
+
+    def __request(self, params, lang):
+        """
+        Internal method which sends a request to the MediaWiki API.
+
+        A parsed revision is requested once with its text and external links, and kept in
+        memory for subsequent requests of the same revision. The properties of all
+        revisions in a response are kept in memory as well.
+
+        Args:
+            params: A dict with the WikiMedia API paramaters.
+            lang: The article language.
+
+        Returns:
+            A dict with the response of the MediaWiki API.
+        """
+
+        if params.get('action') == 'parse' and 'oldid' in params and params.get('prop') in ['text', 'externallinks']:
+
+            key = (self._prefix, lang, str(params['oldid']))
+
+            with self._lru_lock:
+                response = self._responses.get(key)
+                if response is not None:
+                    self._responses.move_to_end(key)
+                    return response
+
+            response = self.__send(dict(params, prop='text|externallinks'), lang)
+
+            with self._lru_lock:
+                self._responses[key] = response
+                if len(self._responses) > self._responses_size:
+                    self._responses.popitem(last=False)
+
+            return response
+
+        response = self.__send(params, lang)
+
+        if params.get('prop') == 'revisions':
+            self.__remember_properties(lang, response)
+
+        return response
+
+    def __remember_properties(self, lang, response):
+        """
+        Internal method which keeps the properties of all revisions in a response.
+
+        Args:
+            lang: The article language.
+            response: A dict with the response of the MediaWiki API.
+        """
+
+        try:
+            pages = response['query']['pages']
+        except (KeyError, TypeError):
+            return
+
+        with self._lru_lock:
+
+            for pageid in pages:
+                for revision in pages[pageid].get('revisions', []):
+
+                    if not all(k in revision for k in ['revid', 'timestamp', 'user', 'size']):
+                        continue
+
+                    self._properties[(lang, str(revision['revid']))] = (
+                        revision['revid'],
+                        revision['timestamp'],
+                        revision['user'],
+                        revision.get('comment', ''),
+                        revision['size']
+                    )
+
+            while len(self._properties) > self._properties_size:
+                self._properties.popitem(last=False)
+
+    def __send(self, params, lang):
+        """
+        Internal method which sends a throttled request to the MediaWiki API.
+
+        Args:
+            params: A dict with the WikiMedia API paramaters.
+            lang: The article language.
+
+        Returns:
+            A dict with the response of the MediaWiki API.
+        """
+
+        if self._limiter is None:
+            with self.__stage('api'):
+                return super()._Parse__extract(params, lang)
+
+        host = urlsplit(self._prefix + lang + self._suffix).netloc
+
+        with self._limiter.limit(host), self.__stage('api'):
+            return super()._Parse__extract(params, lang)
+
+    def __stage(self, name):
+        """
+        Internal method which records the time spent in a stage, if metrics are configured.
+
+        Args:
+            name: The name of the stage.
+
+        Returns:
+            A context manager.
+        """
+
+        if self._metrics is None:
+            return nullcontext()
+
+        return self._metrics.stage(name, rows=1)
+
+    def __get_revision(self, lang, revid):
+        """
+        Internal method which retrieves an extracted revision.
+
+        Args:
+            lang: The article language.
+            revid: The revision identifier.
+
+        Returns:
+            None if the revision does not exist; A dict with the revision data if the
+            revision exists.
+        """
+
+        for i in self._content['pages']:
+            if lang in self._content['pages'][i]['language']:
+                revisions = self._content['pages'][i].get('revisions', {})
+                for j in revisions:
+                    if revisions[j]['oldid'] == str(revid):
+                        return revisions[j]
+
+        return None
+
+    def __add_revision(self, lang, revision):
+        """
+        Internal method which saves a revision by the specified language.
+
+        Args:
+            lang: The article language.
+            revision: A dict with the revision data.
+        """
+
+        for i in self._content['pages']:
+            if lang in self._content['pages'][i]['language']:
+                if 'revisions' in self._content['pages'][i]:
+                    self._content['pages'][i]['revisions'][len(self._content['pages'][i]['revisions'])] = revision
+                else:
+                    self._content['pages'][i]['revisions'] = {0 : revision}
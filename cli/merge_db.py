@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 24 16:05:31 2020
+
+@author: jdevreeze
+"""
+
+import os
+import hashlib
+import argparse
+
+import database
+import migrations
+import textstore
+
+def columns(cursor, table, schema='main'):
+    """
+    Get the columns of a table.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        table: The name of the table.
+        schema: The name of the attached database (default 'main').
+
+    Returns:
+        A list with the column names.
+    """
+
+    return [row[1] for row in cursor.execute('''PRAGMA %s.table_info(%s)''' % (schema, table))]
+
+def copy_table(cursor, table, replace, condition=None, ignore=False):
+    """
+    Copy the rows of a table in the attached shard to the main database.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        table: The name of the table.
+        replace: A dict with SQL expressions for columns that need to be remapped.
+        condition: An SQL expression which selects the copied rows, or None to copy all
+            rows (default None).
+        ignore: Skip the rows which conflict with a row in the main database (default False).
+
+    Returns:
+        The number of copied rows.
+    """
+
+    names = columns(cursor, table, 'shard')
+    values = [replace.get(name, '%s.%s' % (table, name)) for name in names]
+    where = '''''' if condition is None else '''WHERE %s''' % (condition)
+
+    cursor.execute('''INSERT %s INTO main.%s(%s) SELECT %s FROM shard.%s AS %s %s ORDER BY %s.rowid''' % (
+        'OR IGNORE' if ignore is True else '', table, ', '.join(names), ', '.join(values), table, table, where, table))
+
+    return cursor.rowcount
+
+def offset(cursor, table):
+    return cursor.execute('''SELECT COALESCE(MAX(id), 0) FROM main.%s''' % (table)).fetchone()[0]
+
+def checksum(path, size=1048576):
+    """
+    Get the SHA-1 digest of a file, which identifies a shard in the ledger of merged shards.
+
+    Args:
+        path: The path of the file.
+        size: The number of bytes that are read at once (default 1048576).
+
+    Returns:
+        A string with the digest.
+    """
+
+    sha1 = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(size), b''):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+def remove_articles(cursor, parents):
+    """
+    Delete articles from the main database, together with their translations, revisions,
+    edits, errors, and progress.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        parents: An SQL query which selects the identifiers of the parent articles.
+
+    Returns:
+        A list with the text keys of the deleted revisions.
+    """
+
+    articles = '''SELECT id FROM main.articles WHERE id IN (%s) OR parent_id IN (%s)''' % (parents, parents)
+    revisions = '''SELECT id FROM main.revisions WHERE article_id IN (%s)''' % (articles)
+
+    keys = [key for row in cursor.execute('''SELECT content_hash, previous_hash FROM main.revisions WHERE article_id IN (%s)''' % (articles)).fetchall() for key in row]
+
+    cursor.execute('''DELETE FROM main.edits WHERE revision_id IN (%s)''' % (revisions))
+    cursor.execute('''DELETE FROM main.revisions WHERE article_id IN (%s)''' % (articles))
+    cursor.execute('''DELETE FROM main.errors WHERE article_id IN (%s)''' % (articles))
+    cursor.execute('''DELETE FROM main.progress WHERE article_id IN (%s)''' % (parents))
+    cursor.execute('''DELETE FROM main.articles WHERE id IN (%s)''' % (articles))
+
+    return keys
+
+def merge_shard(db, path, replace=False):
+    """
+    Merge a shard into the main database.
+
+    The identifiers of articles, revisions, and edits are shifted beyond the largest
+    identifier in the main database, whereas authors are matched by name. All references
+    between the tables are remapped accordingly. An article which is already in the main
+    database (with the same title and language) is either replaced by the article in the
+    shard, or the revisions of the shard that are not in the main database yet are added
+    to it. Each merged shard is recorded in the ledger of the main database in the same
+    transaction, so a shard is never merged twice.
+
+    Args:
+        db: A sqlite3 connection with the main database.
+        path: The path of the shard.
+        replace: Replace the articles which are already in the main database (default False).
+
+    Returns:
+        The number of merged revisions, or None if the shard has been merged before.
+    """
+
+    # Make sure the shard has the same schema as the main database
+    shard = database.connect(path, pragmas=False)
+    migrations.migrate(shard, verbose=False)
+    shard.close()
+
+    digest = checksum(path)
+
+    if db.execute('''SELECT 1 FROM merged_shards WHERE digest = ?''', (digest,)).fetchone() is not None:
+        return None
+
+    cursor = db.cursor()
+    cursor.execute('''ATTACH DATABASE ? AS shard''', (path,))
+
+    try:
+
+        cursor.execute('''BEGIN''')
+
+        # Parent articles of the shard which are already in the main database
+        matched = '''
+            SELECT parents.id AS old, main.articles.id AS new FROM shard.articles AS parents
+            INNER JOIN main.articles ON main.articles.title = parents.title AND main.articles.language IS parents.language
+            WHERE parents.parent_id = 0 AND main.articles.parent_id = 0
+        '''
+
+        keys = []
+
+        if replace is True:
+            keys = remove_articles(cursor, '''SELECT new FROM (%s)''' % (matched))
+
+        # The remaining articles of the shard, and their translations, are added to the
+        # articles in the main database
+        cursor.execute('''DROP TABLE IF EXISTS temp.articles_map''')
+        cursor.execute('''CREATE TEMP TABLE articles_map AS %s''' % (matched))
+        cursor.execute('''
+            INSERT INTO temp.articles_map(old, new)
+            SELECT translations.id, MIN(main.articles.id) FROM shard.articles AS translations
+            INNER JOIN temp.articles_map AS parents ON parents.old = translations.parent_id
+            INNER JOIN main.articles ON main.articles.parent_id = parents.new AND main.articles.language IS translations.language
+            GROUP BY translations.id
+        ''')
+        cursor.execute('''CREATE UNIQUE INDEX temp.idx_articles_map ON articles_map(old)''')
+
+        articles = offset(cursor, 'articles')
+        revisions = offset(cursor, 'revisions')
+        edits = offset(cursor, 'edits')
+
+        # Authors who contributed to articles in several shards are only stored once
+        names = [name for name in columns(cursor, 'authors', 'shard') if name != 'id']
+
+        cursor.execute('''
+            INSERT INTO main.authors(%s) SELECT %s FROM shard.authors
+            WHERE name NOT IN (SELECT name FROM main.authors) ORDER BY id
+        ''' % (', '.join(names), ', '.join(names)))
+        cursor.execute('''DROP TABLE IF EXISTS temp.authors_map''')
+        cursor.execute('''
+            CREATE TEMP TABLE authors_map AS
+            SELECT shard.authors.id AS old, MIN(main.authors.id) AS new FROM shard.authors
+            INNER JOIN main.authors ON main.authors.name = shard.authors.name
+            GROUP BY shard.authors.id
+        ''')
+        cursor.execute('''CREATE UNIQUE INDEX temp.idx_authors_map ON authors_map(old)''')
+
+        author = '(SELECT new FROM temp.authors_map WHERE old = %s.author_id)'
+        article = 'COALESCE((SELECT new FROM temp.articles_map WHERE old = %s.%s), %s.%s + %d)'
+
+        # Revisions which are already saved for the same article are not added again
+        cursor.execute('''DROP TABLE IF EXISTS temp.revisions_kept''')
+        cursor.execute('''
+            CREATE TEMP TABLE revisions_kept AS
+            SELECT id FROM shard.revisions WHERE NOT EXISTS (
+                SELECT 1 FROM main.revisions AS saved
+                WHERE saved.revision_id = revisions.revision_id AND saved.article_id = %s
+            )
+        ''' % (article % ('revisions', 'article_id', 'revisions', 'article_id', articles)))
+        cursor.execute('''CREATE UNIQUE INDEX temp.idx_revisions_kept ON revisions_kept(id)''')
+
+        copy_table(cursor, 'articles', {
+            'id' : 'articles.id + %d' % (articles),
+            'parent_id' : 'CASE WHEN articles.parent_id = 0 THEN 0 ELSE %s END' % (article % ('articles', 'parent_id', 'articles', 'parent_id', articles))
+        }, 'articles.id NOT IN (SELECT old FROM temp.articles_map)')
+        merged = copy_table(cursor, 'revisions', {
+            'id' : 'revisions.id + %d' % (revisions),
+            'article_id' : article % ('revisions', 'article_id', 'revisions', 'article_id', articles),
+            'author_id' : author % ('revisions')
+        }, 'revisions.id IN temp.revisions_kept')
+        copy_table(cursor, 'edits', {
+            'id' : 'edits.id + %d' % (edits),
+            'revision_id' : 'edits.revision_id + %d' % (revisions)
+        }, 'edits.revision_id IN temp.revisions_kept')
+        copy_table(cursor, 'errors', {
+            'id' : 'NULL',
+            'article_id' : article % ('errors', 'article_id', 'errors', 'article_id', articles),
+            'author_id' : author % ('errors')
+        }, '''NOT EXISTS (
+            SELECT 1 FROM main.errors AS saved
+            WHERE saved.article_id = %s AND saved.revision_id IS errors.revision_id AND saved.language IS errors.language
+        )''' % (article % ('errors', 'article_id', 'errors', 'article_id', articles)))
+
+        copy_table(cursor, 'progress', {
+            'article_id' : article % ('progress', 'article_id', 'progress', 'article_id', articles)
+        }, ignore=True)
+
+        # Identical texts are addressed by the same key in all shards, and only the texts
+        # of the added revisions are copied
+        cursor.execute('''
+            INSERT OR IGNORE INTO main.texts(hash, data) SELECT hash, data FROM shard.texts
+            WHERE hash IN (SELECT content_hash FROM shard.revisions WHERE id IN temp.revisions_kept)
+            OR hash IN (SELECT previous_hash FROM shard.revisions WHERE id IN temp.revisions_kept)
+        ''')
+
+        textstore.remove_texts(cursor, keys)
+
+        cursor.execute('''INSERT INTO main.merged_shards(digest, path, timestamp) VALUES(?, ?, datetime('now'))''', (digest, path,))
+
+        db.commit()
+
+    except:
+        db.rollback()
+        raise
+
+    finally:
+        cursor.execute('''DROP TABLE IF EXISTS temp.authors_map''')
+        cursor.execute('''DROP TABLE IF EXISTS temp.articles_map''')
+        cursor.execute('''DROP TABLE IF EXISTS temp.revisions_kept''')
+        cursor.execute('''DETACH DATABASE shard''')
+
+    return merged
+
+def remove_shard(path):
+    """
+    Delete a shard, including its write-ahead log.
+
+    Args:
+        path: The path of the shard.
+    """
+
+    for name in [path, path + '-wal', path + '-shm']:
+        if os.path.exists(name):
+            os.remove(name)
+
+def merge(output, shards, verbose=True, remove=False, replace=False):
+    """
+    Merge several extraction databases into a single database.
+
+    Args:
+        output: The path of the main database, which is created if it does not exist.
+        shards: A list with the paths of the shards in the order in which they are merged.
+        verbose: Output the number of revisions merged from each shard (default True).
+        remove: Delete each shard as soon as it is merged (default False).
+        replace: Replace the articles which are already in the main database (default False).
+
+    Returns:
+        The number of merged revisions.
+    """
+
+    db = database.connect(output)
+    migrations.migrate(db, verbose=verbose)
+
+    total = 0
+
+    for path in shards:
+
+        merged = merge_shard(db, path, replace)
+
+        if remove is True:
+            remove_shard(path)
+
+        if merged is None:
+            if verbose is True:
+                print('Skipped %s, because it has been merged before' % (path))
+            continue
+
+        total += merged
+
+        if verbose is True:
+            print('Merged %d revision(s) from %s' % (merged, path))
+
+    db.close()
+
+    return total
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Merge several databases with extracted Wikipedia edits into a single database.')
+
+    parser.add_argument('--input', metavar='input', nargs='+', type=str, required=True, help='The sqlite databases which are merged.')
+    parser.add_argument('--output', metavar='output', type=str, required=True, help='Stores the merged data to a sqlite database in the specified path.')
+    parser.add_argument('--replace', action='store_true', help='Replace the articles which are already in the output database. By default, only the revisions which are not in the output database yet are added to these articles.')
+
+    args = parser.parse_args()
+
+    if args.output in args.input:
+        raise ValueError('The output database can not be merged into itself.')
+
+    merge(args.output, args.input, replace=args.replace)
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 20 10:21:44 2020
+
+@author: jdevreeze
+"""
+
+import textstore
+
+def add_column(cursor, table, column, definition):
+    """
+    Add a column to a table if it does not exist yet.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        table: The name of the table.
+        column: The name of the column.
+        definition: The type of the column.
+    """
+
+    columns = [row[1] for row in cursor.execute('''PRAGMA table_info(%s)''' % (table))]
+
+    if column not in columns:
+        cursor.execute('''ALTER TABLE %s ADD COLUMN %s %s''' % (table, column, definition))
+
+def create_tables(cursor):
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS authors(
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            language TEXT,
+            country TEXT)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS articles(
+            id INTEGER PRIMARY KEY,
+            parent_id INTEGER,
+            title TEXT,
+            language TEXT,
+            timestamp DATETIME,
+            flag BOOLEAN)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revisions(
+            id INTEGER PRIMARY KEY,
+            article_id INTEGER,
+            author_id INTEGER,
+            revision_id INTEGER,
+            previous_id INTEGER,
+            timestamp DATETIME,
+            content TEXT,
+            previous TEXT,
+            paragraphs INTEGER)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS edits(
+            id INTEGER PRIMARY KEY,
+            revision_id INTEGER,
+            updated_text TEXT,
+            previous_text TEXT,
+            size INTEGER)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS errors(
+            id INTEGER PRIMARY KEY,
+            article_id INTEGER,
+            author_id INTEGER,
+            revision_id INTEGER,
+            language TEXT,
+            current BOOLEAN)
+    ''')
+
+def add_cleaning_columns(cursor):
+
+    add_column(cursor, 'articles', 'series', 'INTEGER')
+    add_column(cursor, 'authors', 'usertype', 'STRING')
+    add_column(cursor, 'authors', 'flag', 'BOOLEAN')
+    add_column(cursor, 'authors', 'iso', 'STRING')
+    add_column(cursor, 'edits', 'flag', 'BOOLEAN')
+
+def create_indexes(cursor):
+
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_authors_name ON authors(name)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_articles_title ON articles(title)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_articles_parent_id ON articles(parent_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_articles_series ON articles(series)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_revision_id ON revisions(revision_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_article_id ON revisions(article_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_author_id ON revisions(author_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_timestamp ON revisions(timestamp)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_edits_revision_id ON edits(revision_id)''')
+
+def deduplicate_texts(cursor):
+
+    add_column(cursor, 'revisions', 'content_hash', 'TEXT')
+    add_column(cursor, 'revisions', 'previous_hash', 'TEXT')
+
+    textstore.create_texts(cursor)
+
+    # The moved revisions are committed in batches, because the move is continued from the
+    # revisions that still have their texts when it is interrupted
+    moved = textstore.move_texts(cursor, commit=True)
+
+    if moved > 0:
+        print('Moved the texts of %d revisions. Run VACUUM on the database to reclaim the free space.' % (moved))
+
+def create_progress(cursor):
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS progress(
+            article_id INTEGER,
+            language TEXT,
+            user TEXT,
+            revision_id INTEGER,
+            PRIMARY KEY (article_id, language, user, revision_id))
+    ''')
+
+def add_cleaning_state(cursor):
+
+    add_column(cursor, 'edits', 'cleaned', 'INTEGER')
+    add_column(cursor, 'authors', 'cleaned', 'TEXT')
+
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_edits_cleaned ON edits(cleaned, revision_id)''')
+
+def add_edit_scores(cursor):
+
+    add_column(cursor, 'edits', 'score', 'REAL')
+
+def create_timestamp_index(cursor):
+
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_article_timestamp ON revisions(article_id, timestamp)''')
+
+def remove_unused_texts(cursor):
+
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_content_hash ON revisions(content_hash)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_revisions_previous_hash ON revisions(previous_hash)''')
+
+    removed = textstore.remove_texts(cursor)
+
+    if removed > 0:
+        print('Removed %d texts that are not referenced by any revision. Run VACUUM on the database to reclaim the free space.' % (removed))
+
+def create_merged_shards(cursor):
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS merged_shards(
+            digest TEXT PRIMARY KEY,
+            path TEXT,
+            timestamp DATETIME)
+    ''')
+
+# All migrations in the order in which they are applied. The schema version of a database
+# is equal to the number of applied migrations.
+MIGRATIONS = [
+    ('Create the authors, articles, revisions, edits, and errors tables', create_tables),
+    ('Add the columns used for cleaning the data', add_cleaning_columns),
+    ('Create indexes for all columns used in lookups and joins', create_indexes),
+    ('Store the revision texts once and compressed', deduplicate_texts),
+    ('Create the progress journal of the extraction process', create_progress),
+    ('Record the parameters under which edits and authors were cleaned', add_cleaning_state),
+    ('Add the quality score of each edit', add_edit_scores),
+    ('Create an index of the revisions of each article by timestamp', create_timestamp_index),
+    ('Remove the texts that are not referenced by any revision', remove_unused_texts),
+    ('Create the ledger of the shards that are merged into the database', create_merged_shards)
+]
+
+def version(db):
+    """
+    Get the schema version of a database.
+
+    Args:
+        db: A sqlite3 connection.
+
+    Returns:
+        An integer with the number of applied migrations.
+    """
+
+    return db.execute('''PRAGMA user_version''').fetchone()[0]
+
+def migrate(db, verbose=True):
+    """
+    Upgrade a database in place to the latest schema version.
+
+    Each migration runs in its own transaction, so an interrupted upgrade can be continued.
+    A migration which can be applied again may commit its progress in between (e.g. moving
+    the revision texts), so a large database does not have to be upgraded at once.
+    The migrations also apply to databases created before the schema was versioned.
+
+    Args:
+        db: A sqlite3 connection.
+        verbose: Output each migration that is applied (default True).
+
+    Returns:
+        An integer with the schema version.
+    """
+
+    current = version(db)
+
+    for i, (description, migration) in enumerate(MIGRATIONS, 1):
+
+        if i <= current:
+            continue
+
+        if verbose is True:
+            print('Migrating the database to version %d: %s' % (i, description))
+
+        cursor = db.cursor()
+
+        try:
+            cursor.execute('''BEGIN''')
+            migration(cursor)
+            cursor.execute('''PRAGMA user_version = %d''' % (i))
+            db.commit()
+        except:
+            db.rollback()
+            raise
+
+    return len(MIGRATIONS)
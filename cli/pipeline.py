@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 25 09:31:18 2020
+
+@author: jdevreeze
+"""
+
+import queue
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Marks the end of the items of a stage
+_DONE = object()
+
+class _Failure:
+    """
+    Wrapper of an exception raised in a background stage, which is raised again by the consumer.
+    """
+
+    def __init__(self, exception):
+        self.exception = exception
+
+def stage(function, items, buffer=16):
+    """
+    Apply a function to all items in a background thread.
+
+    The results are passed on through a bounded buffer, so the background thread never
+    gets more than a fixed number of items ahead of the consumer. Exceptions are raised
+    again in the consumer, and the background thread stops when the consumer stops.
+
+    Args:
+        function: A function which is applied to each item.
+        items: An iterable with the items, which may be the output of another stage.
+        buffer: The maximum number of results waiting for the consumer (default 16).
+
+    Returns:
+        A generator with the results in the same order as the items.
+    """
+
+    results = queue.Queue(maxsize=buffer)
+    stopped = threading.Event()
+
+    def put(result):
+        while not stopped.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(function(item)):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+        else:
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+
+        while True:
+
+            result = results.get()
+
+            if result is _DONE:
+                break
+
+            if isinstance(result, _Failure):
+                raise result.exception
+
+            yield result
+
+    finally:
+        stopped.set()
+
+def parallel(function, items, workers=1, buffer=16):
+    """
+    Apply a function to all items with a pool of threads.
+
+    At most a fixed number of items are submitted ahead of the consumer, while the results
+    are passed on in the same order as the items.
+
+    Args:
+        function: A function which is applied to each item.
+        items: An iterable with the items, which may be the output of another stage.
+        workers: The number of threads (default 1).
+        buffer: The maximum number of submitted items (default 16).
+
+    Returns:
+        A generator with the results in the same order as the items.
+    """
+
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+
+        try:
+
+            for item in items:
+
+                pending.append(executor.submit(function, item))
+
+                if len(pending) >= max(buffer, workers):
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+        finally:
+            for future in pending:
+                future.cancel()
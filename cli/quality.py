@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Apr  1 09:12:37 2020
+
+@author: jdevreeze
+"""
+
+import argparse
+import unicodedata
+import zipfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import database
+import instrument
+import migrations
+
+# The default location of the edit quality model
+MODEL = '../models/edit-quality.npz'
+
+# The features of each edit, followed by the hashed character n-grams
+FEATURES = ['size', 'letters', 'digits', 'spaces', 'punctuation', 'uppercase', 'markup']
+
+# The character classes of which the ratios are features
+LOWER, UPPER, LETTER, DIGIT, SPACE, PUNCTUATION, MARKUP, OTHER = range(8)
+CLASSES = 8
+
+# Characters of the wiki markup and HTML that remain in edits which are metadata
+MARKUP_CHARACTERS = '[]{}|=<>*#&'
+
+_table = None
+
+def character_classes():
+    """
+    Get the class of each character of the Basic Multilingual Plane. Other characters are
+    mostly letters (e.g., of Chinese texts), so they are classified as letters.
+
+    Returns:
+        A numpy array with the class of each code point.
+    """
+
+    global _table
+
+    if _table is None:
+
+        categories = {'Ll' : LOWER, 'Lu' : UPPER, 'Lt' : UPPER, 'Nd' : DIGIT, 'Zs' : SPACE, 'Zl' : SPACE, 'Zp' : SPACE}
+
+        table = np.full(0x10000, OTHER, dtype=np.int64)
+
+        for code in range(0x10000):
+
+            category = unicodedata.category(chr(code))
+
+            if category in categories:
+                table[code] = categories[category]
+            elif category[0] == 'L' or category[0] == 'M':
+                table[code] = LETTER
+            elif category[0] == 'P' or category[0] == 'S':
+                table[code] = PUNCTUATION
+
+        for character in '\t\n\r':
+            table[ord(character)] = SPACE
+        for character in MARKUP_CHARACTERS:
+            table[ord(character)] = MARKUP
+
+        _table = table
+
+    return _table
+
+def featurize(texts, buckets=256, n=3):
+    """
+    Get the features of a batch of edits.
+
+    All texts are concatenated in a single array of code points, so the features of all
+    edits are computed at once. The features are the logarithm of the size, the ratios of
+    letters, digits, spaces, punctuation, uppercase letters and markup, and the frequencies
+    of the character n-grams, which are hashed in a fixed number of buckets.
+
+    Args:
+        texts: A list with the texts of the edits.
+        buckets: The number of buckets of the hashed n-grams (default 256).
+        n: The length of the n-grams (default 3).
+
+    Returns:
+        A numpy array with a row of features for each edit.
+    """
+
+    count = len(texts)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=count)
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    owners = np.repeat(np.arange(count), lengths)
+
+    table = character_classes()
+    classes = np.where(codes < 0x10000, table[np.minimum(codes, 0xFFFF)], LETTER)
+
+    counts = np.bincount(owners * CLASSES + classes, minlength=count * CLASSES).reshape(count, CLASSES).astype(np.float64)
+    size = np.maximum(lengths, 1)[:, None]
+    letters = counts[:, [LOWER, UPPER, LETTER]].sum(axis=1)
+
+    dense = np.column_stack([
+        np.log1p(lengths),
+        letters / size[:, 0],
+        counts[:, DIGIT] / size[:, 0],
+        counts[:, SPACE] / size[:, 0],
+        counts[:, PUNCTUATION] / size[:, 0],
+        counts[:, UPPER] / np.maximum(letters, 1),
+        counts[:, MARKUP] / size[:, 0]
+    ])
+
+    # The n-grams which start at each position, except those which cross two edits
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.arange(len(codes)) - offsets
+    valid = np.nonzero(positions <= np.repeat(lengths, lengths) - n)[0]
+
+    hashes = np.zeros(len(valid), dtype=np.uint64)
+
+    for k in range(n):
+        hashes = hashes * np.uint64(1000003) + codes[valid + k].astype(np.uint64)
+
+    grams = np.bincount(owners[valid] * buckets + (hashes % np.uint64(buckets)).astype(np.int64), minlength=count * buckets).reshape(count, buckets)
+    grams = grams / np.maximum(lengths - n + 1, 1)[:, None]
+
+    return np.hstack([dense, grams])
+
+class Model:
+    """
+    Logistic regression of the quality of edits from their features (see featurize).
+
+    The model is stored in a single numpy file, which includes the parameters of the
+    features, so edits are always scored with the same features as the model was trained.
+    """
+
+    def __init__(self, weights, bias=0.0, mean=None, scale=None, buckets=256, n=3):
+        """
+        Create a model.
+
+        Args:
+            weights: A numpy array with the weight of each feature.
+            bias: The intercept (default 0.0).
+            mean: A numpy array with the mean of each feature, or None to not center the
+                features (default None).
+            scale: A numpy array with the standard deviation of each feature, or None to
+                not scale the features (default None).
+            buckets: The number of buckets of the hashed n-grams (default 256).
+            n: The length of the n-grams (default 3).
+
+        Raises:
+            ValueError: If the number of weights does not match the number of features.
+        """
+
+        if len(weights) != len(FEATURES) + buckets:
+            raise ValueError('The model has %d weights, but there are %d features.' % (len(weights), len(FEATURES) + buckets))
+
+        self._weights = np.asarray(weights, dtype=np.float64)
+        self._bias = float(bias)
+        self._mean = np.zeros(len(weights)) if mean is None else np.asarray(mean, dtype=np.float64)
+        self._scale = np.ones(len(weights)) if scale is None else np.asarray(scale, dtype=np.float64)
+        self._buckets = int(buckets)
+        self._n = int(n)
+
+    @classmethod
+    def load(cls, path=MODEL):
+        """
+        Load a model which is stored with save.
+
+        Args:
+            path: The path of the model (default '../models/edit-quality.npz').
+
+        Raises:
+            ValueError: If the model can not be opened, or the file is not a valid model.
+        """
+
+        # A corrupt file or a file which is not a numpy archive raises different exceptions
+        try:
+            with np.load(path) as data:
+                parameters = [data[name] for name in ['weights', 'bias', 'mean', 'scale', 'buckets', 'n']]
+        except (OSError, KeyError, ValueError, TypeError, EOFError, zipfile.BadZipFile, zlib.error):
+            raise ValueError('Can not open a valid edit quality model. Make sure you have specified the correct filename.')
+
+        return cls(*parameters)
+
+    @classmethod
+    def fit(cls, texts, labels, buckets=256, n=3, epochs=300, rate=0.5, penalty=1e-4):
+        """
+        Train a model with gradient descent on the cross-entropy of all edits.
+
+        Args:
+            texts: A list with the texts of the edits.
+            labels: A list with 1 for each meaningful edit and 0 for each other edit.
+            buckets: The number of buckets of the hashed n-grams (default 256).
+            n: The length of the n-grams (default 3).
+            epochs: The number of iterations (default 300).
+            rate: The learning rate (default 0.5).
+            penalty: The L2 penalty of the weights (default 1e-4).
+
+        Returns:
+            A Model instance.
+        """
+
+        features = featurize(texts, buckets, n)
+        labels = np.asarray(labels, dtype=np.float64)
+
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        features = (features - mean) / scale
+
+        weights = np.zeros(features.shape[1])
+        bias = 0.0
+
+        for _ in range(epochs):
+
+            error = 1.0 / (1.0 + np.exp(-(features @ weights + bias))) - labels
+
+            weights -= rate * (features.T @ error / len(labels) + penalty * weights)
+            bias -= rate * error.mean()
+
+        return cls(weights, bias, mean, scale, buckets, n)
+
+    def save(self, path=MODEL):
+        np.savez(path, weights=self._weights, bias=self._bias, mean=self._mean, scale=self._scale, buckets=self._buckets, n=self._n)
+
+    def score(self, texts):
+        """
+        Score the quality of a batch of edits.
+
+        Args:
+            texts: A list with the texts of the edits.
+
+        Returns:
+            A numpy array with the probability that each edit is meaningful.
+        """
+
+        if not texts:
+            return np.zeros(0)
+
+        features = (featurize(texts, self._buckets, self._n) - self._mean) / self._scale
+
+        return 1.0 / (1.0 + np.exp(-(features @ self._weights + self._bias)))
+
+def score_edits(db, model, batch=10000, metrics=None, rebuild=True):
+    """
+    Store the quality score of all edits.
+
+    The edits are read, scored, and written in batches. All scores are written in a single
+    transaction, which is committed by the caller.
+
+    Args:
+        db: A sqlite3 connection with the extraction database.
+        model: A Model instance.
+        batch: The number of edits in each batch (default 10000).
+        metrics: A Metrics instance (default None).
+        rebuild: Score all edits, otherwise only the edits without a score (default True).
+
+    Returns:
+        The number of scored edits.
+    """
+
+    metrics = metrics if metrics is not None else instrument.Metrics('data_cleaning')
+
+    pending = '''''' if rebuild is True else '''WHERE score IS NULL'''
+
+    cursor = db.cursor()
+    identifiers = [row[0] for row in cursor.execute('''SELECT id FROM edits %s ORDER BY id''' % (pending)).fetchall()]
+
+    for start in range(0, len(identifiers), batch):
+
+        ids = identifiers[start:start + batch]
+
+        with metrics.stage('query', rows=len(ids)):
+            rows = cursor.execute('''SELECT id, updated_text FROM edits WHERE id BETWEEN ? AND ? %s ORDER BY id''' % ('''''' if rebuild is True else '''AND score IS NULL'''), (ids[0], ids[-1],)).fetchall()
+
+        with metrics.stage('score', rows=len(rows)):
+            scores = model.score([text or '' for _, text in rows])
+
+        with metrics.stage('update', rows=len(rows)):
+            cursor.executemany('''UPDATE edits SET score = ? WHERE id = ?''', zip(scores.tolist(), (identifier for identifier, _ in rows)))
+
+    return len(identifiers)
+
+def training_data(db, sample=100000, seed=1):
+    """
+    Get a random sample of the edits that are flagged by data_cleaning.py.
+
+    A model which is trained on these flags learns to reproduce the filter of
+    data_cleaning.py, so its scores do not add information about edits which the filter
+    does not flag correctly. Use labeled_data to train on edits which are coded by hand.
+
+    Args:
+        db: A sqlite3 connection with the extraction database.
+        sample: The maximum number of edits (default 100000).
+        seed: The seed of the random generator (default 1).
+
+    Returns:
+        A tuple with a list of the texts and a list of the flags of the edits.
+    """
+
+    identifiers = np.array([row[0] for row in db.execute('''SELECT id FROM edits WHERE cleaned IS NOT NULL ORDER BY id''').fetchall()], dtype=np.int64)
+
+    if len(identifiers) > sample:
+        identifiers = np.sort(np.random.default_rng(seed).choice(identifiers, sample, replace=False))
+
+    texts, labels = [], []
+
+    for start in range(0, len(identifiers), 500):
+        ids = identifiers[start:start + 500].tolist()
+        for text, flag in db.execute('''SELECT updated_text, flag FROM edits WHERE id IN (%s) ORDER BY id''' % (', '.join('?' * len(ids))), ids).fetchall():
+            texts.append(text or '')
+            labels.append(1 if flag == 1 else 0)
+
+    return texts, labels
+
+def labeled_data(db, coded):
+    """
+    Get the edits which are coded by hand, e.g. in the dataset of create_dataset.py.
+
+    Args:
+        db: A sqlite3 connection with the extraction database.
+        coded: A dataframe with the identifier of each edit in the EditId column, and 1 for
+            each meaningful edit and 0 for each other edit in the Label column.
+
+    Returns:
+        A tuple with a list of the texts and a list of the labels of the edits.
+
+    Raises:
+        ValueError: If the dataframe does not have the required columns.
+    """
+
+    if 'EditId' not in coded.columns or 'Label' not in coded.columns:
+        raise ValueError('The coded edits should have an EditId and a Label column.')
+
+    coded = coded.dropna(subset=['EditId', 'Label'])
+    codes = dict(zip(coded['EditId'].astype(np.int64).tolist(), coded['Label'].astype(np.int64).tolist()))
+    identifiers = sorted(codes)
+
+    texts, labels = [], []
+
+    for start in range(0, len(identifiers), 500):
+        ids = identifiers[start:start + 500]
+        for identifier, text in db.execute('''SELECT id, updated_text FROM edits WHERE id IN (%s) ORDER BY id''' % (', '.join('?' * len(ids))), ids).fetchall():
+            texts.append(text or '')
+            labels.append(1 if codes[identifier] == 1 else 0)
+
+    return texts, labels
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Train a model of the quality of edits on edits which are coded by hand, or otherwise on the edits flagged by data_cleaning.py. The model is used to score edits with data_cleaning.py --score.')
+
+    parser.add_argument('--sqlite', metavar='sqlite', type=str, required=True, help='Open the sqlite database from the specified path.')
+    parser.add_argument('--model', metavar='model', type=str, default=MODEL, help='Stores the model to the specified path (default: %s).' % (MODEL))
+    parser.add_argument('--labels', metavar='labels', type=str, default=None, help='Train the model on the edits which are coded by hand in a csv file with an EditId and a Label column (e.g., the dataset of create_dataset.py). Without coded edits, the model only learns to reproduce the filter of data_cleaning.py (default: None).')
+    parser.add_argument('--sample', metavar='sample', type=int, default=100000, help='The maximum number of edits on which the model is trained (default: 100000).')
+    parser.add_argument('--buckets', metavar='buckets', type=int, default=256, help='The number of buckets of the hashed character n-grams (default: 256).')
+    parser.add_argument('--epochs', metavar='epochs', type=int, default=300, help='The number of iterations of the training (default: 300).')
+
+    args = parser.parse_args()
+
+    db = database.connect(args.sqlite)
+    migrations.migrate(db)
+
+    if args.labels is not None:
+
+        try:
+            coded = pd.read_csv(args.labels, sep=';', encoding='utf-8')
+        except:
+            raise ValueError('Can not open the specified coded edits.')
+
+        texts, labels = labeled_data(db, coded)
+
+    else:
+        texts, labels = training_data(db, args.sample)
+
+    db.close()
+
+    if not texts or len(set(labels)) != 2:
+        raise ValueError('The model can only be trained on valid and invalid edits. Code edits of both kinds, or run data_cleaning.py first.')
+
+    model = Model.fit(texts, labels, args.buckets, epochs=args.epochs)
+    model.save(args.model)
+
+    scores = model.score(texts)
+    accuracy = np.mean((scores >= 0.5) == np.asarray(labels, dtype=bool))
+
+    print('Trained the model on %d edits (%d valid) with an accuracy of %.3f.' % (len(texts), sum(labels), accuracy))
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 16 10:12:31 2020
+
+@author: jdevreeze
+"""
+
+import threading
+import time
+
+from contextlib import contextmanager
+
+class TokenBucket:
+    """
+    A thread-safe token bucket.
+
+    Tokens are added at a constant rate up to the capacity of the bucket. Every request
+    takes a token and blocks until one is available, which allows short bursts while the
+    average rate never exceeds the specified number of requests per second.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: The number of tokens added per second.
+            capacity: The maximum number of tokens in the bucket (default None). When None,
+                the bucket holds at most one second worth of tokens.
+
+        Raises:
+            ValueError: The rate must be a positive number.
+        """
+
+        if rate is None or rate <= 0:
+            raise ValueError('The rate must be a positive number.')
+
+        self._rate = float(rate)
+        self._capacity = float(capacity) if capacity is not None else max(1.0, self._rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens from the bucket and wait until they are available.
+
+        Args:
+            tokens: The number of tokens to take (default 1).
+        """
+
+        while True:
+
+            with self._lock:
+
+                now = time.monotonic()
+
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self._rate
+
+            time.sleep(wait)
+
+class RateLimiter:
+    """
+    Shared rate limiter for all requests to the MediaWiki API.
+
+    The token bucket is shared by all hosts, whereas the number of simultaneous requests
+    is capped for each host (i.e., each language version of Wikipedia) separately.
+    """
+
+    def __init__(self, rate=None, concurrency=None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: The maximum number of requests per second (default None). When None,
+                requests are not throttled.
+            concurrency: The maximum number of simultaneous requests for each host
+                (default None). When None, the number of requests is not capped.
+        """
+
+        self._bucket = TokenBucket(rate) if rate is not None else None
+        self._concurrency = concurrency
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, host):
+        """
+        Context manager which holds a request slot for the specified host.
+
+        Args:
+            host: The host name to which the request is sent.
+        """
+
+        semaphore = None
+
+        if self._concurrency is not None:
+            with self._lock:
+                if host not in self._hosts:
+                    self._hosts[host] = threading.BoundedSemaphore(self._concurrency)
+                semaphore = self._hosts[host]
+            semaphore.acquire()
+
+        try:
+            if self._bucket is not None:
+                self._bucket.acquire()
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
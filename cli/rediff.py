@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 30 09:42:16 2020
+
+@author: jdevreeze
+"""
+
+import re
+import os
+import argparse
+import difflib
+import multiprocessing
+
+from functools import partial
+from tqdm import tqdm
+
+import database
+import instrument
+import migrations
+
+GRANULARITIES = ['paragraph', 'sentence', 'inline']
+
+def split_paragraphs(text):
+    """
+    Split a revision text in paragraphs.
+
+    Args:
+        text: A string with the revision text.
+
+    Returns:
+        A list with the non-empty paragraphs.
+    """
+
+    return [paragraph.strip() for paragraph in text.split('\n') if paragraph.strip()]
+
+def split_sentences(paragraph):
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+', paragraph) if sentence]
+
+def changes(original, updated, separator=None):
+    """
+    Get the added and changed parts of a sequence of texts.
+
+    Each distinct text is replaced by an integer first, so the sequences are compared
+    without comparing the texts themselves. Deleted parts are not included.
+
+    Args:
+        original: A list with the previous texts.
+        updated: A list with the updated texts.
+        separator: Join each run of added or changed texts with this separator, otherwise
+            each text is a separate change (default None).
+
+    Returns:
+        A list with tuples of the updated text and the previous text, which is an empty
+        string if the text is added.
+    """
+
+    keys = {}
+
+    a = [keys.setdefault(text, len(keys)) for text in original]
+    b = [keys.setdefault(text, len(keys)) for text in updated]
+
+    result = []
+
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+
+        if tag == 'insert':
+            if separator is None:
+                result.extend((text, '') for text in updated[j1:j2])
+            else:
+                result.append((separator.join(updated[j1:j2]), ''))
+
+        elif tag == 'replace':
+            if separator is None:
+                result.extend((text, original[i1 + k] if i1 + k < i2 else '') for k, text in enumerate(updated[j1:j2]))
+            else:
+                result.append((separator.join(updated[j1:j2]), separator.join(original[i1:i2])))
+
+    return result
+
+def paragraph_changes(content, previous):
+    """
+    Get the added and changed paragraphs of a revision.
+
+    Args:
+        content: A string with the revision text.
+        previous: A string with the previous revision text.
+
+    Returns:
+        A list with tuples of the updated paragraph and the previous paragraph, which is
+        empty if the revision has no previous text (e.g., the first revision of a page).
+    """
+
+    if not previous:
+        return []
+
+    return changes(split_paragraphs(previous or ''), split_paragraphs(content or ''))
+
+def diff_texts(texts, granularity='paragraph'):
+    """
+    Get the edits of a revision from its text and the text of the previous revision.
+
+    The paragraphs of both texts are compared first. Added paragraphs are edits as a
+    whole, whereas changed paragraphs are compared again by sentence or by word, unless
+    the granularity is 'paragraph'.
+
+    Args:
+        texts: A tuple with the revision text and the previous revision text.
+        granularity: Either 'paragraph', 'sentence', or 'inline' (default 'paragraph').
+
+    Returns:
+        A tuple with the number of added or changed paragraphs, a list with the updated
+        texts, and a list with the previous texts.
+    """
+
+    paragraphs = paragraph_changes(*texts)
+
+    if granularity == 'paragraph':
+        edits = paragraphs
+
+    else:
+
+        edits = []
+
+        for updated, original in paragraphs:
+
+            if original == '':
+                edits.append((updated, original))
+            elif granularity == 'sentence':
+                edits.extend(changes(split_sentences(original), split_sentences(updated)))
+            else:
+                edits.extend(changes(original.split(' '), updated.split(' '), ' '))
+
+    return len(paragraphs), [d for d, o in edits], [o for d, o in edits]
+
+def rediff(db, granularity='paragraph', workers=1, batch=500, metrics=None, quiet=False):
+    """
+    Replace the edits of all revisions by the edits computed from the stored texts, and
+    store the number of added or changed paragraphs of each revision.
+
+    Revisions are processed in batches, which are each written in a single transaction.
+    The texts of each batch are compared by a pool of processes, and identical pairs of
+    texts are only compared once.
+
+    Args:
+        db: A sqlite3 connection with the extraction database.
+        granularity: Either 'paragraph', 'sentence', or 'inline' (default 'paragraph').
+        workers: The number of processes (default 1).
+        batch: The number of revisions in each batch (default 500).
+        metrics: A Metrics instance (default None).
+        quiet: Do not output the progress (default False).
+
+    Returns:
+        A tuple with the number of revisions and the number of edits.
+    """
+
+    if granularity not in GRANULARITIES:
+        raise ValueError('The granularity must be one of %s.' % (', '.join(GRANULARITIES)))
+
+    metrics = metrics if metrics is not None else instrument.Metrics('rediff')
+
+    cursor = db.cursor()
+    writer = database.Writer(db)
+
+    identifiers = [row[0] for row in cursor.execute('''SELECT id FROM revisions ORDER BY id''').fetchall()]
+
+    function = partial(diff_texts, granularity=granularity)
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+
+    total = 0
+
+    try:
+
+        for start in tqdm(range(0, len(identifiers), batch), disable=quiet):
+
+            ids = identifiers[start:start + batch]
+
+            with metrics.stage('query', rows=len(ids)):
+                rows = cursor.execute('''SELECT id, content, previous FROM revision_texts WHERE id IN (%s) ORDER BY id''' % (', '.join('?' * len(ids))), ids).fetchall()
+
+            pairs = list(dict.fromkeys((content, previous) for _, content, previous in rows))
+
+            with metrics.stage('diff', rows=len(pairs)):
+                results = dict(zip(pairs, pool.map(function, pairs, chunksize=max(len(pairs) // (workers * 4), 1)) if pool is not None else map(function, pairs)))
+
+            with metrics.stage('sqlite', rows=len(rows)):
+
+                with writer.transaction():
+
+                    cursor.executemany('''DELETE FROM edits WHERE revision_id = ?''', [(i,) for i in ids])
+
+                    for identifier, content, previous in rows:
+                        paragraphs, differences, original = results[(content, previous)]
+                        total += writer.edits(identifier, differences, original)
+
+                    cursor.executemany('''UPDATE revisions SET paragraphs = ? WHERE id = ?''', [(results[(content, previous)][0], identifier) for identifier, content, previous in rows])
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return len(identifiers), total
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Recompute the edits of all extracted revisions from the stored revision texts without connecting to the MediaWiki API.')
+
+    parser.add_argument('--sqlite', metavar='sqlite', type=str, required=True, help='Open the sqlite database from the specified path.')
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='paragraph', help='Store each added or changed paragraph, each added or changed sentence, or each added or changed run of words as an edit (default: paragraph).')
+    parser.add_argument('--workers', metavar='workers', type=int, default=os.cpu_count(), help='The number of processes which compare the texts (default: the number of processors).')
+    parser.add_argument('--batch', metavar='batch', type=int, default=500, help='The number of revisions which are written in a single transaction (default: 500).')
+
+    instrument.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    metrics = instrument.Metrics.from_arguments('rediff', args)
+
+    db = database.connect(args.sqlite)
+    migrations.migrate(db)
+
+    revisions, edits = rediff(db, args.granularity, args.workers, args.batch, metrics, args.quiet)
+
+    db.close()
+    metrics.save()
+
+    print('Recomputed %d edits of %d revisions. Run data_cleaning.py again to flag the valid edits.' % (edits, revisions))
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,542 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 27 13:18:40 2020
+
+@author: jdevreeze
+"""
+
+import json
+import random
+import argparse
+import threading
+import time
+
+from html import escape
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def request_key(lang, params):
+    """
+    Get a key which identifies a request regardless of the order and type of its parameters.
+
+    Args:
+        lang: The article language.
+        params: A dict with the MediaWiki API parameters.
+
+    Returns:
+        A string with the key.
+    """
+
+    params = {k : str(v) for k, v in params.items() if k != 'format'}
+
+    return json.dumps([lang, params], sort_keys=True)
+
+class SyntheticWiki:
+    """
+    Generated articles which are served in the same way as the MediaWiki API.
+
+    Each article exists in all languages, and each language version has its own history
+    of revisions. A revision either adds a paragraph or changes a word in an existing
+    paragraph, and is made by one of a fixed pool of users. All data is derived from the
+    seed, so the same settings always result in the same articles.
+    """
+
+    _words = ['conflict', 'region', 'government', 'history', 'the', 'of', 'and', 'was', 'in', 'war', 'treaty', 'border', 'army', 'city', 'people']
+
+    # The maximum number of revisions in a single response
+    _limit = 500
+
+    def __init__(self, articles=10, revisions=50, users=8, languages=('en', 'de'), anonymous=0.0, seed=1):
+        """
+        Initialize the articles.
+
+        Args:
+            articles: The number of articles (default 10).
+            revisions: The number of revisions of each language version (default 50).
+            users: The number of registered users who edit all articles (default 8).
+            languages: A list with the language codes of each article (default ('en', 'de')).
+            anonymous: The fraction of revisions made by anonymous users (default 0.0).
+            seed: The seed of the random generator (default 1).
+        """
+
+        self._articles = articles
+        self._revisions = revisions
+        self._users = ['User %d' % (i) for i in range(users)]
+        self._languages = list(languages)
+        self._anonymous = anonymous
+        self._seed = seed
+
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    def titles(self, lang):
+        """
+        Get the titles of all articles in a language.
+
+        Args:
+            lang: The article language.
+
+        Returns:
+            A list with the titles.
+        """
+
+        return [self.__title(lang, k) for k in range(self._articles)]
+
+    def handle(self, lang, params):
+        """
+        Answer a request in the same way as the MediaWiki API.
+
+        Args:
+            lang: The article language.
+            params: A dict with the MediaWiki API parameters.
+
+        Returns:
+            A dict with the response.
+        """
+
+        if lang not in self._languages:
+            return self.__missing('The language \'%s\' does not exist.' % (lang))
+
+        action = params.get('action')
+
+        if action == 'parse':
+            return self.__parse(lang, params)
+
+        if action == 'compare':
+            return self.__compare(lang, params)
+
+        if action == 'query' and params.get('prop') == 'revisions':
+            return self.__query(lang, params)
+
+        return {'error' : {'code' : 'badvalue', 'info' : 'The request is not supported by the stand-in server.'}}
+
+    def __parse(self, lang, params):
+
+        if 'oldid' in params:
+            revision = self.__revision(lang, params['oldid'])
+        else:
+            article = self.__article(lang, params)
+            revision = self.__history(lang, article)[-1] if article is not None else None
+
+        if revision is None:
+            return self.__missing('The page or revision does not exist.')
+
+        k = revision['article']
+        response = {'title' : self.__title(lang, k), 'pageid' : k + 1}
+
+        for prop in params.get('prop', 'text').split('|'):
+
+            if prop == 'langlinks':
+                response['langlinks'] = [{'lang' : l, '*' : self.__title(l, k)} for l in self._languages if l != lang]
+
+            if prop == 'text':
+                response['text'] = {'*' : self.__html(revision)}
+
+            if prop == 'externallinks':
+                response['externallinks'] = ['https://example.org/%s/%d' % (lang, k)]
+
+        return {'parse' : response}
+
+    def __compare(self, lang, params):
+
+        if 'fromrev' in params:
+            revision = self.__revision(lang, params['fromrev'])
+        else:
+            article = self.__article(lang, params)
+            revision = self.__history(lang, article)[-1] if article is not None else None
+
+        if revision is None:
+            return self.__missing('The page or revision does not exist.')
+
+        if revision['parentid'] == 0:
+            return {'compare' : {'torevid' : revision['revid']}}
+
+        if revision['original'] is None:
+            rows = '<tr><td class="diff-marker">+</td><td class="diff-addedline"><div>%s</div></td></tr>' % (escape(revision['change']))
+        else:
+            rows = (
+                '<tr><td class="diff-marker">−</td><td class="diff-deletedline"><div>%s</div></td>'
+                '<td class="diff-marker">+</td><td class="diff-addedline"><div>%s</div></td></tr>'
+            ) % (escape(revision['original']), escape(revision['change']))
+
+        return {'compare' : {'fromrevid' : revision['parentid'], 'torevid' : revision['revid'], '*' : rows}}
+
+    def __query(self, lang, params):
+
+        if 'revids' in params:
+
+            revisions = [self.__revision(lang, revid) for revid in params['revids'].split('|')]
+            revisions = [revision for revision in revisions if revision is not None]
+
+            if not revisions:
+                return self.__missing('The revisions do not exist.')
+
+            k = revisions[0]['article']
+
+            return self.__pages(lang, k, [self.__properties(revision) for revision in revisions])
+
+        if 'rvstartid' in params:
+
+            revision = self.__revision(lang, params['rvstartid'])
+
+            if revision is None:
+                return self.__missing('The revision does not exist.')
+
+            return self.__pages(lang, revision['article'], [self.__properties(revision)])
+
+        article = self.__article(lang, params)
+
+        if article is None:
+            return {'query' : {'pages' : {'-1' : {'title' : params.get('titles', ''), 'missing' : ''}}}}
+
+        history = list(reversed(self.__history(lang, article)))
+
+        if 'rvuser' in params:
+            user = params['rvuser'].replace('_', ' ')
+            history = [revision for revision in history if revision['user'] == user]
+
+        if 'rvendid' in params:
+            history = [revision for revision in history if revision['revid'] >= int(params['rvendid'])]
+
+        start = int(params.get('rvcontinue', 0))
+        limit = min(int(params.get('rvlimit', 1)), self._limit)
+
+        if 'user' in params.get('rvprop', '').split('|') and 'ids' not in params.get('rvprop', '').split('|'):
+            revisions = [self.__contributor(revision) for revision in history[start:start + limit]]
+        else:
+            revisions = [self.__properties(revision) for revision in history[start:start + limit]]
+
+        response = self.__pages(lang, article, revisions)
+
+        if start + limit < len(history):
+            response['continue'] = {'rvcontinue' : str(start + limit), 'continue' : '||'}
+
+        return response
+
+    def __pages(self, lang, k, revisions):
+        return {'query' : {'pages' : {str(k + 1) : {'pageid' : k + 1, 'ns' : 0, 'title' : self.__title(lang, k), 'revisions' : revisions}}}}
+
+    def __properties(self, revision):
+
+        properties = {
+            'revid' : revision['revid'],
+            'parentid' : revision['parentid'],
+            'user' : revision['user'],
+            'timestamp' : revision['timestamp'],
+            'size' : revision['size'],
+            'comment' : revision['comment']
+        }
+
+        if revision['anonymous'] is True:
+            properties['anon'] = ''
+
+        return properties
+
+    def __contributor(self, revision):
+
+        if revision['anonymous'] is True:
+            return {'user' : revision['user'], 'userid' : 0, 'anon' : ''}
+
+        return {'user' : revision['user'], 'userid' : self._users.index(revision['user']) + 1}
+
+    def __missing(self, info):
+        return {'error' : {'code' : 'missingtitle', 'info' : info}}
+
+    def __title(self, lang, k):
+        return 'Conflict %d' % (k) if lang == self._languages[0] else 'Conflict %d (%s)' % (k, lang)
+
+    def __article(self, lang, params):
+        """
+        Internal method which finds the article of a request by its title or page identifier.
+        """
+
+        title = params.get('page', params.get('titles', params.get('fromtitle')))
+
+        if title is not None:
+            title = title.replace('_', ' ')
+            for k in range(self._articles):
+                if self.__title(lang, k) == title:
+                    return k
+            return None
+
+        if 'pageid' in params:
+            k = int(params['pageid']) - 1
+            return k if 0 <= k < self._articles else None
+
+        return None
+
+    def __revision(self, lang, revid):
+        """
+        Internal method which finds a revision by its identifier, which encodes the language,
+        the article, and the position in the history.
+        """
+
+        try:
+            revid = int(revid)
+        except ValueError:
+            return None
+
+        l, rest = divmod(revid - 1, 10 ** 9)
+        k, i = divmod(rest, 10 ** 5)
+
+        if l != self._languages.index(lang) or k >= self._articles or i >= self._revisions:
+            return None
+
+        return self.__history(lang, k)[i]
+
+    def __history(self, lang, k):
+        """
+        Internal method which generates all revisions of a language version of an article.
+        """
+
+        with self._lock:
+
+            if (lang, k) in self._histories:
+                return self._histories[(lang, k)]
+
+            rng = random.Random('%d-%s-%d' % (self._seed, lang, k))
+            paragraphs = []
+            history = []
+
+            for i in range(self._revisions):
+
+                original = None
+
+                if not paragraphs or rng.random() < 0.6:
+                    change = self.__sentence(rng)
+                    paragraphs = paragraphs + [change]
+                else:
+                    j = rng.randrange(len(paragraphs))
+                    original = paragraphs[j]
+                    words = original.split(' ')
+                    words[rng.randrange(len(words))] = rng.choice(self._words)
+                    change = ' '.join(words)
+                    paragraphs = paragraphs[:j] + [change] + paragraphs[j + 1:]
+
+                if rng.random() < self._anonymous:
+                    user = '192.0.2.%d' % (rng.randrange(1, 255))
+                else:
+                    user = rng.choice(self._users)
+
+                revid = self._languages.index(lang) * 10 ** 9 + k * 10 ** 5 + i + 1
+
+                history.append({
+                    'article' : k,
+                    'revid' : revid,
+                    'parentid' : history[-1]['revid'] if history else 0,
+                    'user' : user,
+                    'anonymous' : user not in self._users,
+                    'timestamp' : '2019-%02d-%02dT%02d:00:00Z' % (i // 280 % 12 + 1, i // 10 % 28 + 1, i % 10 + 8),
+                    'size' : sum(len(p) for p in paragraphs),
+                    'comment' : 'Revision %d' % (i),
+                    'paragraphs' : paragraphs,
+                    'original' : original,
+                    'change' : change
+                })
+
+            self._histories[(lang, k)] = history
+
+            return history
+
+    def __sentence(self, rng):
+        return (' '.join(rng.choice(self._words) for _ in range(rng.randint(8, 40))) + '.').capitalize()
+
+    def __html(self, revision):
+        """
+        Internal method which renders a revision like the parser output of MediaWiki.
+        """
+
+        # ParseWiki drops the element before each header, so the paragraphs end with an empty paragraph
+        paragraphs = ''.join('<p>%s\n</p>' % (escape(p)) for p in revision['paragraphs']) + '<p><br />\n</p>'
+        references = '<h2><span class="mw-headline" id="References">References</span></h2><ol class="references"><li>Reference of revision %d</li></ol>' % (revision['revid'])
+
+        return '<div class="mw-parser-output">%s%s</div>' % (paragraphs, references)
+
+class Fixtures:
+    """
+    Recorded responses of the MediaWiki API, which are stored in a json lines file.
+
+    When an URL template of the MediaWiki API is specified, requests which are not
+    recorded yet are sent to that API and added to the fixtures.
+    """
+
+    def __init__(self, path, api=None):
+        """
+        Initialize the fixtures.
+
+        Args:
+            path: The path of the json lines file.
+            api: An URL template of the MediaWiki API with a '{lang}' placeholder, which is
+                used to record missing responses (default None).
+        """
+
+        self._path = path
+        self._api = api
+        self._responses = {}
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        fixture = json.loads(line)
+                        self._responses[request_key(fixture['lang'], fixture['params'])] = fixture['response']
+        except FileNotFoundError:
+            if api is None:
+                raise ValueError('The specified fixtures do not exist.')
+
+    def __len__(self):
+        return len(self._responses)
+
+    def handle(self, lang, params):
+        """
+        Answer a request with a recorded response.
+
+        Args:
+            lang: The article language.
+            params: A dict with the MediaWiki API parameters.
+
+        Returns:
+            A dict with the response.
+        """
+
+        key = request_key(lang, params)
+
+        with self._lock:
+            response = self._responses.get(key)
+
+        if response is not None:
+            return response
+
+        if self._api is None:
+            return {'error' : {'code' : 'nofixture', 'info' : 'The request is not recorded.'}}
+
+        import requests
+
+        response = requests.get(self._api.replace('{lang}', lang), params).json()
+
+        with self._lock:
+
+            self._responses[key] = response
+
+            with open(self._path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({'lang' : lang, 'params' : params, 'response' : response}) + '\n')
+
+        return response
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Request handler which answers GET requests on /{lang}/w/api.php.
+    """
+
+    def do_GET(self):
+
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+
+        if len(parts) != 3 or parts[1:] != ['w', 'api.php']:
+            self.send_error(404)
+            return
+
+        params = dict(parse_qsl(url.query))
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        body = json.dumps(self.server.backend.handle(parts[0], params)).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StandIn(ThreadingHTTPServer):
+    """
+    Local stand-in for the MediaWiki API, which handles each request in a separate thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, backend, host='127.0.0.1', port=0, latency=0.0):
+        """
+        Initialize the server.
+
+        Args:
+            backend: A SyntheticWiki or Fixtures instance which answers the requests.
+            host: The host name (default '127.0.0.1').
+            port: The port, or 0 for any free port (default 0).
+            latency: The delay of each response in seconds (default 0.0).
+        """
+
+        super().__init__((host, port), Handler)
+
+        self.backend = backend
+        self.latency = latency
+
+    @property
+    def api(self):
+        """
+        The URL template of this server, which can be used with --api of extract_edits.py.
+        """
+
+        return 'http://%s:%d/{lang}/w/api.php' % (self.server_address[0], self.server_address[1])
+
+    def start(self):
+        """
+        Serve all requests in a background thread.
+
+        Returns:
+            This instance.
+        """
+
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+        return self
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Serve generated or recorded articles in the same way as the MediaWiki API.')
+
+    parser.add_argument('--port', metavar='port', type=int, default=8080, help='The port of the server (default: 8080).')
+    parser.add_argument('--latency', metavar='latency', type=float, default=0.0, help='The delay of each response in seconds (default: 0.0).')
+    parser.add_argument('--fixtures', metavar='fixtures', type=str, default=None, help='Serve the responses recorded in the specified json lines file instead of generated articles (default: None).')
+    parser.add_argument('--record', metavar='record', type=str, default=None, help='Record responses which are not in the fixtures from the MediaWiki API with the specified URL template (e.g., "https://{lang}.wikipedia.org/w/api.php").')
+    parser.add_argument('--articles', metavar='articles', type=int, default=10, help='The number of generated articles (default: 10).')
+    parser.add_argument('--revisions', metavar='revisions', type=int, default=50, help='The number of revisions of each language version (default: 50).')
+    parser.add_argument('--users', metavar='users', type=int, default=8, help='The number of users who edit the articles (default: 8).')
+    parser.add_argument('--anonymous', metavar='anonymous', type=float, default=0.0, help='The fraction of revisions made by anonymous users (default: 0.0).')
+    parser.add_argument('--languages', metavar='languages', nargs=2, type=str, default=['en', 'de'], help='The two languages of each article (default: en de).')
+    parser.add_argument('--input', metavar='input', type=str, default=None, help='Store a csv file with all generated articles, which can be used as input of extract_edits.py (default: None).')
+
+    args = parser.parse_args()
+
+    if args.record is not None and args.fixtures is None:
+        raise ValueError('Recording requires the path of the fixtures.')
+
+    if args.fixtures is not None:
+        backend = Fixtures(args.fixtures, args.record)
+    else:
+        backend = SyntheticWiki(args.articles, args.revisions, args.users, args.languages, args.anonymous)
+
+        if args.input is not None:
+            with open(args.input, 'w', encoding='utf-8') as file:
+                file.write('title,main,lang1,lang2,country1,country2\n')
+                for title in backend.titles(args.languages[0]):
+                    file.write('%s,%s,%s,%s,,\n' % (title.replace(' ', '_'), args.languages[0], args.languages[0], args.languages[1]))
+
+    server = StandIn(backend, port=args.port, latency=args.latency)
+
+    print('Serving the MediaWiki API at %s' % (server.api))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+   main()
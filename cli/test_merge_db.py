@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Apr  1 10:12:44 2020
+
+@author: jdevreeze
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import database
+import merge_db
+import migrations
+
+def create_shard(path, revisions, text):
+    """
+    Create an extraction database with a single article and its translation.
+
+    Args:
+        path: The path of the sqlite database.
+        revisions: A list with the revision identifiers of the translation.
+        text: A string which is used for the texts of all revisions.
+    """
+
+    db = database.connect(path)
+    migrations.migrate(db, verbose=False)
+
+    writer = database.Writer(db)
+
+    with writer.transaction():
+
+        author_id = writer.author('Editor')
+        parent = writer.article({'parent_id' : 0, 'title' : 'Article', 'language' : 'en', 'timestamp' : None, 'flag' : 0})
+        translation = writer.article({'parent_id' : parent, 'title' : 'Artikel', 'language' : 'de', 'timestamp' : None, 'flag' : 0})
+
+        for identifier in revisions:
+
+            revision_id = writer.revision({
+                'article_id' : translation,
+                'author_id' : author_id,
+                'revision_id' : identifier,
+                'previous_id' : identifier - 1,
+                'timestamp' : None,
+                'content' : '%s %d' % (text, identifier),
+                'previous' : '%s %d' % (text, identifier - 1),
+                'paragraphs' : 1
+            })
+
+            writer.edits(revision_id, ['%s %d' % (text, identifier)], ['%s %d' % (text, identifier - 1)])
+            writer.progress(parent, 'de', 'Editor', identifier)
+
+        writer.error(parent, author_id, revisions[-1] + 1, 'de', True)
+        writer.progress(parent, 'de', 'Editor', 0)
+
+    db.close()
+
+class TestMergeShards(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'output.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def shard(self, name, revisions, text):
+
+        path = os.path.join(self.directory, name)
+        create_shard(path, revisions, text)
+
+        return path
+
+    def count(self, query):
+
+        db = database.connect(self.output)
+        result = db.execute(query).fetchone()[0]
+        db.close()
+
+        return result
+
+    def assertConsistent(self):
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM articles'''), 2)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM authors'''), 1)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM edits WHERE revision_id NOT IN (SELECT id FROM revisions)'''), 0)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM revisions WHERE article_id NOT IN (SELECT id FROM articles)'''), 0)
+        self.assertEqual(self.count('''
+            SELECT COUNT(*) FROM texts WHERE hash NOT IN (
+                SELECT content_hash FROM revisions UNION SELECT previous_hash FROM revisions)
+        '''), 0)
+        self.assertEqual(self.count('''
+            SELECT COUNT(*) FROM revisions WHERE content_hash NOT IN (SELECT hash FROM texts)
+            OR previous_hash NOT IN (SELECT hash FROM texts)
+        '''), 0)
+
+    def test_merge_twice(self):
+
+        path = self.shard('shard.db', [1, 2], 'old')
+
+        self.assertEqual(merge_db.merge(self.output, [path], verbose=False), 2)
+        self.assertEqual(merge_db.merge(self.output, [path], verbose=False), 0)
+
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM revisions'''), 2)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM edits'''), 2)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM errors'''), 1)
+        self.assertConsistent()
+
+    def test_replace_populated_output(self):
+
+        merge_db.merge(self.output, [self.shard('first.db', [1, 2], 'old')], verbose=False)
+
+        path = self.shard('second.db', [1, 2, 3], 'new')
+
+        self.assertEqual(merge_db.merge(self.output, [path], verbose=False, replace=True), 3)
+        self.assertEqual(merge_db.merge(self.output, [path], verbose=False, replace=True), 0)
+
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM revisions'''), 3)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM edits'''), 3)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM edits WHERE updated_text LIKE 'old%' '''), 0)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM errors'''), 1)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM progress'''), 4)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM merged_shards'''), 2)
+        self.assertConsistent()
+
+    def test_add_missing_revisions(self):
+
+        merge_db.merge(self.output, [self.shard('first.db', [1, 2], 'old')], verbose=False)
+
+        self.assertEqual(merge_db.merge(self.output, [self.shard('second.db', [1, 2, 3], 'old')], verbose=False), 1)
+
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM revisions'''), 3)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM edits'''), 3)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM errors'''), 2)
+        self.assertEqual(self.count('''SELECT COUNT(*) FROM progress'''), 4)
+        self.assertConsistent()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 23 11:12:07 2020
+
+@author: jdevreeze
+"""
+
+import hashlib
+import zlib
+
+def digest(text):
+    """
+    Get the key of a text.
+
+    Args:
+        text: A string.
+
+    Returns:
+        A string with the SHA-1 digest or None if there is no text.
+    """
+
+    if text is None:
+        return None
+
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def compress(text):
+    return zlib.compress(text.encode('utf-8'))
+
+def inflate(data):
+    """
+    Decompress a stored text. This function is also available in SQL.
+
+    Args:
+        data: The compressed text.
+
+    Returns:
+        A string with the text or None if there is no text.
+    """
+
+    if data is None:
+        return None
+
+    return zlib.decompress(data).decode('utf-8')
+
+def register(db):
+    """
+    Register the inflate function for a sqlite3 connection.
+
+    Args:
+        db: A sqlite3 connection.
+    """
+
+    db.create_function('inflate', 1, inflate, deterministic=True)
+
+class TextStore:
+    """
+    Content-addressed storage of revision texts.
+
+    Each text is stored once in the texts table, keyed by its SHA-1 digest and compressed
+    with zlib. The revisions table only refers to these keys, so the previous text of a
+    revision that is the content of another revision is not stored again.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._stored = set()
+
+    def put(self, text):
+        """
+        Store a text.
+
+        Args:
+            text: A string.
+
+        Returns:
+            A string with the key of the text or None if there is no text.
+        """
+
+        key = digest(text)
+
+        if key is None or key in self._stored:
+            return key
+
+        if self._cursor.execute('''SELECT 1 FROM texts WHERE hash = ?''', (key,)).fetchone() is None:
+            self._cursor.execute('''INSERT INTO texts(hash, data) VALUES(?, ?)''', (key, compress(text),))
+
+        self._stored.add(key)
+
+        return key
+
+    def remove(self, keys):
+        """
+        Delete the texts that are no longer referenced by any revision (see remove_texts).
+
+        Args:
+            keys: A list with the keys of the texts which are checked.
+
+        Returns:
+            The number of deleted texts.
+        """
+
+        self._stored.difference_update(keys)
+
+        return remove_texts(self._cursor, keys)
+
+    def clear(self):
+        self._stored.clear()
+
+def create_texts(cursor):
+    """
+    Create the texts table and the revision_texts view.
+
+    The view returns the plain texts of each revision, which requires the inflate function
+    to be registered (see database.connect). Revisions that were not moved to the texts
+    table yet are returned as well.
+
+    Args:
+        cursor: A sqlite3 cursor.
+    """
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS texts(
+            hash TEXT PRIMARY KEY,
+            data BLOB)
+    ''')
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS revision_texts AS
+        SELECT
+            revisions.id AS id,
+            COALESCE(inflate(current.data), revisions.content) AS content,
+            COALESCE(inflate(previous.data), revisions.previous) AS previous
+        FROM revisions
+        LEFT JOIN texts AS current ON current.hash = revisions.content_hash
+        LEFT JOIN texts AS previous ON previous.hash = revisions.previous_hash
+    ''')
+
+def move_texts(cursor, batch=1000, commit=False):
+    """
+    Move the texts of all revisions to the texts table.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        batch: The number of revisions that are moved at once (default 1000).
+        commit: Commit after each batch, so an interrupted move does not have to start
+            again from the first revision (default False).
+
+    Returns:
+        The number of moved revisions.
+    """
+
+    store = TextStore(cursor)
+    moved = 0
+
+    while True:
+
+        rows = cursor.execute('''
+            SELECT id, content, previous FROM revisions
+            WHERE content_hash IS NULL AND (content IS NOT NULL OR previous IS NOT NULL)
+            LIMIT ?
+        ''', (batch,)).fetchall()
+
+        if not rows:
+            break
+
+        updates = [(store.put(content), store.put(previous), identifier) for identifier, content, previous in rows]
+
+        cursor.executemany('''
+            UPDATE revisions SET content_hash = ?, previous_hash = ?, content = NULL, previous = NULL WHERE id = ?
+        ''', updates)
+
+        moved += len(rows)
+
+        if commit is True:
+            cursor.connection.commit()
+
+    return moved
+
+def remove_texts(cursor, keys=None, batch=500):
+    """
+    Delete the texts that are no longer referenced by any revision, e.g. because the
+    revisions were replaced.
+
+    Args:
+        cursor: A sqlite3 cursor.
+        keys: A list with the keys of the texts which are checked, or None to check all
+            texts (default None).
+        batch: The number of keys that are checked at once (default 500).
+
+    Returns:
+        The number of deleted texts.
+    """
+
+    unused = '''
+        NOT EXISTS (SELECT 1 FROM revisions WHERE content_hash = texts.hash)
+        AND NOT EXISTS (SELECT 1 FROM revisions WHERE previous_hash = texts.hash)
+    '''
+
+    if keys is None:
+        cursor.execute('''DELETE FROM texts WHERE %s''' % (unused))
+        return cursor.rowcount
+
+    keys = list(set(key for key in keys if key is not None))
+    removed = 0
+
+    for start in range(0, len(keys), batch):
+
+        chunk = keys[start:start + batch]
+
+        cursor.execute('''DELETE FROM texts WHERE hash IN (%s) AND %s''' % (', '.join('?' * len(chunk)), unused), chunk)
+        removed += cursor.rowcount
+
+    return removed